@@ -1,25 +1,80 @@
+import contextvars
 import json
-import sys
-import os
-from datetime import datetime
-from aisuite import Client
-from dotenv import load_dotenv
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from concurrent.futures import ThreadPoolExecutor
 from tools.arxiv_search import arxiv_search_tool
 from tools.web_search import tavily_search_tool
-load_dotenv('.env')
+from tools.paper_index import local_paper_search_tool
+from tools.config import current_date
+from agents.llm import chat, chat_stream
+from agents.parsing import parse_items, parse_json
+from agents.projection import TOOL_PROJECTION, ToolProjection
+from agents.corpus import (
+    compact_corpus, dedupe_by_title, heuristic_queries,
+    load_corpus, merge_analyses, normalize_entry, shard_corpus
+)
+
+
+def _complete(messages: list, provider: str, model: str, temperature: float, stream: bool = False):
+    """
+    Runs a single-turn completion, returning the text (or a chunk iterator when
+    stream=True). Errors are reported as "[Model Error: ...]" text either way.
+    """
+    if stream:
+        return _complete_stream(messages, provider, model, temperature)
 
+    try:
+        return chat(
+            provider=provider,
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_turns=5
+        )
+    except Exception as e:
+        return f"[Model Error: {e}]"
 
-today = datetime.now().strftime("%Y-%m-%d")
 
-client = Client()
+def _complete_stream(messages: list, provider: str, model: str, temperature: float):
+    try:
+        yield from chat_stream(
+            provider=provider,
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_turns=5
+        )
+    except Exception as e:
+        yield f"[Model Error: {e}]"
 
 
 # Corpus Collector Agent
-def corpus_collector(domain: str, provider: str, model: str, temperature: float = 1.0):
+def corpus_collector(
+        domain: str,
+        provider: str,
+        model: str,
+        temperature: float = 1.0,
+        mode: str = "agent",
+        project_tools: bool = TOOL_PROJECTION,
+        **prefetch_options
+):
     """
     Collects corpus (research papers and relevant articles) from sources.
+
+    mode="agent" lets the model drive the search tools; mode="prefetch" runs
+    prefetch_collector instead (see its docstring for prefetch_options).
+    With project_tools, the model sees compact tool results and the full
+    records are restored in the returned corpus (see ToolProjection).
     """
+    if mode == "prefetch":
+        return prefetch_collector(domain, provider, model, temperature, **prefetch_options)
+
+    today = current_date()
+    projection = ToolProjection() if project_tools else None
+    ref_field = """
+        "ref": "...",""" if projection else ""
+    ref_note = """
+     - Tool results are shortened and come as "fields" + "rows"; copy each paper's "ref".
+     Full abstracts and metadata are filled in from the ref afterwards.""" if projection else ""
 
     user_prompt = f"""
     You are a research assistant specializing in academic data collection.
@@ -28,13 +83,18 @@ def corpus_collector(domain: str, provider: str, model: str, temperature: float
     Given a research domain or topic of interest, use the available tools 
     (arxiv_search_tool: academic papers, and tavily_search_tool: general web search)
     to retrieve the most relevant and recent papers or articles.
+    Prefer multi_search_tool when you have several queries: it runs them on both
+    sources concurrently in a single call.
+    Start with local_paper_search_tool: it instantly searches papers collected in
+    earlier sessions. Then use the network tools to top up with recent work that
+    is missing locally.
 
     Research domain: {domain}
     Today is {today}
 
     OUTPUT FORMAT (STRICT):
     A valid JSON array named "corpus" where each element contains:
-        {{
+        {{{ref_field}
         "title": "...",
         "authors": "...",
         "year": "...",
@@ -48,37 +108,178 @@ def corpus_collector(domain: str, provider: str, model: str, temperature: float
      - Avoid duplicate entries (match by title).
      - Always include publication year and source.
      - Only return JSON output (no prose before or after).
-     - Prioritize literature published within the last 5 years (from 2020 to {today[:4]}),
+     - Prioritize literature published within the last 5 years (from {int(today[:4]) - 5} to {today[:4]}),
      as recent studies best reflect current trends and research gaps.
      - However, if a topic is theoretical or foundational, include older **seminal** works 
     that are frequently cited or historically important.
-     - Always balance **recency** and **relevance** over quantity.
+     - Always balance **recency** and **relevance** over quantity.{ref_note}
     """.strip()
 
     # Build the agent
     messages = [{"role": "user", "content": user_prompt}]
 
-    tools = [arxiv_search_tool, tavily_search_tool]
+    from tools.async_search import multi_search_tool  # asyncio is loaded on first use
+
+    tools = [local_paper_search_tool, arxiv_search_tool, tavily_search_tool, multi_search_tool]
+    if projection:
+        tools = [projection.wrap(tool) for tool in tools]
 
     try:
-        response = client.chat.completions.create(
-            model=f"{provider}:{model}",
+        content = chat(
+            provider=provider,
+            model=model,
             messages=messages,
             tools=tools,
-            tool_choice = "auto",
+            tool_choice="auto",
             temperature=temperature,
             max_turns=5
         )
-        content = response.choices[0].message.content
-        return content
+        return projection.rehydrate(content) if projection else content
     except Exception as e:
         return f"[Model Error: {e}]"
 
+def plan_queries(domain: str, provider: str, model: str, max_queries: int = 4) -> list[str]:
+    """
+    Asks the model once for search queries; falls back to heuristic_queries.
+    """
+    user_prompt = f"""
+    Suggest up to {max_queries} short search queries (keywords only) for finding
+    recent academic papers and articles about: {domain}
+
+    Return only a JSON array of strings.
+    """.strip()
+
+    try:
+        content = chat(
+            provider=provider,
+            model=model,
+            messages=[{"role": "user", "content": user_prompt}],
+            temperature=0
+        )
+        queries = parse_items(content, "queries", item_type=str) or []
+        queries = [q for q in queries if isinstance(q, str) and q.strip()]
+        if queries:
+            return queries[:max_queries]
+    except Exception:
+        pass
+    return heuristic_queries(domain)
+
+
+def prefetch_collector(
+        domain: str,
+        provider: str,
+        model: str,
+        temperature: float = 1.0,
+        llm_queries: bool = False,
+        polish: bool = False,
+        max_results: int = 8,
+        max_items: int = 20,
+        local_first: bool = True
+):
+    """
+    Deterministic collection: plan queries up front, fetch them from arXiv and
+    Tavily in parallel, then normalize, dedupe and rank them locally (see rank_entries).
+
+    Args:
+        - llm_queries (bool): Plan queries with one model call instead of a heuristic
+        - polish (bool): Let the model curate the normalized corpus (one call)
+        - max_results (int): Results requested per query and source
+        - max_items (int): Maximum corpus size
+        - local_first (bool): Search the local paper index first; when it already
+          holds max_items relevant papers, the network is only used for a
+          freshness top-up (one arXiv query) instead of the full fan-out
+
+    Returns:
+        - str: JSON text of the form {"corpus": [...]}, like the agent mode.
+    """
+    queries = (
+        plan_queries(domain, provider, model) if llm_queries else heuristic_queries(domain)
+    )
+
+    local = []
+    if local_first:
+        for query in queries:
+            for item in local_paper_search_tool(query, max_results):
+                entry = normalize_entry(item, item.get("source"))
+                if entry:
+                    local.append(entry)
+        local = dedupe_by_title(local)
+
+    if len(local) >= max_items:
+        searches = [{"source": "arxiv", "query": queries[0], "max_results": max_results}]
+    else:
+        searches = [
+            {"source": source, "query": query, "max_results": max_results}
+            for query in queries
+            for source in ("arxiv", "tavily")
+        ]
+
+    from tools.async_search import multi_search
+
+    entries = []
+    for item in multi_search(searches):
+        entry = normalize_entry(item, item.get("source"))
+        if entry:
+            entries.append(entry)
+    entries += local
+
+    from agents.ranking import rank_entries  # NumPy is loaded on first use
+
+    today = current_date()
+    corpus = rank_entries(entries, domain, top_k=max_items, today=today)
+    corpus_json = json.dumps({"corpus": corpus})
+
+    if not polish or not corpus:
+        return corpus_json
+
+    user_prompt = f"""
+    You are a research assistant specializing in academic data collection.
+
+    Below is a corpus collected for the research domain: {domain}
+    Today is {today}
+
+    Remove entries that are irrelevant to the domain and keep the rest unchanged.
+    Return the same JSON object shape, {{"corpus": [...]}}, and nothing else.
+
+    INPUT:
+    {corpus_json}
+    """.strip()
+
+    try:
+        polished = chat(
+            provider=provider,
+            model=model,
+            messages=[{"role": "user", "content": user_prompt}],
+            temperature=temperature
+        )
+        entries = load_corpus(polished)
+        if entries is not None:
+            return json.dumps({"corpus": entries})
+    except Exception:
+        pass
+    return corpus_json
+
+
 # Corpus Analyzer Agent
-def corpus_analyzer(corpus_json: json, provider: str, model: str, temperature: float = 1.0):
+def corpus_analyzer(
+        corpus_json: json,
+        provider: str,
+        model: str,
+        temperature: float = 1.0,
+        stream: bool = False,
+        excerpts: dict = None
+):
     """
     Analyzes research corpus into thematic concepts
+    (returns an iterator of text chunks when stream=True).
+    `excerpts` ({paper title: {section: text}}, see tools.fulltext) adds
+    full-text sections of some papers to the input.
     """
+    excerpts_block = f"""
+
+    FULL-TEXT EXCERPTS (limitations, future work and conclusion sections of some papers,
+    by title; base common_limitations on these where available):
+    {json.dumps(excerpts)}""" if excerpts else ""
     user_prompt = f"""
     You are an AI research analyst skilled in literature review.
 
@@ -87,7 +288,7 @@ def corpus_analyzer(corpus_json: json, provider: str, model: str, temperature: f
     themes, trends, and areas of focus.
 
     INPUT:
-    {corpus_json}
+    {corpus_json}{excerpts_block}
 
     OUTPUT FORMAT (STRICT):
     A valid JSON object with these fields:
@@ -119,23 +320,106 @@ def corpus_analyzer(corpus_json: json, provider: str, model: str, temperature: f
 
     messages = [{"role": "user", "content": user_prompt}]
 
+    return _complete(messages, provider, model, temperature, stream)
+    
+
+def corpus_analyzer_sharded(
+        corpus_json: json,
+        provider: str,
+        model: str,
+        temperature: float = 1.0,
+        shard_size: int = 20,
+        max_workers: int = 4,
+        token_budget: int = None,
+        llm_reduce: bool = True,
+        excerpts: dict = None
+):
+    """
+    Map-reduce variant of corpus_analyzer for corpora larger than one prompt.
+
+    The corpus is split into shards that are analyzed concurrently with
+    corpus_analyzer (each shard optionally compacted to token_budget), then the
+    shard analyses are merged into the same output schema. With llm_reduce the
+    model consolidates overlapping themes in one extra call; the deterministic
+    merge is used if that call fails. Each shard gets the `excerpts` of its own papers.
+
+    Returns:
+        - str: JSON text with "themes", "emerging_trends" and "common_limitations".
+    """
+    entries = load_corpus(corpus_json)
+    if entries is None or len(entries) <= shard_size:
+        if token_budget:
+            corpus_json, _ = compact_corpus(corpus_json, token_budget=token_budget)
+        return corpus_analyzer(corpus_json, provider, model, temperature, excerpts=excerpts)
+
+    def analyze(shard: list[dict]) -> dict:
+        shard_json = json.dumps({"corpus": shard})
+        if token_budget:
+            shard_json, _ = compact_corpus(shard_json, token_budget=token_budget)
+        titles = {entry.get("title") for entry in shard}
+        shard_excerpts = {title: text for title, text in (excerpts or {}).items() if title in titles}
+        analysis = parse_json(
+            corpus_analyzer(shard_json, provider, model, temperature, excerpts=shard_excerpts), "themes"
+        )
+        return analysis if isinstance(analysis, dict) else {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Each shard runs in a copy of this context, so spans and the LLM call policy carry over
+        futures = [
+            executor.submit(contextvars.copy_context().run, analyze, shard)
+            for shard in shard_corpus(entries, shard_size)
+        ]
+        analyses = [future.result() for future in futures]
+
+    merged_json = json.dumps(merge_analyses(analyses))
+    if not llm_reduce:
+        return merged_json
+
+    user_prompt = f"""
+    You are an AI research analyst skilled in literature review.
+
+    Your task:
+    The following analysis was merged from several partial analyses of one corpus.
+    Combine themes that describe the same idea (union their representative papers),
+    and merge near-duplicate emerging trends and common limitations.
+
+    INPUT:
+    {merged_json}
+
+    HARD CONSTRAINTS:
+    - Keep exactly the same JSON object shape and field names.
+    - Do NOT generate new facts, themes or paper titles.
+    - Only output the JSON object (no prose or markdown).
+    """.strip()
+
     try:
-        response = client.chat.completions.create(
-            model=f"{provider}:{model}",
-            messages=messages,
-            temperature=temperature,
-            max_turns=5
+        reduced = chat(
+            provider=provider,
+            model=model,
+            messages=[{"role": "user", "content": user_prompt}],
+            temperature=temperature
         )
-        content = response.choices[0].message.content
-        return content
-    except Exception as e:
-        return f"[Model Error: {e}]"
-    
+        analysis = parse_json(reduced, "themes")
+        if isinstance(analysis, dict) and isinstance(analysis.get("themes"), list):
+            return json.dumps(analysis)
+    except Exception:
+        pass
+    return merged_json
+
 
 # Research Gap Identifier Agent
-def gap_identifier(analysis_summary: json, provider: str, model: str, temperature: float = 1.0):
+def gap_identifier(
+        analysis_summary: json,
+        provider: str,
+        model: str,
+        temperature: float = 1.0,
+        stream: bool = False,
+        min_gaps: int = 3,
+        max_gaps: int = 8
+):
     """
     Analyzes research report into thematic concepts.
+    (returns an iterator of text chunks when stream=True)
     """
 
     user_prompt = f"""
@@ -157,7 +441,7 @@ def gap_identifier(analysis_summary: json, provider: str, model: str, temperatur
        "potential_impact": "High — directly improves real-world trust and adoption."
         }} 
     
-    2. Include at least 3 and at most 8 gaps.
+    2. Include at least {min_gaps} and at most {max_gaps} gaps.
 
     HARD CONSTRAINTS:
     - Derive every gap from provided analysis; do not invent unsupported claims.
@@ -168,17 +452,7 @@ def gap_identifier(analysis_summary: json, provider: str, model: str, temperatur
 
     messages = [{"role": "user", "content": user_prompt}]
 
-    try:
-        response = client.chat.completions.create(
-            model=f"{provider}:{model}",
-            messages=messages,
-            temperature=temperature,
-            max_turns=5
-        )
-        content = response.choices[0].message.content
-        return content
-    except Exception as e:
-        return f"[Model Error: {e}]"
+    return _complete(messages, provider, model, temperature, stream)
 
 # Research Top Generator Agent
 def topic_generator(
@@ -187,10 +461,14 @@ def topic_generator(
         provider: str,
         model: str,
         focus_area: str = None,
-        temperature: float = 1.0
+        temperature: float = 1.0,
+        stream: bool = False,
+        min_topics: int = 3,
+        max_topics: int = 10
 ):
     """
     Generates research topics
+    (returns an iterator of text chunks when stream=True)
     """
 
     user_prompt = f"""
@@ -208,6 +486,7 @@ def topic_generator(
     OUTPUT FORMAT (STRICT):
     1. A valid JSON array named "research_topics" where each element is:
     {{
+       "gap_title": "Lack of interpretability in multimodal healthcare AI",
        "topic_title": "Designing Trust-Aware Explainable AI Interfaces for Clinicians",
        "research_question": "How can explainable AI interfaces be optimized to enhance clinician trust in model recommendations?",
        "motivation": "Bridges human-AI trust gap in critical decision systems.",
@@ -215,10 +494,10 @@ def topic_generator(
        "expected_contribution": "Framework for measuring and improving clinician trust in XAI systems."
    }}
 
-   2. Include between 3 and 10 topics.
+   2. Include between {min_topics} and {max_topics} topics.
 
    HARD CONSTRAINTS:
-   - Ensure each topic directly addresses a listed research gap.
+   - Ensure each topic directly addresses a listed research gap, and copy that gap's "gap_title" exactly.
    - Maintain logical flow (gap → question → method → contribution).
    - Use academic tone, concise phrasing
    - Output JSON only (no prose, no markdown).
@@ -226,14 +505,4 @@ def topic_generator(
 
     messages = [{"role": "user", "content": user_prompt}]
 
-    try:
-        response = client.chat.completions.create(
-            model=f"{provider}:{model}",
-            messages=messages,
-            temperature = temperature,
-            max_turns=5
-        )
-        content = response.choices[0].message.content
-        return content
-    except Exception as e:
-        return f"[Model Error: {e}]"
+    return _complete(messages, provider, model, temperature, stream)
@@ -0,0 +1,244 @@
+import json
+import re
+from agents.parsing import parse_items
+
+
+def normalize_title(title: str) -> str:
+    """
+    Reduces a title to lower-case alphanumeric words, for duplicate matching.
+    """
+    return " ".join(re.findall(r"[a-z0-9]+", str(title).lower()))
+
+
+def normalize_entry(item: dict, source: str) -> dict | None:
+    """
+    Converts a raw arxiv_search_tool / tavily_search_tool result into the corpus schema.
+
+    Args:
+        - item (dict): A single tool result
+        - source (str): "arxiv" or "tavily"
+
+    Returns:
+        - dict | None: {"title", "authors", "year", "abstract", "source", "url"},
+          or None for errors, image-only results and untitled entries.
+    """
+    if "error" in item or "image_url" in item or not item.get("title"):
+        return None
+
+    if source == "arxiv":
+        authors = item.get("authors") or []
+        return {
+            "title": item["title"],
+            "authors": ", ".join(authors) if isinstance(authors, list) else str(authors),
+            "year": (item.get("published") or "")[:4],
+            "abstract": item.get("summary", ""),
+            "source": "arxiv",
+            "url": item.get("url", ""),
+        }
+
+    return {
+        "title": item["title"],
+        "authors": item.get("authors", ""),
+        "year": str(item.get("year", "")),
+        "abstract": item.get("content", ""),
+        "source": "web",
+        "url": item.get("url", ""),
+    }
+
+
+def dedupe_by_title(entries: list[dict]) -> list[dict]:
+    """
+    Drops entries whose normalized title has already been seen (first one wins).
+    """
+    seen = set()
+    unique = []
+    for entry in entries:
+        key = normalize_title(entry.get("title", ""))
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(entry)
+    return unique
+
+
+def heuristic_queries(domain: str) -> list[str]:
+    """
+    Builds a small set of search queries for a domain without calling an LLM.
+    """
+    domain = " ".join(domain.split())
+    return [domain, f"{domain} survey", f"{domain} challenges"]
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token estimate (about four characters per token for English text).
+    """
+    return (len(text) + 3) // 4
+
+
+def load_corpus(corpus_json) -> list[dict] | None:
+    """
+    Extracts the list of papers from collector output ({"corpus": [...]} or a bare
+    list, tolerating code fences and prose; see agents.parsing).
+
+    Returns:
+        - list[dict] | None: The entries, or None if the input is not valid corpus
+          JSON, is a model error or holds no entries.
+    """
+    if isinstance(corpus_json, dict):
+        corpus_json = corpus_json.get("corpus")
+    elif isinstance(corpus_json, str):
+        corpus_json = parse_items(corpus_json, "corpus")
+    if not isinstance(corpus_json, list):
+        return None
+    return [entry for entry in corpus_json if isinstance(entry, dict)] or None
+
+
+def shorten_text(text: str, max_tokens: int) -> str:
+    """
+    Extractively shortens text to roughly max_tokens: whole leading sentences
+    are kept while they fit, otherwise the text is cut at a word boundary.
+    """
+    text = " ".join(str(text).split())
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    max_chars = max_tokens * 4
+    kept = ""
+    for sentence in re.split(r"(?<=[.!?])\s+", text):
+        candidate = f"{kept} {sentence}".strip()
+        if len(candidate) > max_chars:
+            break
+        kept = candidate
+
+    if not kept:
+        kept = text[:max_chars].rsplit(" ", 1)[0]
+    return kept + " …"
+
+
+def _compact_authors(authors, max_authors: int = 3) -> str:
+    if isinstance(authors, str):
+        authors = [a.strip() for a in authors.split(",") if a.strip()]
+    if len(authors) > max_authors:
+        return ", ".join(authors[:max_authors]) + " et al."
+    return ", ".join(authors)
+
+
+def compact_corpus(corpus_json, token_budget: int = 3000) -> tuple[str, dict]:
+    """
+    Shrinks a corpus to fit a token budget before it is sent to corpus_analyzer.
+
+    Fields the analyzer does not need (url) are dropped, author lists are
+    shortened, and abstracts share whatever budget is left after the other
+    fields: short abstracts are kept whole and the rest are shortened
+    extractively. If even the bare entries do not fit, trailing entries are dropped.
+
+    Args:
+        - corpus_json: Collector output ({"corpus": [...]} text, dict or list)
+        - token_budget (int): Approximate total token budget (default 3000)
+
+    Returns:
+        - tuple[str, dict]: The compact JSON text and a trimming report. Input that
+          cannot be parsed is returned unchanged with report["parsed"] = False.
+    """
+    entries = load_corpus(corpus_json)
+    original = corpus_json if isinstance(corpus_json, str) else json.dumps(corpus_json)
+    report = {
+        "parsed": entries is not None,
+        "budget": token_budget,
+        "tokens_before": estimate_tokens(original),
+    }
+    if entries is None:
+        report["tokens_after"] = report["tokens_before"]
+        return original, report
+
+    compact = [
+        {
+            "title": entry.get("title", ""),
+            "authors": _compact_authors(entry.get("authors", "")),
+            "year": entry.get("year", ""),
+            "source": entry.get("source", ""),
+        }
+        for entry in entries
+    ]
+    abstracts = [" ".join(str(entry.get("abstract", "")).split()) for entry in entries]
+
+    # Drop trailing entries until the fields other than the abstract fit.
+    overheads = [estimate_tokens(_dumps(entry)) + 4 for entry in compact]
+    while compact and sum(overheads) > token_budget:
+        compact.pop()
+        abstracts.pop()
+        overheads.pop()
+
+    # Share the remaining budget, handing slack from short abstracts to long ones.
+    remaining = token_budget - sum(overheads)
+    pending = sorted(range(len(compact)), key=lambda i: estimate_tokens(abstracts[i]))
+    truncated = 0
+    for position, i in enumerate(pending):
+        share = remaining // (len(pending) - position)
+        abstract = shorten_text(abstracts[i], share) if share > 0 else ""
+        truncated += abstract != abstracts[i]
+        compact[i]["abstract"] = abstract
+        remaining -= estimate_tokens(abstract)
+
+    text = _dumps({"corpus": compact})
+    report.update(
+        entries_in=len(entries),
+        entries_out=len(compact),
+        dropped=len(entries) - len(compact),
+        abstracts_truncated=truncated,
+        tokens_after=estimate_tokens(text),
+    )
+    return text, report
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def shard_corpus(entries: list[dict], shard_size: int) -> list[list[dict]]:
+    """
+    Splits corpus entries into consecutive shards of at most shard_size entries.
+    """
+    return [entries[i:i + shard_size] for i in range(0, len(entries), shard_size)]
+
+
+def merge_analyses(analyses: list[dict]) -> dict:
+    """
+    Merges per-shard corpus_analyzer outputs into one analysis with the same schema.
+
+    Themes with the same normalized name are combined (their representative
+    papers are unioned and the longer summary is kept); trends and limitations
+    are deduplicated case-insensitively, preserving first-seen order.
+    """
+    themes = {}
+    trends, limitations = {}, {}
+
+    def items(analysis: dict, field: str) -> list:
+        # Missing, null and non-list fields count as empty
+        value = analysis.get(field) if isinstance(analysis, dict) else None
+        return value if isinstance(value, list) else []
+
+    for analysis in analyses:
+        for theme in items(analysis, "themes"):
+            if not isinstance(theme, dict):
+                continue
+            name, summary = str(theme.get("name") or ""), str(theme.get("summary") or "")
+            merged = themes.setdefault(
+                normalize_title(name), {"name": name, "summary": "", "representative_papers": []}
+            )
+            if len(summary) > len(merged["summary"]):
+                merged["summary"] = summary
+            for paper in items(theme, "representative_papers"):
+                if paper not in merged["representative_papers"]:
+                    merged["representative_papers"].append(paper)
+
+        for item in items(analysis, "emerging_trends"):
+            trends.setdefault(str(item).strip().lower(), item)
+        for item in items(analysis, "common_limitations"):
+            limitations.setdefault(str(item).strip().lower(), item)
+
+    return {
+        "themes": list(themes.values()),
+        "emerging_trends": list(trends.values()),
+        "common_limitations": list(limitations.values()),
+    }
@@ -0,0 +1,214 @@
+import json
+import os
+import shutil
+import time
+import uuid
+import weakref
+from tools.config import getenv
+
+# Run records kept in memory per session; older ones are written to
+# QUEST0_HISTORY_DIR (if set) and read back only when their page is shown.
+HISTORY_DIR = getenv("QUEST0_HISTORY_DIR")
+HISTORY_IN_MEMORY = int(getenv("QUEST0_HISTORY_IN_MEMORY", "20"))
+# Seconds after its last write that a session's spill directory is deleted, in
+# case the session ended without cleaning up (e.g. the server was killed)
+HISTORY_TTL = float(getenv("QUEST0_HISTORY_TTL", 24 * 60 * 60))
+
+# Corpus fields kept in a run record (abstracts are dropped).
+CORPUS_FIELDS = ("title", "year", "source", "url")
+
+
+def run_record(
+        domain: str,
+        corpus: list,
+        themes: list,
+        emerging_trends: list,
+        common_limitations: list,
+        research_gaps: list,
+        topics: list
+) -> dict:
+    """
+    A compact, structured record of one finished pipeline run: every stage's
+    parsed items are kept once, and markdown is rendered from it on demand.
+    """
+    return {
+        "id": uuid.uuid4().hex[:12],
+        "domain": domain,
+        "created_at": time.time(),
+        "corpus": [
+            {field: entry.get(field) for field in CORPUS_FIELDS if entry.get(field)}
+            for entry in corpus if isinstance(entry, dict)
+        ],
+        "themes": [
+            {"name": theme.get("name"), "summary": theme.get("summary")}
+            for theme in themes if isinstance(theme, dict)
+        ],
+        "emerging_trends": list(emerging_trends),
+        "common_limitations": list(common_limitations),
+        "research_gaps": [gap for gap in research_gaps if isinstance(gap, dict)],
+        "research_topics": [topic for topic in topics if isinstance(topic, dict)],
+    }
+
+
+def run_summary(record: dict) -> str:
+    """
+    One-line label of a run, for collapsed history entries.
+    """
+    return (
+        f"{record.get('domain', 'Research run')}: {len(record.get('corpus', []))} papers, "
+        f"{len(record.get('research_gaps', []))} gaps, {len(record.get('research_topics', []))} topics"
+    )
+
+
+def render_markdown(record: dict) -> str:
+    """
+    The chat-history markdown of a run record.
+    """
+    response_parts = ["**Research Analysis Pipeline Completed**\n\n"]
+
+    if record["corpus"]:
+        response_parts.append(f"### Corpus Collected\n{len(record['corpus'])} papers/articles found.\n\n")
+
+    if record["themes"]:
+        response_parts.append("### Identified Themes\n")
+        for i, theme in enumerate(record["themes"], 1):
+            response_parts.append(f"**{i}. {theme.get('name') or 'Unnamed Theme'}**\n")
+            response_parts.append(f"- Summary: {theme.get('summary') or 'No summary available.'}\n")
+        response_parts.append("\n")
+
+    if record["emerging_trends"]:
+        response_parts.append("### Emerging Trends\n")
+        for trend in record["emerging_trends"]:
+            response_parts.append(f"- {trend}\n")
+        response_parts.append("\n")
+
+    if record["common_limitations"]:
+        response_parts.append("### Common Limitations\n")
+        for limitation in record["common_limitations"]:
+            response_parts.append(f"- {limitation}\n")
+        response_parts.append("\n")
+
+    if record["research_gaps"]:
+        response_parts.append("### Identified Research Gaps\n")
+        for i, gap in enumerate(record["research_gaps"], 1):
+            response_parts.append(f"**{i}. {gap.get('gap_title', 'Untitled Gap')}**\n")
+            response_parts.append(f"- Description: {gap.get('description', 'No description available.')}\n")
+            response_parts.append(f"- Potential Impact: {gap.get('potential_impact', 'N/A')}\n\n")
+
+    if record["research_topics"]:
+        response_parts.append("### Suggested Research Topics\n")
+        for i, topic in enumerate(record["research_topics"], 1):
+            response_parts.append(f"**{i}. {topic.get('topic_title', 'Untitled Topic')}**\n")
+            response_parts.append(f"- Research Question: {topic.get('research_question', 'N/A')}\n")
+            response_parts.append(f"- Motivation: {topic.get('motivation', 'N/A')}\n")
+            response_parts.append(f"- Suggested Methodology: {topic.get('suggested_methodology', 'N/A')}\n")
+            response_parts.append(f"- Expected Contribution: {topic.get('expected_contribution', 'N/A')}\n\n")
+    else:
+        response_parts.append("No research topics were generated.\n")
+
+    return "".join(response_parts)
+
+
+def expire_spill_dirs(root: str, ttl: float = HISTORY_TTL) -> int:
+    """
+    Deletes the session spill directories under `root` that were not written
+    to in the last `ttl` seconds.
+
+    Returns:
+        - int: The number of directories deleted.
+    """
+    cutoff = time.time() - ttl
+    expired = 0
+    try:
+        entries = list(os.scandir(root))
+    except OSError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False) and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path)
+                expired += 1
+        except OSError:
+            continue
+    return expired
+
+
+class ChatHistory:
+    """
+    A session's chat history: user prompts as text, assistant turns as run
+    records (see run_record).
+
+    Only the newest `max_in_memory` run records stay in memory. With a
+    `spill_dir`, older records are written there as JSON and replaced by a
+    stub holding their summary; run() reads them back when needed. Without
+    one, every record stays in memory.
+
+    Each history spills into its own subdirectory, deleted by close() or once
+    the history is garbage-collected (when its session ends). Subdirectories
+    of sessions that never cleaned up expire after `ttl` seconds.
+    """
+
+    def __init__(
+            self, spill_dir: str = HISTORY_DIR, max_in_memory: int = HISTORY_IN_MEMORY, ttl: float = HISTORY_TTL
+    ):
+        self.spill_dir = None
+        self.max_in_memory = max_in_memory
+        self.messages = []
+        self._cleanup = None
+        if spill_dir:
+            expire_spill_dirs(spill_dir, ttl)
+            self.spill_dir = os.path.join(spill_dir, uuid.uuid4().hex[:12])
+            self._cleanup = weakref.finalize(self, shutil.rmtree, self.spill_dir, ignore_errors=True)
+
+    def close(self) -> None:
+        """
+        Deletes the spilled records and stops spilling; records still in memory are kept.
+        """
+        if self._cleanup is not None:
+            self._cleanup()
+        self.spill_dir = None
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def add_user(self, content: str) -> None:
+        self.messages.append({"role": "user", "content": content})
+
+    def add_run(self, record: dict) -> None:
+        self.messages.append({
+            "role": "assistant", "run_id": record["id"], "summary": run_summary(record), "run": record
+        })
+        self._spill()
+
+    def _spill(self) -> None:
+        if not self.spill_dir:
+            return
+        in_memory = [m for m in self.messages if m.get("run") is not None]
+        for message in in_memory[:max(0, len(in_memory) - self.max_in_memory)]:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            path = os.path.join(self.spill_dir, f"{message['run_id']}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(message["run"], f)
+            message["run"], message["path"] = None, path
+
+    def run(self, message: dict) -> dict | None:
+        """
+        The run record of an assistant message, read from disk if it was spilled.
+        """
+        if message.get("run") is not None:
+            return message["run"]
+        try:
+            with open(message["path"], encoding="utf-8") as f:
+                return json.load(f)
+        except (KeyError, OSError, json.JSONDecodeError):
+            return None
+
+    def page_count(self, page_size: int) -> int:
+        return max(1, -(-len(self.messages) // page_size))
+
+    def page(self, number: int, page_size: int) -> list[dict]:
+        """
+        The messages of one page, oldest first. Page 1 holds the newest messages.
+        """
+        end = len(self.messages) - (number - 1) * page_size
+        return self.messages[max(0, end - page_size):max(0, end)]
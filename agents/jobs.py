@@ -0,0 +1,246 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from hashlib import sha256
+from typing import Iterator
+from agents.pipeline import StageMemo, iter_pipeline
+from tools.config import getenv
+from tools.metrics import increment, profile, set_gauge
+
+# Pipelines run at once, and runs allowed to wait for a worker, per process.
+JOB_WORKERS = int(getenv("QUEST0_JOB_WORKERS", "4"))
+JOB_QUEUE = int(getenv("QUEST0_JOB_QUEUE", "16"))
+# Seconds a stage output stays in the shared memo (search results and models move on)
+JOB_MEMO_TTL = float(getenv("QUEST0_JOB_MEMO_TTL", 6 * 60 * 60))
+# Set to write a cProfile dump of every run
+PROFILE_DIR = getenv("QUEST0_PROFILE_DIR")
+
+
+def job_key(params: dict, fixed: dict = None, stream: bool = False) -> str:
+    """
+    Identity of a run: requests with the same key share one job.
+    """
+    payload = {"params": params, "fixed": fixed, "stream": stream}
+    return sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class JobCancelled(Exception):
+    """
+    Raised in a job's worker (and to its followers) once the job was cancelled.
+    """
+
+
+class QueueFull(RuntimeError):
+    """
+    Raised by JobExecutor.submit when every worker is busy and the queue is full.
+    """
+
+
+class Job:
+    """
+    One pipeline run, shared by every session that asked for the same parameters.
+
+    The worker appends events to an append-only log and followers read it at
+    their own pace (see follow), so a session that joins late replays what it
+    missed. Events are ("token", stage, chunk) while a stage streams and
+    ("stage", stage, output, cached) when it finishes.
+    """
+
+    def __init__(self, key: str, params: dict, fixed: dict = None, stream: bool = False):
+        self.key = key
+        self.params = params
+        self.fixed = fixed
+        self.stream = stream
+        self.status = "queued"
+        self.error = None
+        self.events = []
+        self.subscribers = 0
+        self.future = None
+        self._cancelled = threading.Event()
+        self._changed = threading.Condition()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "error", "cancelled")
+
+    def _publish(self, event: tuple) -> None:
+        with self._changed:
+            self.events.append(event)
+            self._changed.notify_all()
+
+    def _finish(self, status: str, error: Exception = None) -> None:
+        with self._changed:
+            self.status, self.error = status, error
+            self._changed.notify_all()
+
+    def _on_token(self, stage_name: str, chunk: str) -> None:
+        # Stops a streamed completion mid-way: JobCancelled propagates out of the
+        # stage and pipeline, and _run finishes the job as "cancelled"
+        if self.cancelled:
+            raise JobCancelled(self.key)
+        self._publish(("token", stage_name, chunk))
+
+    def cancel(self) -> None:
+        """
+        Cancels the run: a queued job never starts, a running one stops at its
+        next streamed chunk or stage boundary.
+        """
+        self._cancelled.set()
+        if self.future is not None and self.future.cancel():
+            self._finish("cancelled")
+
+    def follow(self, cursor: int = 0, timeout: float = None) -> Iterator[tuple]:
+        """
+        Yields the job's events from `cursor` on, blocking until new ones
+        arrive, and returns once the job has finished.
+
+        Raises:
+            - JobCancelled: If the job was cancelled before it finished.
+            - Exception: The error the pipeline raised, if it failed.
+            - TimeoutError: If no event arrived within `timeout` seconds.
+        """
+        while True:
+            with self._changed:
+                if cursor == len(self.events) and not self.finished:
+                    if not self._changed.wait_for(
+                            lambda: cursor < len(self.events) or self.finished, timeout
+                    ):
+                        raise TimeoutError(f"No pipeline progress in {timeout}s")
+                new = self.events[cursor:]
+                status, error = self.status, self.error
+            for event in new:
+                yield event
+            cursor += len(new)
+            if not new and status == "error":
+                raise error
+            if not new and status == "cancelled":
+                raise JobCancelled(self.key)
+            if not new and status == "done":
+                return
+
+
+class JobExecutor:
+    """
+    A process-wide, bounded pool of pipeline runs with single-flight dedupe:
+    sessions submitting identical parameters while a run is queued or in
+    flight share that run instead of starting another one. Completed stages
+    land in a memo shared by every session, so later identical requests are
+    answered from it until JOB_MEMO_TTL has passed.
+
+    Usage:
+        job = executor.submit(params)
+        with executor.following(job):
+            for event in job.follow():
+                ...
+    """
+
+    def __init__(self, max_workers: int = JOB_WORKERS, max_queued: int = JOB_QUEUE, memo: StageMemo = None):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.memo = StageMemo(256, ttl=JOB_MEMO_TTL) if memo is None else memo
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix="quest0-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _update_gauges(self) -> None:
+        running = sum(job.status == "running" for job in self._jobs.values())
+        set_gauge("jobs_running", running)
+        set_gauge("jobs_queued", len(self._jobs) - running)
+
+    def submit(self, params: dict, fixed: dict = None, stream: bool = False) -> Job:
+        """
+        Starts a pipeline run, or joins the identical run already queued or running.
+
+        Args:
+            - params (dict): Run settings (see iter_pipeline)
+            - fixed (dict): Stage outputs to reuse as-is (see iter_pipeline)
+            - stream (bool): Publish ("token", ...) events while stages stream
+
+        Returns:
+            - Job: The run to follow. Call release() when done with it.
+
+        Raises:
+            - QueueFull: If max_workers runs are active and max_queued are waiting.
+        """
+        key = job_key(params, fixed, stream)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and not job.cancelled:
+                job.subscribers += 1
+                increment("jobs_coalesced")
+                return job
+            if len(self._jobs) >= self.max_workers + self.max_queued:
+                increment("jobs_rejected")
+                raise QueueFull(f"{len(self._jobs)} pipeline runs are active or waiting; try again shortly.")
+
+            job = Job(key, params, fixed, stream)
+            job.subscribers = 1
+            self._jobs[key] = job
+            job.future = self._pool.submit(self._run, job)
+            increment("jobs_submitted")
+            self._update_gauges()
+        return job
+
+    def release(self, job: Job) -> None:
+        """
+        Drops one follower of the job; a run nobody follows any more is cancelled.
+        """
+        with self._lock:
+            job.subscribers -= 1
+            orphaned = job.subscribers <= 0 and not job.finished
+            if orphaned and self._jobs.get(job.key) is job:
+                del self._jobs[job.key]
+                self._update_gauges()
+        if orphaned:
+            job.cancel()
+            increment("jobs_cancelled")
+
+    @contextmanager
+    def following(self, job: Job):
+        """
+        Releases the job when the block exits, however it exits (including a
+        Streamlit session being stopped mid-run).
+        """
+        try:
+            yield job
+        finally:
+            self.release(job)
+
+    def _run(self, job: Job) -> None:
+        try:
+            if job.cancelled:
+                raise JobCancelled(job.key)
+            with self._lock:
+                job.status = "running"
+                self._update_gauges()
+            profiler = (
+                profile(os.path.join(PROFILE_DIR, f"run-{time.strftime('%Y%m%d-%H%M%S')}-{job.key[:8]}.prof"))
+                if PROFILE_DIR else nullcontext()
+            )
+            with profiler:
+                runner = iter_pipeline(
+                    job.params, self.memo, job.fixed, on_token=job._on_token if job.stream else None
+                )
+                for stage_name, output, cached in runner:
+                    if job.cancelled:
+                        raise JobCancelled(job.key)
+                    job._publish(("stage", stage_name, output, cached))
+        except JobCancelled:
+            job._finish("cancelled")
+        except Exception as e:
+            increment("job_errors")
+            job._finish("error", e)
+        else:
+            job._finish("done")
+        finally:
+            with self._lock:
+                if self._jobs.get(job.key) is job:
+                    del self._jobs[job.key]
+                self._update_gauges()
@@ -0,0 +1,563 @@
+import contextvars
+import inspect
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from hashlib import sha256
+from typing import Iterator
+from agents.corpus import estimate_tokens
+from tools.cache import ResultCache
+from tools.config import getenv, load_config
+from tools.metrics import increment, record_usage, span
+
+# "off": never cache, "deterministic": cache temperature-0 calls only, "all": cache every call.
+CACHE_POLICY = getenv("QUEST0_LLM_CACHE", "deterministic")
+
+llm_cache = ResultCache(
+    path=getenv("QUEST0_LLM_CACHE_PATH", os.path.join(".cache", "quest0_llm.sqlite3")),
+    max_entries=int(getenv("QUEST0_LLM_CACHE_MAX_ENTRIES", "2000")),
+    ttls={"llm": float(getenv("QUEST0_CACHE_TTL_LLM", 7 * 24 * 60 * 60))},
+)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Returns the shared aisuite Client, created (and aisuite imported) on first use.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                load_config()
+                from aisuite import Client
+
+                _client = Client()
+    return _client
+
+
+def _describe_tool(tool) -> dict:
+    if callable(tool):
+        return {
+            "name": tool.__name__,
+            "signature": str(inspect.signature(tool)),
+            "doc": inspect.getdoc(tool),
+        }
+    return tool
+
+
+def completion_key(provider: str, model: str, messages: list, tools: list = None, **params) -> str:
+    """
+    Content-addressed cache key for one completion request.
+    """
+    payload = json.dumps(
+        {
+            "model": f"{provider}:{model}",
+            "messages": messages,
+            "tools": [_describe_tool(tool) for tool in tools or []],
+            "params": params,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _should_cache(temperature: float, cache: bool = None) -> bool:
+    if cache is not None:
+        return cache
+    if CACHE_POLICY == "all":
+        return True
+    return CACHE_POLICY == "deterministic" and not temperature
+
+
+def chat(
+        provider: str,
+        model: str,
+        messages: list,
+        temperature: float = 1.0,
+        tools: list = None,
+        cache: bool = None,
+        **kwargs
+) -> str:
+    """
+    Runs one chat completion through the shared aisuite client and returns its content.
+
+    Responses are cached on disk keyed by provider, model, messages, tools,
+    temperature and the remaining arguments. By default only temperature-0 calls
+    are cached (see QUEST0_LLM_CACHE); pass cache=True/False to override per call.
+    Inside a call_policy block, failed or slow calls fail over to other models.
+
+    Args:
+        - provider (str): aisuite provider key, e.g. "openai"
+        - model (str): Model name for the provider
+        - messages (list): Chat messages
+        - temperature (float): Sampling temperature (default 1.0)
+        - tools (list): Optional tool functions for aisuite's tool loop
+        - cache (bool): Force caching on or off for this call
+
+    Returns:
+        - str: The message content of the first choice.
+    """
+    use_cache = _should_cache(temperature, cache)
+    if use_cache:
+        key = completion_key(
+            provider, model, messages, tools, temperature=temperature, **kwargs
+        )
+        cached = llm_cache.lookup("llm", key)
+        increment("llm_cache", result="miss" if cached is None else "hit")
+        if cached is not None:
+            return cached
+
+    if tools:
+        kwargs.update(tools=tools, tool_choice=kwargs.get("tool_choice", "auto"))
+
+    policy = _policy.get()
+    if policy is None:
+        response = _create(provider, model, messages, temperature, **kwargs)
+    else:
+        kind = "tools" if tools else "chat"
+        response = _resilient_create(provider, model, messages, temperature, policy, kind, **kwargs)
+    content = response.choices[0].message.content
+
+    if use_cache and content:
+        llm_cache.store("llm", key, content)
+    return content
+
+
+def parse_models(value) -> list[tuple[str, str]]:
+    """
+    Parses "provider:model" entries (a comma-separated string or a list) into
+    (provider, model) pairs.
+    """
+    if isinstance(value, str):
+        value = value.split(",")
+    models = []
+    for item in value or []:
+        if isinstance(item, str):
+            provider, _, model = item.strip().partition(":")
+            if provider and model:
+                models.append((provider.lower(), model))
+        else:
+            models.append((str(item[0]).lower(), item[1]))
+    return models
+
+
+# API key each hosted provider needs (providers not listed, e.g. ollama, need none)
+PROVIDER_KEYS = {
+    "openai": "OPENAI_API_KEY",
+    "anthropic": "ANTHROPIC_API_KEY",
+    "mistral": "MISTRAL_API_KEY",
+    "groq": "GROQ_API_KEY",
+}
+
+
+def provider_available(provider: str) -> bool:
+    """
+    Whether a provider can be called (its API key, if it needs one, is set).
+    """
+    key = PROVIDER_KEYS.get(provider.lower())
+    return key is None or bool(getenv(key))
+
+
+# Ordered fallback models tried when a call fails, e.g. "groq:llama-3.3-70b-versatile,openai:gpt-4o-mini"
+DEFAULT_FALLBACKS = parse_models(getenv("QUEST0_LLM_FALLBACKS", ""))
+# Send a hedged duplicate once a call exceeds this latency percentile of its model (0 = off)
+HEDGE_PERCENTILE = float(getenv("QUEST0_LLM_HEDGE_PERCENTILE", "0"))
+# Successful calls a model needs before its percentile is trusted for hedging
+HEDGE_MIN_SAMPLES = 10
+# Longest pause allowed between the chunks of a streamed call inside a call_policy block
+STREAM_IDLE_TIMEOUT = float(getenv("QUEST0_LLM_STREAM_IDLE_TIMEOUT", "60"))
+# Abandoned attempts (hedge losers, deadline overruns) that may still occupy an
+# attempt thread; while this many are running, no hedges are sent
+MAX_ABANDONED_ATTEMPTS = int(getenv("QUEST0_LLM_MAX_ABANDONED", "16"))
+
+_policy = contextvars.ContextVar("quest0_llm_policy", default=None)
+_conversation = contextvars.ContextVar("quest0_llm_conversation", default=None)
+_latencies = {}
+_latency_lock = threading.Lock()
+_attempts = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-attempt")
+_abandoned = {"running": 0}
+_abandoned_lock = threading.Lock()
+
+
+@contextmanager
+def call_policy(fallbacks: list = None, deadline: float = None, hedge_percentile: float = None):
+    """
+    Makes every chat() and chat_stream() call in the block (and in threads that
+    copy the context) resilient.
+
+    Args:
+        - fallbacks (list): (provider, model) pairs or "provider:model" strings,
+          tried in order when a call errors or returns nothing (default DEFAULT_FALLBACKS)
+        - deadline (float): Seconds the whole block may take; calls still running
+          at the deadline are abandoned and raise TimeoutError. A streamed call
+          must deliver its first text by the deadline, after which it may run on
+          as long as no pause exceeds STREAM_IDLE_TIMEOUT
+        - hedge_percentile (float): e.g. 0.95 sends a duplicate request to the next
+          fallback once a call runs longer than that percentile of its model's
+          recent latencies for the same kind of call; the first good response
+          wins (default HEDGE_PERCENTILE). Tool loops are never hedged, since
+          the duplicate would run the tools again
+    """
+    policy = {
+        "fallbacks": parse_models(DEFAULT_FALLBACKS if fallbacks is None else fallbacks),
+        "deadline_at": time.monotonic() + deadline if deadline else None,
+        "hedge_percentile": HEDGE_PERCENTILE if hedge_percentile is None else hedge_percentile,
+    }
+    token = _policy.set(policy)
+    try:
+        yield policy
+    finally:
+        _policy.reset(token)
+
+
+def _record_latency(name: str, kind: str, seconds: float) -> None:
+    with _latency_lock:
+        _latencies.setdefault((name, kind), deque(maxlen=200)).append(seconds)
+
+
+def latency_percentile(name: str, percentile: float, kind: str = "chat") -> float | None:
+    """
+    The given percentile of a "provider:model"'s recent successful call latencies,
+    or None until it has HEDGE_MIN_SAMPLES of them.
+
+    Kinds are kept apart: "chat" (one completion), "tools" (a whole tool loop)
+    and "stream" (time to the first streamed text).
+    """
+    with _latency_lock:
+        samples = sorted(_latencies.get((name, kind), ()))
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return None
+    return samples[min(len(samples) - 1, int(percentile * len(samples)))]
+
+
+def current_conversation() -> object | None:
+    """
+    A token identifying the completion whose tool loop is running, for tools
+    that keep per-conversation state: every attempt of a call (failover or
+    hedge) is a conversation of its own. None outside a completion.
+    """
+    return _conversation.get()
+
+
+def _create(provider: str, model: str, messages: list, temperature: float, **kwargs):
+    name = f"{provider}:{model}"
+    start = time.perf_counter()
+    # aisuite runs the tools of its loop on this thread, inside this call
+    token = _conversation.set(object())
+    try:
+        with span("llm_call", model=name):
+            response = get_client().chat.completions.create(
+                model=name,
+                # aisuite's tool loop appends to the list, so concurrent attempts get their own copy
+                messages=list(messages),
+                temperature=temperature,
+                **kwargs
+            )
+    finally:
+        _conversation.reset(token)
+    _record_latency(name, "tools" if kwargs.get("tools") else "chat", time.perf_counter() - start)
+    record_usage(getattr(response, "usage", None), model=name)
+    return response
+
+
+def _attempt(provider: str, model: str, messages: list, temperature: float, **kwargs):
+    response = _create(provider, model, messages, temperature, **kwargs)
+    if not response.choices[0].message.content:
+        raise ValueError("empty response")
+    return response
+
+
+class _OpenStream:
+    """
+    A streamed completion whose first text has arrived; next_chunk() returns
+    the rest. The remaining chunks are read by a thread of the stream's own,
+    so a pause measures the provider, not contention for the attempt pool.
+    """
+
+    def __init__(self, name: str, response, chunks: Iterator, first: str):
+        self.name = name
+        self.response = response
+        self.chunks = chunks
+        self.first = first
+        self.usage_recorded = False
+        self._queue = None
+        self._closed = False
+
+    def _read(self) -> None:
+        try:
+            for chunk in self.chunks:
+                if self._closed:
+                    return
+                self._queue.put((chunk, None))
+            self._queue.put((None, None))
+        except Exception as e:
+            self._queue.put((None, e))
+
+    def next_chunk(self, timeout: float):
+        """
+        The stream's next chunk (None at its end), or TimeoutError if none
+        arrives within `timeout` seconds.
+        """
+        if self._queue is None:
+            self._queue = queue.Queue()
+            threading.Thread(target=self._read, name="llm-stream", daemon=True).start()
+        try:
+            chunk, error = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            increment("llm_stream_idle_timeouts")
+            self.close()
+            raise TimeoutError(f"LLM stream stalled for more than {timeout:g}s") from None
+        if error is not None:
+            raise error
+        return chunk
+
+    def close(self) -> None:
+        self._closed = True
+        # Closing the HTTP response also unblocks the reader waiting on the next chunk
+        close = getattr(self.response, "close", None)
+        if close is not None:
+            try:
+                close()
+            except Exception:
+                # Best effort: e.g. a generator cannot be closed while another thread runs it
+                pass
+
+
+def _streaming_unsupported(error: Exception) -> bool:
+    # aisuite's base Provider raises LLMError("... does not support streaming ...")
+    return isinstance(error, NotImplementedError) or (
+        type(error).__name__ == "LLMError" and "does not support streaming" in str(error)
+    )
+
+
+def _open_stream(provider: str, model: str, messages: list, temperature: float, **kwargs) -> _OpenStream:
+    name = f"{provider}:{model}"
+    start = time.perf_counter()
+    try:
+        response = get_client().chat.completions.create(
+            model=name,
+            messages=messages,
+            temperature=temperature,
+            stream=True,
+            **kwargs
+        )
+    except Exception as e:
+        if not _streaming_unsupported(e):
+            raise
+        # This provider cannot stream: one completion stands in for the whole stream
+        response = _attempt(provider, model, messages, temperature, **kwargs)
+        stream = _OpenStream(name, None, iter(()), response.choices[0].message.content)
+        stream.usage_recorded = True
+        return stream
+    chunks = iter(response)
+    for chunk in chunks:
+        text = _chunk_text(chunk)
+        if text:
+            _record_latency(name, "stream", time.perf_counter() - start)
+            return _OpenStream(name, response, chunks, text)
+    raise ValueError("empty response")
+
+
+def _release_abandoned(future) -> None:
+    with _abandoned_lock:
+        _abandoned["running"] -= 1
+    if not future.cancelled() and future.exception() is None and isinstance(future.result(), _OpenStream):
+        future.result().close()
+
+
+def _abandon(futures) -> None:
+    """
+    Gives up on attempts nobody will wait for. Queued ones are cancelled; running
+    ones count against MAX_ABANDONED_ATTEMPTS until they finish, and a stream
+    they opened is closed.
+    """
+    for future in futures:
+        if future.cancel():
+            continue
+        with _abandoned_lock:
+            _abandoned["running"] += 1
+        if not future.done():
+            increment("llm_abandoned_attempts")
+        future.add_done_callback(_release_abandoned)
+
+
+def _resilient_create(provider: str, model: str, messages: list, temperature: float, policy: dict, kind: str, **kwargs):
+    """
+    Runs one completion under a call policy: failover through the fallback
+    models, an optional hedged duplicate, and the block's deadline. For kind
+    "stream" the attempts open streams and the first to deliver text wins.
+    """
+    attempt = _open_stream if kind == "stream" else _attempt
+    candidates = [(provider, model)]
+    candidates += [c for c in policy["fallbacks"] if c not in candidates]
+    pending, errors = {}, []
+    state = {"next": 0, "hedged": kind == "tools"}
+
+    def launch() -> None:
+        name = "{}:{}".format(*candidates[state["next"]])
+        context = contextvars.copy_context()
+        future = _attempts.submit(context.run, attempt, *candidates[state["next"]], messages, temperature, **kwargs)
+        pending[future] = (name, time.monotonic())
+        state["next"] += 1
+
+    try:
+        launch()
+        while pending:
+            now = time.monotonic()
+            timeout = policy["deadline_at"] - now if policy["deadline_at"] else None
+            if timeout is not None and timeout <= 0:
+                increment("llm_deadline_exceeded")
+                raise TimeoutError(
+                    f"LLM call exceeded its deadline ({', '.join(name for name, _ in pending.values())})"
+                )
+
+            hedge_at = None
+            if policy["hedge_percentile"] and not state["hedged"] and state["next"] < len(candidates):
+                name, started = next(iter(pending.values()))
+                threshold = latency_percentile(name, policy["hedge_percentile"], kind)
+                if threshold is not None:
+                    hedge_at = started + threshold
+                    timeout = max(0, hedge_at - now) if timeout is None else max(0, min(timeout, hedge_at - now))
+
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                if hedge_at is not None and time.monotonic() >= hedge_at:
+                    state["hedged"] = True
+                    with _abandoned_lock:
+                        saturated = _abandoned["running"] >= MAX_ABANDONED_ATTEMPTS
+                    if saturated:
+                        increment("llm_hedges_skipped")
+                    else:
+                        increment("llm_hedges", model=next(iter(pending.values()))[0])
+                        launch()
+                continue
+
+            for future in done:
+                name, _ = pending.pop(future)
+                try:
+                    response = future.result()
+                except Exception as e:
+                    increment("llm_failures", model=name, error=type(e).__name__)
+                    errors.append(f"{name}: {e}")
+                    continue
+                if name != f"{provider}:{model}":
+                    increment("llm_failovers", model=name)
+                return response
+
+            if not pending and state["next"] < len(candidates):
+                launch()
+    finally:
+        _abandon(pending)
+
+    raise RuntimeError("All models failed: " + "; ".join(errors))
+
+
+def _chunk_text(chunk) -> str:
+    try:
+        return chunk.choices[0].delta.content or ""
+    except (AttributeError, IndexError):
+        return ""
+
+
+def chat_stream(
+        provider: str,
+        model: str,
+        messages: list,
+        temperature: float = 1.0,
+        cache: bool = None,
+        **kwargs
+) -> Iterator[str]:
+    """
+    Streaming variant of chat: yields the completion text as it arrives.
+
+    A cache hit is yielded as a single chunk. Providers whose aisuite adapter
+    cannot stream fall back to one non-streamed completion. Inside a call_policy
+    block, a stream that fails or is slow to start fails over to other models,
+    and one that stalls mid-way raises TimeoutError.
+
+    Yields:
+        - str: Successive pieces of the message content.
+    """
+    use_cache = _should_cache(temperature, cache)
+    key = completion_key(provider, model, messages, None, temperature=temperature, **kwargs)
+    if use_cache:
+        cached = llm_cache.lookup("llm", key)
+        increment("llm_cache", result="miss" if cached is None else "hit")
+        if cached is not None:
+            yield cached
+            return
+
+    # aisuite refuses max_turns on streamed calls (there is no tool loop to bound).
+    stream_kwargs = {k: v for k, v in kwargs.items() if k != "max_turns"}
+    increment("llm_call", model=f"{provider}:{model}", stream=True)
+
+    parts, usage, usage_recorded = [], None, False
+    name = f"{provider}:{model}"
+    policy = _policy.get()
+    try:
+        if policy is None:
+            response = get_client().chat.completions.create(
+                model=f"{provider}:{model}",
+                messages=messages,
+                temperature=temperature,
+                stream=True,
+                **stream_kwargs
+            )
+            for chunk in response:
+                usage = getattr(chunk, "usage", None) or usage
+                text = _chunk_text(chunk)
+                if text:
+                    parts.append(text)
+                    yield text
+        else:
+            stream = _resilient_create(provider, model, messages, temperature, policy, "stream", **stream_kwargs)
+            name, usage_recorded = stream.name, stream.usage_recorded
+            try:
+                parts.append(stream.first)
+                yield stream.first
+                while True:
+                    chunk = stream.next_chunk(STREAM_IDLE_TIMEOUT)
+                    if chunk is None:
+                        break
+                    usage = getattr(chunk, "usage", None) or usage
+                    text = _chunk_text(chunk)
+                    if text:
+                        parts.append(text)
+                        yield text
+            finally:
+                stream.close()
+    except Exception:
+        # Under a policy, providers that cannot stream were already answered by
+        # one completion, and other failures went through every fallback model
+        if parts or policy is not None:
+            raise
+        # Streaming unsupported by this provider: fall back to one completion
+        # (which records its own usage).
+        content = chat(provider, model, messages, temperature, cache=False, **kwargs)
+        yield content or ""
+    else:
+        content = "".join(parts)
+        if usage is None and not usage_recorded:
+            # Most providers only report a stream's usage in its last chunk when
+            # asked to, so it is usually estimated from the text instead.
+            increment("llm_usage_estimated", model=name)
+            prompt_tokens = sum(estimate_tokens(str(message.get("content") or "")) for message in messages)
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": estimate_tokens(content),
+                "total_tokens": prompt_tokens + estimate_tokens(content),
+            }
+        record_usage(usage, model=name)
+
+    if use_cache and content:
+        llm_cache.store("llm", key, content)
@@ -0,0 +1,219 @@
+import contextvars
+import json
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import AbstractContextManager
+from typing import Callable
+from agents.corpus import normalize_title
+from agents.parsing import JsonItemStream, parse_items
+from tools.metrics import increment, span
+
+# Stages an OverlappedRun computes, and the limits its merge step enforces.
+OVERLAPPED_STAGES = ("analysis", "gaps", "topics")
+MIN_GAPS, MAX_GAPS = 3, 8
+MIN_TOPICS, MAX_TOPICS = 3, 10
+
+
+def round_robin(batches: list[list], field: str, limit: int) -> list[tuple[int, dict]]:
+    """
+    Interleaves batches (the first item of every batch, then the second, ...),
+    skipping items whose normalized `field` was already taken, so that every
+    batch is represented before any batch gets a second item.
+
+    Returns:
+        - list[tuple[int, dict]]: At most `limit` (batch index, item) pairs.
+    """
+    merged, seen = [], set()
+    for position in range(max((len(b) for b in batches), default=0)):
+        for index, batch in enumerate(batches):
+            if len(merged) >= limit:
+                return merged
+            if position >= len(batch) or not isinstance(batch[position], dict):
+                continue
+            key = normalize_title(str(batch[position].get(field, "")))
+            if key and key not in seen:
+                seen.add(key)
+                merged.append((index, batch[position]))
+    return merged
+
+
+def _gap_key(gap) -> str:
+    return normalize_title(str(gap.get("gap_title", ""))) if isinstance(gap, dict) else ""
+
+
+class OverlappedRun:
+    """
+    Runs analysis, gap identification and topic generation as overlapping
+    streams instead of one after the other:
+
+    - the analysis streams, and every `theme_batch_size` themes are sent to
+      gap identification as soon as they close;
+    - every finished gap batch is sent to topic generation right away;
+    - once all batches are in, the merge step interleaves them, drops
+      duplicates and enforces MIN_GAPS..MAX_GAPS gaps and MIN_TOPICS..MAX_TOPICS
+      topics, keeping only topics whose "gap_title" is a kept gap. Too few gaps
+      (or topics) fall back to one call over the whole analysis (or gap list),
+      as in sequential mode.
+
+    The stage functions are passed in, so the run knows nothing about models:
+        analyze(on_token) -> str
+        identify_gaps(analysis_json, min_gaps, max_gaps) -> str
+        generate_topics(gaps_json, min_topics, max_topics) -> str
+
+    Each task runs under `stage_context(stage name)` (the stage's call policy)
+    in a copy of `context`, inside a "stage_task" span; the counters of those
+    spans are summed per stage in `counts`.
+    """
+
+    def __init__(
+            self,
+            analyze: Callable[[Callable], str],
+            identify_gaps: Callable[[str, int, int], str],
+            generate_topics: Callable[[str, int, int], str],
+            stage_context: Callable[[str], AbstractContextManager],
+            context: contextvars.Context = None,
+            on_token: Callable[[str, str], None] = None,
+            theme_batch_size: int = 2,
+            max_workers: int = 4
+    ):
+        self.analyze = analyze
+        self.identify_gaps = identify_gaps
+        self.generate_topics = generate_topics
+        self.stage_context = stage_context
+        self.context = contextvars.copy_context() if context is None else context
+        self.on_token = on_token
+        self.theme_batch_size = max(1, theme_batch_size)
+        self.counts = {name: {} for name in OVERLAPPED_STAGES}
+        self.results = {name: Future() for name in OVERLAPPED_STAGES}
+
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix="quest0-overlap")
+        self._lock = threading.Lock()
+        self._themes = JsonItemStream("themes")
+        self._dispatched = 0
+        self._gap_futures = []
+        self._topic_futures = {}
+        # Set by the gap merge: every batch's gaps, and the keys of those it kept
+        self._gap_batches = None
+        self._kept_gaps = set()
+        threading.Thread(target=self._drive, daemon=True).start()
+
+    def result(self, stage_name: str, timeout: float = None) -> str:
+        """
+        Waits for a stage's merged output (re-raising the error if the run failed).
+        """
+        return self.results[stage_name].result(timeout)
+
+    def _run_task(self, stage_name: str, func: Callable, *args):
+        def task():
+            with span("stage_task", stage=stage_name) as record, self.stage_context(stage_name):
+                try:
+                    return func(*args)
+                finally:
+                    with self._lock:
+                        counts = self.counts[stage_name]
+                        for counter, value in record["counts"].items():
+                            counts[counter] = counts.get(counter, 0) + value
+
+        return self.context.copy().run(task)
+
+    def _submit(self, stage_name: str, func: Callable, *args) -> Future:
+        return self._pool.submit(self._run_task, stage_name, func, *args)
+
+    # -- analysis ---------------------------------------------------------
+
+    def _on_analysis_token(self, chunk: str) -> None:
+        if self.on_token is not None:
+            self.on_token("analysis", chunk)
+        self._themes.feed(chunk)
+        while len(self._themes.items) - self._dispatched >= self.theme_batch_size:
+            self._dispatch(self._themes.items[self._dispatched:self._dispatched + self.theme_batch_size])
+
+    def _dispatch(self, themes: list) -> None:
+        index = len(self._gap_futures)
+        self._dispatched += len(themes)
+        self._gap_futures.append(self._submit("gaps", self._gap_batch, index, themes))
+
+    def _drive(self) -> None:
+        try:
+            analysis = self._run_task("analysis", self.analyze, self._on_analysis_token)
+            # Themes that never streamed (non-streamed or sharded analysis), or a short last batch
+            themes = parse_items(analysis, "themes") or []
+            for start in range(self._dispatched, len(themes), self.theme_batch_size):
+                self._dispatch(themes[start:start + self.theme_batch_size])
+            self.results["analysis"].set_result(analysis)
+
+            gaps = self._merge_gaps(analysis)
+            self.results["gaps"].set_result(gaps)
+            self.results["topics"].set_result(self._merge_topics(gaps))
+        except BaseException as e:
+            for future in self.results.values():
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    # -- gaps and topics --------------------------------------------------
+
+    def _gap_batch(self, index: int, themes: list) -> list:
+        summary = json.dumps({"themes": themes})
+        try:
+            gaps = parse_items(self.identify_gaps(summary, 1, min(MAX_GAPS, len(themes) + 1)), "research_gaps")
+        except Exception:
+            gaps = None
+        if not gaps:
+            increment("overlap_batch_errors", stage="gaps")
+            return []
+        # Topics for this batch start now, while later themes are still being analyzed
+        self._topic_futures[index] = self._submit("topics", self._topic_batch, gaps)
+        return gaps
+
+    def _topic_batch(self, gaps: list) -> list:
+        try:
+            output = self.generate_topics(
+                json.dumps({"research_gaps": gaps}), 1, min(MAX_TOPICS, len(gaps))
+            )
+            topics = parse_items(output, "research_topics")
+        except Exception:
+            topics = None
+        if not topics:
+            increment("overlap_batch_errors", stage="topics")
+        return topics or []
+
+    def _merge_gaps(self, analysis: str) -> str:
+        batches = [future.result() for future in self._gap_futures]
+        merged = round_robin(batches, "gap_title", MAX_GAPS)
+        if len(merged) < MIN_GAPS:
+            # Too little came back per batch: identify gaps over the whole analysis instead
+            increment("overlap_fallbacks", stage="gaps")
+            return self._run_task("gaps", self.identify_gaps, analysis, MIN_GAPS, MAX_GAPS)
+        self._gap_batches = batches
+        self._kept_gaps = {_gap_key(gap) for _, gap in merged}
+        return json.dumps({"research_gaps": [gap for _, gap in merged]})
+
+    def _derived_from_kept_gaps(self, index: int, topic: dict) -> bool:
+        """
+        Whether a batch's topic addresses a gap the merge kept: the gap named
+        by its "gap_title", or, for a topic naming none of the batch's gaps,
+        every gap of its batch.
+        """
+        batch_gaps = {_gap_key(gap) for gap in self._gap_batches[index]} - {""}
+        gap = normalize_title(str(topic.get("gap_title") or ""))
+        if gap and gap in batch_gaps:
+            return gap in self._kept_gaps
+        return batch_gaps <= self._kept_gaps
+
+    def _merge_topics(self, gaps_json: str) -> str:
+        batches = []
+        # After a gap fallback no batch's topics match the gaps, so all are regenerated
+        if self._gap_batches is not None:
+            for index in sorted(self._topic_futures):
+                topics = self._topic_futures[index].result()
+                kept = [t for t in topics if isinstance(t, dict) and self._derived_from_kept_gaps(index, t)]
+                if len(kept) < len(topics):
+                    increment("overlap_topics_dropped", len(topics) - len(kept))
+                batches.append(kept)
+        merged = round_robin(batches, "topic_title", MAX_TOPICS)
+        if len(merged) < MIN_TOPICS:
+            increment("overlap_fallbacks", stage="topics")
+            return self._run_task("topics", self.generate_topics, gaps_json, MIN_TOPICS, MAX_TOPICS)
+        return json.dumps({"research_topics": [topic for _, topic in merged]})
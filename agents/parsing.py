@@ -0,0 +1,242 @@
+import json
+import re
+from typing import Iterable, Iterator
+
+_decoder = json.JSONDecoder()
+
+# Full-parse attempts before giving up on a response (each starts at a later bracket).
+MAX_PARSE_ATTEMPTS = 20
+
+_FENCE = re.compile(r"```[A-Za-z]*\s*(.*?)```", re.S)
+
+# How the agents report a failed completion (see agents.agents._complete).
+MODEL_ERROR = "[Model Error"
+
+
+def is_model_error(output) -> bool:
+    """
+    Whether a stage output reports a model error, including a streamed
+    completion that failed after some chunks had already arrived.
+    """
+    return MODEL_ERROR in str(output)
+
+
+def _scan(text: str) -> Iterator:
+    # Complete top-level JSON objects and arrays, in order of appearance
+    failures, index = 0, 0
+    while failures < MAX_PARSE_ATTEMPTS:
+        starts = [i for i in (text.find("{", index), text.find("[", index)) if i != -1]
+        if not starts:
+            return
+        index = min(starts)
+        try:
+            value, index = _decoder.raw_decode(text, index)
+        except json.JSONDecodeError:
+            failures += 1
+            index += 1
+            continue
+        yield value
+
+
+def _json_values(text: str) -> Iterator:
+    # Fenced JSON is what the model meant to answer with, so it is tried first
+    for match in _FENCE.finditer(text):
+        yield from _scan(match.group(1))
+    yield from _scan(text)
+
+
+def _is_records(value, item_type: type = dict) -> bool:
+    return isinstance(value, list) and bool(value) and all(isinstance(item, item_type) for item in value)
+
+
+def parse_json(text: str, key: str = None):
+    """
+    Tolerantly parses model output as JSON. Code fences and any prose around
+    the JSON are ignored, and brackets in the prose (e.g. "see [1]") are
+    skipped: fenced JSON is tried first, then each complete JSON value in order.
+
+    Args:
+        - text (str): Model output
+        - key (str): If given, only an object containing this key is accepted
+
+    Returns:
+        - dict | list | None: The first object containing `key` (or, without a
+          key, the first object or list of objects), or None. Model errors give None.
+    """
+    if not isinstance(text, str):
+        return text if isinstance(text, (dict, list)) else None
+    if is_model_error(text):
+        return None
+
+    for value in _json_values(text):
+        if key is not None:
+            if isinstance(value, dict) and key in value:
+                return value
+        elif isinstance(value, dict) or _is_records(value):
+            return value
+    return None
+
+
+class JsonItemStream:
+    """
+    Incrementally extracts the elements of one JSON array from streamed text.
+
+    The target array is `key` inside the top-level object (e.g. the "corpus"
+    in {"corpus": [...]}), or the top-level array itself when the model
+    answers with a bare list. Text before the JSON (prose, code fences) is
+    skipped, and so is any bracketed value that closes without yielding an
+    element (e.g. "see [1]" in prose). Each element of type `item_type` is
+    parsed and returned as soon as it closes; other elements are dropped.
+
+    Usage:
+        stream = JsonItemStream("corpus")
+        for chunk in chunks:
+            for paper in stream.feed(chunk):
+                ...
+    """
+
+    def __init__(self, key: str = None, item_type: type = dict):
+        self.key = key
+        self.item_type = item_type
+        self.text = ""
+        self.items = []
+        self.done = False
+        self._pos = 0
+        self._root = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string = None
+        self._member = None
+        self._array_depth = None
+        self._item_start = None
+
+    @property
+    def found_array(self) -> bool:
+        """
+        Whether the target array has been opened yet.
+        """
+        return self._array_depth is not None
+
+    def _is_target(self) -> bool:
+        if self._root == "[":
+            return self._depth == 1
+        return self._depth == 2 and (self.key is None or self._member == self.key)
+
+    def _emit(self, end: int, found: list) -> None:
+        try:
+            item = json.loads(self.text[self._item_start:end])
+        except json.JSONDecodeError:
+            item = None
+        if isinstance(item, self.item_type):
+            self.items.append(item)
+            found.append(item)
+        self._item_start = None
+
+    def _reset_root(self) -> None:
+        # The value closed without the target array: keep looking after it
+        self._root = None
+        self._member = None
+        self._last_string = None
+        self._array_depth = None
+
+    def feed(self, chunk: str) -> list:
+        """
+        Adds a chunk of text and returns the elements completed by it.
+        """
+        self.text += chunk
+        found = []
+        text = self.text
+
+        while self._pos < len(text) and not self.done:
+            pos, c = self._pos, text[self._pos]
+            self._pos += 1
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_string = text[self._string_start + 1:pos]
+                continue
+
+            if self._root is None:
+                if c not in "{[":
+                    continue
+                self._root = c
+
+            in_array = self._array_depth is not None and self._depth == self._array_depth
+            if in_array and self._item_start is None and c not in " \t\r\n,]":
+                self._item_start = pos
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = pos
+            elif c == ":" and self._depth == 1:
+                self._member = self._last_string
+            elif c in "{[":
+                self._depth += 1
+                if self._array_depth is None and c == "[" and self._is_target():
+                    self._array_depth = self._depth
+            elif c in "}]":
+                if in_array and c == "]":
+                    if self._item_start is not None:
+                        self._emit(pos, found)
+                    if self.items:
+                        self.done = True
+                    else:
+                        self._array_depth = None
+                self._depth -= 1
+                if self._depth == 0 and not self.done:
+                    self._reset_root()
+            elif c == "," and in_array and self._item_start is not None:
+                self._emit(pos, found)
+
+        return found
+
+
+def iter_items(chunks: Iterable[str], key: str = None, item_type: type = dict) -> Iterator:
+    """
+    Yields the elements of the target array (see JsonItemStream) as they
+    close in a stream of text chunks.
+    """
+    stream = JsonItemStream(key, item_type)
+    for chunk in chunks:
+        yield from stream.feed(chunk)
+
+
+def parse_items(text: str, key: str = None, item_type: type = dict) -> list | None:
+    """
+    Extracts a list of items from model output shaped as {key: [...]} or as a
+    bare array of `item_type` items, tolerating fences and prose. If the output
+    does not parse as a whole (e.g. it was cut off), the elements that did
+    close are salvaged. Items of other types are dropped.
+
+    Returns:
+        - list | None: The items, or None for model errors and output without a
+          non-empty list of `item_type` items.
+    """
+    if is_model_error(text):
+        return None
+    value = parse_json(text, key)
+    if isinstance(value, dict):
+        items = value.get(key) if key else next((v for v in value.values() if isinstance(v, list)), None)
+    elif isinstance(value, list):
+        items = value
+    elif isinstance(text, str):
+        # A bare array of items (a list of anything else is not an answer)
+        items = next((v for v in _json_values(text) if _is_records(v, item_type)), None)
+    else:
+        items = None
+    if isinstance(items, list):
+        return [item for item in items if isinstance(item, item_type)] or None
+
+    if not isinstance(text, str):
+        return None
+    stream = JsonItemStream(key, item_type)
+    stream.feed(text)
+    return stream.items or None
@@ -0,0 +1,400 @@
+import contextvars
+import functools
+import json
+import threading
+import time
+from collections import OrderedDict
+from hashlib import sha256
+from typing import Callable, Iterator, NamedTuple
+from agents.agents import (
+    corpus_collector, corpus_analyzer, corpus_analyzer_sharded, gap_identifier, topic_generator
+)
+from agents.corpus import compact_corpus, load_corpus
+from agents.llm import DEFAULT_FALLBACKS, call_policy, parse_models, provider_available
+from agents.overlap import OVERLAPPED_STAGES, OverlappedRun
+from agents.parsing import MODEL_ERROR, is_model_error
+from tools.config import getenv
+from tools.metrics import increment, log_event, set_gauge, span, write_prometheus
+
+
+class Stage(NamedTuple):
+    """
+    One pipeline stage: the settings it reads and the upstream stages it consumes.
+    """
+    name: str
+    func: Callable[..., str]
+    params: tuple
+    deps: tuple = ()
+
+
+# Per-stage models: "fast" routes the mechanical stages to a small, fast model and
+# keeps a larger one for topic generation; "single" uses the selected model everywhere.
+ROUTING_PROFILES = {
+    "fast": {
+        "corpus": "groq:llama-3.1-8b-instant",
+        "analysis": "groq:llama-3.1-8b-instant",
+        "gaps": "groq:llama-3.1-8b-instant",
+        "topics": "groq:llama-3.3-70b-versatile",
+    },
+    "single": {},
+}
+DEFAULT_ROUTING = getenv("QUEST0_ROUTING", "fast")
+
+
+def stage_model(params: dict, stage_name: str) -> tuple[str, str]:
+    """
+    The (provider, model) a stage runs on: params["stage_models"] if given,
+    else the params["routing"] profile (default QUEST0_ROUTING). Stages without
+    a route, or routed to a provider with no API key, use params["provider"/"model"].
+    """
+    routes = params.get("stage_models")
+    if routes is None:
+        routes = ROUTING_PROFILES.get(params.get("routing") or DEFAULT_ROUTING, {})
+    route = parse_models([routes[stage_name]]) if routes.get(stage_name) else []
+    if route and provider_available(route[0][0]):
+        return route[0]
+    return params["provider"], params["model"]
+
+
+def _consume(chunks, on_token: Callable[[str], None]) -> str:
+    """
+    Drains a streamed completion, forwarding each chunk to on_token. A stream
+    that fails part-way returns only the error, not the partial output.
+    """
+    parts = []
+    for chunk in chunks:
+        on_token(chunk)
+        if chunk.startswith(MODEL_ERROR):
+            return chunk
+        parts.append(chunk)
+    return "".join(parts)
+
+
+def _collect(params: dict, upstream: dict, on_token: Callable = None) -> str:
+    provider, model = stage_model(params, "corpus")
+    return corpus_collector(
+        domain=params["domain"],
+        provider=provider,
+        model=model,
+        temperature=params["temperature"],
+        mode=params.get("collection_mode", "agent")
+    )
+
+
+@functools.lru_cache(maxsize=32)
+def _prepare_corpus(
+        corpus_json: str, domain: str, rank_top_k: int, analyzer_budget: int, shard_size: int
+) -> tuple[str, str, dict]:
+    if rank_top_k:
+        from agents.ranking import rank_corpus  # NumPy is loaded on first use
+
+        # Dedupe and keep the most relevant, recent papers before any tokens are spent
+        corpus_json = rank_corpus(corpus_json, domain, rank_top_k)
+    papers = len(load_corpus(corpus_json) or [])
+    report = {"papers": papers, "shards": -(-papers // shard_size) if papers > shard_size else 1}
+    analyzer_json = corpus_json
+    if papers <= shard_size and analyzer_budget:
+        # Sharded analysis compacts each shard itself
+        analyzer_json, report["compaction"] = compact_corpus(corpus_json, token_budget=analyzer_budget)
+    return corpus_json, analyzer_json, report
+
+
+def prepare_corpus(corpus_json: str, params: dict) -> tuple[str, str, dict]:
+    """
+    The corpus as the analysis stage sees it, for these params: ranked (see
+    agents.ranking), then compacted when it is analyzed in a single call.
+    Cached, so rendering a run reuses the stage's work instead of redoing it.
+
+    Returns:
+        - tuple[str, str, dict]: The ranked corpus JSON, the JSON sent to the
+          analyzer, and a report {"papers", "shards", "compaction" (if compacted)}.
+    """
+    return _prepare_corpus(
+        corpus_json if isinstance(corpus_json, str) else json.dumps(corpus_json),
+        params["domain"],
+        params.get("rank_top_k"),
+        params.get("analyzer_budget"),
+        params.get("analysis_shard_size", 20),
+    )
+
+
+def _analyze(params: dict, upstream: dict, on_token: Callable = None) -> str:
+    provider, model = stage_model(params, "analysis")
+    corpus_json, analyzer_json, _ = prepare_corpus(upstream["corpus"], params)
+    entries = load_corpus(corpus_json) or []
+    shard_size = params.get("analysis_shard_size", 20)
+    excerpts = None
+    if params.get("fulltext"):
+        from tools.fulltext import fetch_sections  # Only runs that read full text need it
+
+        # Limitations / future-work sections of the papers that will be analyzed
+        excerpts = fetch_sections(entries)
+
+    if len(entries) > shard_size:
+        return corpus_analyzer_sharded(
+            corpus_json=corpus_json,
+            provider=provider,
+            model=model,
+            temperature=params["temperature"],
+            shard_size=shard_size,
+            token_budget=params.get("analyzer_budget"),
+            excerpts=excerpts
+        )
+
+    output = corpus_analyzer(
+        corpus_json=analyzer_json,
+        provider=provider,
+        model=model,
+        temperature=params["temperature"],
+        stream=on_token is not None,
+        excerpts=excerpts
+    )
+    return _consume(output, on_token) if on_token else output
+
+
+def _identify_gaps(params: dict, upstream: dict, on_token: Callable = None, limits: tuple = (3, 8)) -> str:
+    provider, model = stage_model(params, "gaps")
+    output = gap_identifier(
+        analysis_summary=upstream["analysis"],
+        provider=provider,
+        model=model,
+        temperature=params["temperature"],
+        stream=on_token is not None,
+        min_gaps=limits[0],
+        max_gaps=limits[1]
+    )
+    return _consume(output, on_token) if on_token else output
+
+
+def _generate_topics(params: dict, upstream: dict, on_token: Callable = None, limits: tuple = (3, 10)) -> str:
+    provider, model = stage_model(params, "topics")
+    output = topic_generator(
+        research_gaps=upstream["gaps"],
+        research_level=params["research_level"],
+        provider=provider,
+        model=model,
+        focus_area=params.get("focus_area"),
+        temperature=params["temperature"],
+        stream=on_token is not None,
+        min_topics=limits[0],
+        max_topics=limits[1]
+    )
+    return _consume(output, on_token) if on_token else output
+
+
+# The research pipeline, in dependency order.
+STAGES = [
+    Stage("corpus", _collect, ("domain", "temperature", "collection_mode")),
+    Stage(
+        "analysis", _analyze,
+        (
+            "domain", "rank_top_k", "temperature", "analyzer_budget", "analysis_shard_size", "fulltext"
+        ),
+        deps=("corpus",)
+    ),
+    Stage("gaps", _identify_gaps, ("temperature", "pipelined", "theme_batch_size"), deps=("analysis",)),
+    Stage(
+        "topics", _generate_topics,
+        ("research_level", "focus_area", "temperature", "pipelined", "theme_batch_size"),
+        deps=("gaps",)
+    ),
+]
+
+
+# Seconds each stage may spend on LLM calls (QUEST0_DEADLINE_<STAGE> overrides; streamed calls are not cut off)
+STAGE_DEADLINES = {
+    name: float(getenv(f"QUEST0_DEADLINE_{name.upper()}", default))
+    for name, default in (("corpus", 180), ("analysis", 240), ("gaps", 120), ("topics", 120))
+}
+
+
+def _hash(payload) -> str:
+    return sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def stage_key(stage: Stage, params: dict, upstream_keys: dict) -> str:
+    """
+    Memo key of a stage: its model, its own settings and the keys of its upstream outputs.
+    """
+    return _hash({
+        "stage": stage.name,
+        "model": stage_model(params, stage.name),
+        "params": {name: params.get(name) for name in stage.params},
+        "upstream": {name: upstream_keys[name] for name in stage.deps},
+    })
+
+
+class StageMemo(OrderedDict):
+    """
+    A bounded, least-recently-used memo of stage outputs. Safe to share
+    between threads (agents.jobs keeps one for every session). With a `ttl`,
+    outputs older than that many seconds are dropped, so e.g. a search corpus
+    is collected afresh once it may be out of date.
+    """
+
+    def __init__(self, max_entries: int = 64, ttl: float = None):
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._stored_at = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, key: str):
+        with self._lock:
+            if key not in self:
+                return None
+            if self.ttl is not None and time.monotonic() - self._stored_at[key] > self.ttl:
+                del self[key], self._stored_at[key]
+                return None
+            self.move_to_end(key)
+            return self[key]
+
+    def store(self, key: str, value: str) -> None:
+        with self._lock:
+            self[key] = value
+            self._stored_at[key] = time.monotonic()
+            self.move_to_end(key)
+            while len(self) > self.max_entries:
+                oldest, _ = self.popitem(last=False)
+                del self._stored_at[oldest]
+
+
+def _stage_policy(params: dict, stage_name: str, deadlines: dict):
+    """
+    The LLM call policy of a stage (see agents.llm.call_policy).
+    """
+    model = stage_model(params, stage_name)
+    fallbacks = parse_models(
+        DEFAULT_FALLBACKS if params.get("fallbacks") is None else params["fallbacks"]
+    )
+    selected = (params["provider"], params["model"])
+    if model != selected:
+        # A routed stage falls back to the selected model first
+        fallbacks = [selected] + [f for f in fallbacks if f != selected]
+    return call_policy(
+        fallbacks=fallbacks,
+        deadline=deadlines.get(stage_name),
+        hedge_percentile=params.get("hedge_percentile"),
+    )
+
+
+def _start_overlap(
+        params: dict, upstream: dict, deadlines: dict, context: contextvars.Context, on_token: Callable = None
+) -> OverlappedRun:
+    """
+    Starts analysis, gaps and topics as one overlapped run (see agents.overlap).
+    """
+    return OverlappedRun(
+        analyze=lambda on_chunk: _analyze(params, upstream, on_chunk),
+        identify_gaps=lambda analysis, *limits: _identify_gaps(params, {"analysis": analysis}, limits=limits),
+        generate_topics=lambda gaps, *limits: _generate_topics(params, {"gaps": gaps}, limits=limits),
+        stage_context=lambda stage_name: _stage_policy(params, stage_name, deadlines),
+        context=context,
+        on_token=on_token,
+        theme_batch_size=params.get("theme_batch_size") or 2,
+    )
+
+
+def iter_pipeline(
+        params: dict,
+        memo: StageMemo = None,
+        fixed: dict = None,
+        stages: list = STAGES,
+        on_token: Callable[[str, str], None] = None
+) -> Iterator[tuple[str, str, bool]]:
+    """
+    Runs the pipeline lazily, recomputing only stages whose inputs changed.
+
+    Args:
+        - params (dict): Run settings (domain, provider, model, temperature, ...).
+          "routing" (a ROUTING_PROFILES name) or "stage_models" ({stage: "provider:model"})
+          pick each stage's model (see stage_model).
+          "fallbacks", "stage_deadlines" and "hedge_percentile" set the LLM call
+          policy of each stage (see agents.llm.call_policy); they don't affect memo keys.
+        - memo (StageMemo): Memo of earlier stage outputs; a new one is used if omitted
+        - fixed (dict): Stage outputs to reuse as-is (e.g. {"gaps": previous_gaps}),
+          so downstream stages can be re-run against an earlier result.
+        - stages (list): Stages in dependency order (default STAGES)
+        - on_token (Callable): If given, stages stream their completions and
+          on_token(stage name, chunk) is called for every chunk as it arrives.
+
+    With params["pipelined"], analysis, gaps and topics overlap: gaps are
+    identified per batch of params["theme_batch_size"] themes (default 2) as
+    the analysis streams them, and topics per gap batch (see agents.overlap).
+    Stages are still yielded in order. In this mode the analysis always
+    streams (under its stage's call policy, like every streamed call), and
+    only the analysis is streamed to on_token.
+
+    Yields:
+        - tuple[str, str, bool]: (stage name, output, whether it came from the memo)
+    """
+    memo = StageMemo() if memo is None else memo
+    fixed = fixed or {}
+    deadlines = dict(STAGE_DEADLINES, **(params.get("stage_deadlines") or {}))
+    outputs, keys = {}, {}
+    run_summary = {"type": "run", "domain": params.get("domain"), "stages": {}}
+    # Overlapped tasks start from this context, outside any stage's span and policy
+    context = contextvars.copy_context()
+    overlap = None
+
+    for stage in stages:
+        if stage.name in fixed:
+            outputs[stage.name] = fixed[stage.name]
+            keys[stage.name] = _hash({"fixed": stage.name, "output": fixed[stage.name]})
+            yield stage.name, outputs[stage.name], True
+            continue
+
+        key = stage_key(stage, params, keys)
+        output = memo.lookup(key)
+        cached = output is not None
+        if cached:
+            increment("stage_memo_hits", stage=stage.name)
+        else:
+            upstream = {name: outputs[name] for name in stage.deps}
+            model = stage_model(params, stage.name)
+            if (
+                    params.get("pipelined") and overlap is None and stage.name == OVERLAPPED_STAGES[0]
+                    and not any(name in fixed for name in OVERLAPPED_STAGES)
+            ):
+                overlap = _start_overlap(params, upstream, deadlines, context, on_token)
+
+            with span("stage", stage=stage.name, model=":".join(model)) as record:
+                if overlap is not None and stage.name in OVERLAPPED_STAGES:
+                    # Waits for this stage's share of the overlapped run
+                    output = overlap.result(stage.name)
+                    counts = overlap.counts[stage.name]
+                else:
+                    with _stage_policy(params, stage.name, deadlines):
+                        if on_token is None:
+                            output = stage.func(params, upstream)
+                        else:
+                            output = stage.func(params, upstream, lambda chunk: on_token(stage.name, chunk))
+                    counts = record["counts"]
+            # Per-stage latency, tokens and cost (cost_usd needs QUEST0_PRICES), for comparing profiles
+            run_summary["stages"][stage.name] = {
+                "model": ":".join(model), "duration_s": record["duration_s"], "counts": counts
+            }
+            if is_model_error(output):
+                increment("model_errors", stage=stage.name)
+            else:
+                # Model errors are not memoized so the next run retries the stage.
+                memo.store(key, output)
+
+        if stage.name == "corpus":
+            set_gauge("corpus_json_bytes", len(str(output).encode("utf-8")))
+            run_summary["corpus_json_bytes"] = len(str(output).encode("utf-8"))
+
+        outputs[stage.name] = output
+        keys[stage.name] = key
+        if stage is stages[-1]:
+            # Emitted before the last yield: callers often stop iterating there.
+            log_event(run_summary)
+            write_prometheus()
+        yield stage.name, output, cached
+
+
+def run_pipeline(params: dict, memo: StageMemo = None, fixed: dict = None) -> dict:
+    """
+    Runs every stage (see iter_pipeline) and returns {stage name: output}.
+    """
+    return {name: output for name, output, _ in iter_pipeline(params, memo, fixed)}
@@ -0,0 +1,149 @@
+import functools
+import json
+import threading
+from typing import Callable
+from agents.corpus import estimate_tokens, load_corpus, normalize_entry, normalize_title, shorten_text
+from agents.llm import current_conversation
+from tools.config import getenv
+from tools.metrics import increment
+from tools.paper_index import paper_key
+
+# Tool results shown to the collector model: on | off
+TOOL_PROJECTION = getenv("QUEST0_TOOL_PROJECTION", "on").lower() != "off"
+# Corpus-schema fields kept per result, and per-field token caps ("field:tokens,...")
+TOOL_FIELDS = tuple(
+    field.strip() for field in getenv("QUEST0_TOOL_FIELDS", "title,year,source,authors,abstract").split(",")
+    if field.strip()
+)
+TOOL_CAPS = {
+    field.strip(): int(cap)
+    for field, _, cap in (
+        item.partition(":") for item in getenv("QUEST0_TOOL_CAPS", "title:40,authors:12,abstract:60").split(",")
+    )
+    if field.strip() and cap.strip().isdigit()
+}
+
+# Source of the results of tools that do not tag them themselves.
+TOOL_SOURCES = {"arxiv_search_tool": "arxiv", "tavily_search_tool": "tavily"}
+
+
+class ToolProjection:
+    """
+    Shrinks search-tool results before they enter the collector's multi-turn
+    context, which is re-sent to the model on every turn.
+
+    Each result is converted to the corpus schema, reduced to `fields` (with
+    `caps` token limits) and given a short "ref". Results are returned
+    column-wise ({"fields": [...], "rows": [[...], ...]}) so field names are not
+    repeated per row, and papers the model was already shown in an earlier call
+    of the same conversation are listed by ref only ("already_seen"). A failover
+    attempt is a new conversation (see agents.llm.current_conversation), so it
+    is shown every paper in full again, under the same refs. The full records
+    stay here, and rehydrate() puts them back into the corpus the model returns.
+
+    Usage:
+        projection = ToolProjection()
+        tools = [projection.wrap(tool) for tool in tools]
+        corpus_json = projection.rehydrate(chat(..., tools=tools))
+    """
+
+    def __init__(self, fields: tuple = TOOL_FIELDS, caps: dict = None):
+        self.fields = tuple(fields)
+        self.caps = TOOL_CAPS if caps is None else caps
+        self.records = {}
+        self._refs = {}
+        # Refs shown in full, per conversation; concurrent attempts share records and refs
+        self._shown = {}
+        self._lock = threading.Lock()
+
+    def wrap(self, tool: Callable) -> Callable:
+        """
+        The tool with projected results. Name, signature and docstring are kept,
+        so the model sees the same tool schema.
+        """
+        default_source = TOOL_SOURCES.get(tool.__name__)
+
+        @functools.wraps(tool)
+        def projected(*args, **kwargs):
+            return self.project(tool(*args, **kwargs), default_source)
+
+        return projected
+
+    def _key(self, entry: dict) -> str:
+        return paper_key(entry) or f"title:{normalize_title(entry['title'])}"
+
+    def _value(self, entry: dict, field: str) -> str:
+        value = " ".join(str(entry.get(field) or "").split())
+        cap = self.caps.get(field)
+        return shorten_text(value, cap) if cap and value else value
+
+    def project(self, results, default_source: str = None) -> dict:
+        """
+        The compact form of one tool call's results (see the class docstring).
+        Errors are passed on as they are.
+        """
+        if not isinstance(results, list):
+            return results
+
+        rows, seen, errors = [], [], []
+        with self._lock:
+            shown = self._shown.setdefault(current_conversation(), set())
+            for item in results:
+                if not isinstance(item, dict):
+                    continue
+                if "error" in item:
+                    errors.append(item["error"])
+                    continue
+                entry = normalize_entry(item, item.get("source") or default_source or "tavily")
+                if entry is None:
+                    continue
+                key = self._key(entry)
+                ref = self._refs.get(key)
+                if ref is None:
+                    ref = f"p{len(self.records) + 1}"
+                    self._refs[key], self.records[ref] = ref, entry
+                if ref in shown:
+                    if ref not in seen:
+                        seen.append(ref)
+                    continue
+                shown.add(ref)
+                rows.append([ref] + [self._value(entry, field) for field in self.fields])
+
+        projected = {"fields": ["ref", *self.fields], "rows": rows}
+        if seen:
+            projected["already_seen"] = seen
+        if errors:
+            projected["errors"] = errors
+
+        increment("tool_tokens_raw", estimate_tokens(json.dumps(results, default=str)))
+        increment("tool_tokens_projected", estimate_tokens(json.dumps(projected)))
+        increment("tool_results_deduped", len(seen))
+        return projected
+
+    def rehydrate(self, content: str) -> str:
+        """
+        Replaces the shortened fields of the collector's corpus with the full
+        records, matched by "ref" (or, failing that, by paper identity). Entries
+        that match nothing, e.g. in a cached answer from an earlier process, are
+        kept as the model wrote them.
+
+        Returns:
+            - str: {"corpus": [...]} JSON text, or `content` unchanged if it is not a corpus.
+        """
+        entries = load_corpus(content)
+        if entries is None:
+            return content
+
+        corpus, restored = [], 0
+        for entry in entries:
+            entry = dict(entry)
+            record = self.records.get(str(entry.pop("ref", "")))
+            if record is None and entry.get("title"):
+                record = self.records.get(self._refs.get(self._key(entry)))
+            if record is not None:
+                restored += 1
+                entry.update({field: value for field, value in record.items() if value})
+            corpus.append(entry)
+
+        increment("tool_records_rehydrated", restored)
+        return json.dumps({"corpus": corpus})
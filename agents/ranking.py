@@ -0,0 +1,166 @@
+import json
+import zlib
+from datetime import datetime
+import numpy as np
+from agents.corpus import load_corpus, normalize_title
+from tools.paper_index import embed
+
+# MinHash permutations (bands x rows); pairs sharing any band are compared.
+NUM_PERM = 64
+BANDS = 16
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240101)
+_PERM_A = _rng.integers(1, _PRIME, NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, _PRIME, NUM_PERM, dtype=np.uint64)
+
+
+def shingles(text: str, k: int = 3) -> set[str]:
+    """
+    Character k-grams of the normalized text (robust to small title edits).
+    """
+    text = normalize_title(text)
+    if len(text) <= k:
+        return {text} if text else set()
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+
+def minhash_signatures(texts: list[str], k: int = 3) -> np.ndarray:
+    """
+    MinHash signatures of each text's shingle set.
+
+    Returns:
+        - np.ndarray: uint64 array of shape (len(texts), NUM_PERM); the share of
+          equal columns between two rows estimates their Jaccard similarity.
+    """
+    signatures = np.full((len(texts), NUM_PERM), _PRIME, dtype=np.uint64)
+    for row, text in enumerate(texts):
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) & _PRIME for s in shingles(text, k)), dtype=np.uint64
+        )
+        if hashes.size:
+            signatures[row] = ((_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) % _PRIME).min(axis=1)
+    return signatures
+
+
+def near_duplicate_groups(texts: list[str], threshold: float = 0.8) -> list[int]:
+    """
+    Groups texts whose estimated Jaccard similarity is at least `threshold`,
+    using locality-sensitive hashing over the MinHash bands.
+
+    Returns:
+        - list[int]: A group label per text (the index of the group's first text).
+    """
+    signatures = minhash_signatures(texts)
+    parent = list(range(len(texts)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    rows = NUM_PERM // BANDS
+    for band in range(BANDS):
+        buckets = {}
+        for i, key in enumerate(map(bytes, signatures[:, band * rows:(band + 1) * rows])):
+            buckets.setdefault(key, []).append(i)
+        for members in buckets.values():
+            # Every pair in the bucket: a near-duplicate of a later member may
+            # not be similar enough to the bucket's first one
+            for position, i in enumerate(members):
+                for j in members[position + 1:]:
+                    a, b = find(i), find(j)
+                    if a != b and np.mean(signatures[i] == signatures[j]) >= threshold:
+                        parent[max(a, b)] = min(a, b)
+
+    return [find(i) for i in range(len(texts))]
+
+
+def _richness(entry: dict) -> tuple:
+    # Which duplicate to keep: arXiv records first, then the one with the longest abstract
+    return (entry.get("source") == "arxiv", len(str(entry.get("abstract", ""))))
+
+
+def dedupe_near(entries: list[dict], threshold: float = 0.8) -> list[dict]:
+    """
+    Collapses near-duplicate titles (e.g. one paper found on arXiv and on the
+    web), keeping the richest entry of each group in first-seen order.
+    """
+    groups = near_duplicate_groups([e.get("title", "") for e in entries], threshold)
+    best = {}
+    for entry, group in zip(entries, groups):
+        if group not in best or _richness(entry) > _richness(best[group]):
+            best[group] = entry
+    return [best[group] for group in sorted(best)]
+
+
+def recency_scores(entries: list[dict], today: str = None, half_life: float = 3.0) -> np.ndarray:
+    """
+    Exponential decay by publication year (1.0 this year, 0.5 after
+    `half_life` years). Undated entries score 0.5.
+    """
+    current_year = int((today or datetime.now().strftime("%Y-%m-%d"))[:4])
+    years = np.array([
+        float(str(e.get("year", ""))[:4]) if str(e.get("year", ""))[:4].isdigit() else np.nan
+        for e in entries
+    ])
+    ages = np.clip(current_year - years, 0, None)
+    return np.where(np.isnan(ages), 0.5, 0.5 ** (ages / half_life))
+
+
+def relevance_scores(entries: list[dict], query: str) -> np.ndarray:
+    """
+    Cosine similarity between the query and each entry's title and abstract.
+    """
+    documents = [f"{e.get('title', '')} {e.get('title', '')} {e.get('abstract', '')}" for e in entries]
+    return embed(documents) @ embed([query])[0]
+
+
+def rank_entries(
+        entries: list[dict],
+        query: str,
+        top_k: int = 20,
+        relevance_weight: float = 0.7,
+        dedupe_threshold: float = 0.8,
+        today: str = None
+) -> list[dict]:
+    """
+    Deterministic local ranking: near-duplicates are collapsed, then entries
+    are ordered by a weighted mix of query relevance and recency.
+
+    Args:
+        - entries (list[dict]): Corpus entries (see normalize_entry)
+        - query (str): The research domain
+        - top_k (int): Entries to keep (default 20)
+        - relevance_weight (float): Weight of relevance; recency gets the rest (default 0.7)
+        - dedupe_threshold (float): Title similarity treated as the same paper (default 0.8)
+        - today (str): "YYYY-MM-DD" used for recency (default today)
+
+    Returns:
+        - list[dict]: At most top_k entries, best first.
+    """
+    entries = dedupe_near([e for e in entries if isinstance(e, dict)], dedupe_threshold)
+    if not entries:
+        return []
+
+    relevance = relevance_scores(entries, query)
+    if relevance.max() > 0:
+        relevance = relevance / relevance.max()
+    scores = relevance_weight * relevance + (1 - relevance_weight) * recency_scores(entries, today)
+
+    # Stable sort keeps the original order among equal scores
+    order = np.argsort(-scores, kind="stable")[:top_k]
+    return [entries[i] for i in order]
+
+
+def rank_corpus(corpus_json, query: str, top_k: int = 20, today: str = None) -> str:
+    """
+    rank_entries for collector output. Output that is not a corpus is returned unchanged.
+
+    Returns:
+        - str: JSON text of the form {"corpus": [...]}.
+    """
+    entries = load_corpus(corpus_json)
+    if entries is None:
+        return corpus_json
+    return json.dumps({"corpus": rank_entries(entries, query, top_k, today=today)})
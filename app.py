@@ -1,6 +1,27 @@
 import streamlit as st
-import json
-from agents.agents import corpus_collector, corpus_analyzer, gap_identifier, topic_generator
+import time
+from agents.parsing import JsonItemStream, parse_items, parse_json
+from agents.history import ChatHistory, render_markdown, run_record
+from agents.jobs import JobCancelled, JobExecutor, QueueFull
+from agents.pipeline import prepare_corpus
+from tools.metrics import increment, serve_prometheus
+from tools.config import getenv
+
+
+@st.cache_resource
+def start_metrics_server(port: int):
+    # One Prometheus endpoint per process, shared by every session
+    return serve_prometheus(port)
+
+
+@st.cache_resource
+def get_job_executor() -> JobExecutor:
+    # Pipelines run on one bounded pool per process; identical concurrent requests share a run
+    return JobExecutor()
+
+
+if getenv("QUEST0_METRICS_PORT"):
+    start_metrics_server(int(getenv("QUEST0_METRICS_PORT")))
 
 
 # ---------------------- Sidebar -----------------------------
@@ -14,15 +35,44 @@ model_options = {
     "Groq": ["llama-3.1-8b-instant", "llama-3.3-70b-versatile", "meta-llama/llama-guard-4-12b", "openai/gpt-oss-20b", "moonshotai/kimi-k2-instruct-0905"],
     "Ollama": ["kimi-k2-thinking:cloud"]
 }
+# Every model as an aisuite "provider:model" id
+all_models = [f"{name.lower()}:{option}" for name, options in model_options.items() for option in options]
 
 provider = st.sidebar.selectbox("Model Provider", list(model_options.keys()))
 model = st.sidebar.selectbox("Model Name", model_options[provider])
+routing = st.sidebar.selectbox(
+    "Model Routing", ["Fast", "Single Model", "Custom"],
+    help=(
+        "Fast runs collection, analysis and gap finding on llama-3.1-8b-instant and topic generation "
+        "on llama-3.3-70b-versatile (needs GROQ_API_KEY; otherwise the model above is used). "
+        "Single Model uses the model above for every stage. Custom lets you pick a model per stage."
+    )
+)
+stage_models = None
+if routing == "Custom":
+    with st.sidebar.expander("Per-Stage Models", expanded=True):
+        stage_models = {
+            stage: st.selectbox(label, all_models, index=all_models.index(f"{provider.lower()}:{model}"))
+            for stage, label in (
+                ("corpus", "Corpus Collection"),
+                ("analysis", "Corpus Analysis"),
+                ("gaps", "Gap Identification"),
+                ("topics", "Topic Generation"),
+            )
+        }
 research_level = st.sidebar.selectbox(
     "Research Level", ["Undergraduate", "Masters", "PhD"], 
     help= (
         "This helps the agents tailor the complexity and depth of the research topics generated."
     )
 )
+collection_mode = st.sidebar.selectbox(
+    "Collection Mode", ["Agent", "Prefetch"],
+    help=(
+        "Agent lets the model drive the search tools over several turns. "
+        "Prefetch searches arXiv and the web directly in parallel (faster, fewer tokens)."
+    )
+)
 temperature = st.sidebar.slider(
     "Temperature",
     min_value=0.0,
@@ -31,6 +81,70 @@ temperature = st.sidebar.slider(
     step=0.05,
     help="Lower = more deterministic, Higher = more creative"
 )
+analyzer_budget = st.sidebar.number_input(
+    "Analyzer Token Budget",
+    min_value=500,
+    max_value=100000,
+    value=4000,
+    step=500,
+    help="Approximate token budget for the corpus sent to the analyzer. Abstracts are shortened to fit."
+)
+rank_top_k = st.sidebar.number_input(
+    "Papers to Analyze",
+    min_value=5,
+    max_value=200,
+    value=30,
+    step=5,
+    help="Near-duplicates are merged and the most relevant, recent papers are kept before analysis."
+)
+analysis_shard_size = st.sidebar.number_input(
+    "Analysis Shard Size",
+    min_value=5,
+    max_value=100,
+    value=20,
+    step=5,
+    help="Corpora larger than this are split into shards that are analyzed in parallel and merged."
+)
+fallback_models = st.sidebar.multiselect(
+    "Fallback Models",
+    all_models,
+    help=(
+        "Tried in order when the selected model errors, returns nothing or is too slow. "
+        "Leave empty to use QUEST0_LLM_FALLBACKS."
+    )
+)
+hedge_requests = st.sidebar.toggle(
+    "Hedge Slow Requests",
+    value=False,
+    help="Send a duplicate request to the first fallback model once a call is slower than the model's p95 latency."
+)
+overlap_stages = st.sidebar.toggle(
+    "Overlap Stages",
+    value=False,
+    help=(
+        "Start identifying gaps as soon as the first themes are analyzed, and generating topics "
+        "as soon as the first gaps are found. Faster on long runs; results are merged at the end."
+    )
+)
+read_full_text = st.sidebar.toggle(
+    "Read Full Text",
+    value=False,
+    help=(
+        "Download the arXiv PDFs of the analyzed papers and give the analyzer their limitations "
+        "and future-work sections. Slower on first use; PDFs and their text are kept on disk."
+    )
+)
+stream_output = st.sidebar.toggle(
+    "Stream Output",
+    value=True,
+    help="Show each agent's output as it is generated instead of waiting for the full response."
+)
+
+regenerate_topics = st.sidebar.button(
+    "Regenerate Topics",
+    disabled="last_run" not in st.session_state,
+    help="Re-run only topic generation on the last corpus, with the current research level and model settings."
+)
 
 st.sidebar.caption("Adjust these settings to control how your agents respond.")
 st.sidebar.markdown("---")
@@ -42,232 +156,324 @@ st.markdown(
 )
 st.write("Enter a research domain or topic, and let the agents uncover gaps and suggest novel research ideas.")
 
-# Initialize chat history
-if "messages" not in st.session_state:
-    st.session_state.messages = []
+# Initialize chat history (run records, rendered to markdown when shown)
+if "history" not in st.session_state:
+    st.session_state.history = ChatHistory()
 
-# Display chat messages from history on app rerun
-for message in st.session_state.messages:
+# Settings each pipeline stage may depend on (see agents/pipeline.py)
+settings = {
+    "provider": provider.lower(),
+    "model": model,
+    "temperature": temperature,
+    "research_level": research_level,
+    "collection_mode": collection_mode.lower(),
+    "analyzer_budget": analyzer_budget,
+    "rank_top_k": rank_top_k,
+    "analysis_shard_size": analysis_shard_size,
+    "fulltext": read_full_text,
+    "routing": {"Fast": "fast", "Single Model": "single"}.get(routing),
+    "stage_models": stage_models,
+    # LLM call policy only (not part of the stage memo keys)
+    "fallbacks": fallback_models or None,
+    "hedge_percentile": 0.95 if hedge_requests else None,
+    "pipelined": overlap_stages,
+}
+
+# Display chat history on app rerun: one page at a time, with only the newest
+# answer expanded, so a rerun costs the same however long the session gets
+HISTORY_PAGE_SIZE = 10
+history = st.session_state.history
+history_page = 1
+if history.page_count(HISTORY_PAGE_SIZE) > 1:
+    history_page = st.number_input(
+        "History page",
+        min_value=1,
+        max_value=history.page_count(HISTORY_PAGE_SIZE),
+        value=1,
+        help="Page 1 holds the most recent messages."
+    )
+for message in history.page(history_page, HISTORY_PAGE_SIZE):
     with st.chat_message(message["role"]):
-        st.markdown(message["content"])
+        if message["role"] == "user":
+            st.markdown(message["content"])
+            continue
+        record = history.run(message)
+        if record is None:
+            st.warning(f"{message['summary']} (no longer available)")
+        elif message is history.messages[-1]:
+            st.markdown(render_markdown(record))
+        else:
+            with st.expander(message["summary"], expanded=False):
+                st.markdown(render_markdown(record))
 
-# React to user input
-if prompt := st.chat_input("Describe your research area of interest"):
-    st.chat_message("user").markdown(prompt)
-    st.session_state.messages.append({"role": "user", "content": prompt})
 
-    # ------------ Pipeline Execution ----------------
-    with st.chat_message("assistant"):
-        st.markdown("**Running agents...**")
+# ------------------------- Stage Rendering -------------------------------
+def render_corpus(corpus_json: str) -> list:
+    # Parse JSON safely (extract outside expander for history)
+    corpus_data = parse_items(corpus_json, "corpus")
+    if corpus_data is None:
+        corpus_data = []
+        increment("json_parse_errors", stage="corpus")
+        st.error("Failed to parse corpus data. The output may not be valid JSON.")
 
-        # corpus collector
-        with st.spinner("Collecting recent papers and articles..."):
-            corpus_json = corpus_collector(
-                domain=prompt,
-                provider=provider.lower(),
-                model=model,
-                temperature=temperature
-            )
-        
-        # Parse JSON safely (extract outside expander for history)
-        try:
-            corpus_data = json.loads(corpus_json).get("corpus", [])
-        except (json.JSONDecodeError, AttributeError):
-            corpus_data = []
-            st.error("Failed to parse corpus data. The output may not be valid JSON.")
-        
-        with st.expander("Corpus Collector Output", expanded=False):
-            st.markdown("### Corpus Collected")
-            st.markdown("---")
-            
-            if corpus_data:
-                for i, paper in enumerate(corpus_data, 1):
-                    st.markdown(f"**{i}. {paper.get('title', 'Untitled')}**")
-                    st.markdown(
-                        f"""
-                        - **Authors:** {paper.get('authors', 'N/A')}
-                        - **Year:** {paper.get('year', 'N/A')}
-                        - **Source:** {paper.get('source', 'N/A')}
-                        - **Abstract:** {paper.get('abstract', 'No abstract available.')}
-                        - **URL:** [View Paper]({paper.get('url', '#')})
-                        """
-                    )
-                st.divider()
-            else:
-                st.info("No papers or articles found in the corpus.")
-
-        # corpus analyzer
-        with st.spinner("Analyzing collected corpus..."):
-            analyzed_json = corpus_analyzer(
-                corpus_json=corpus_json,
-                provider=provider.lower(),
-                model=model,
-                temperature=temperature
-            )
+    with st.expander("Corpus Collector Output", expanded=False):
+        st.markdown("### Corpus Collected")
+        st.markdown("---")
 
-        # Parse analyzed data (extract outside expander for history)
-        try:
-            analyzed_data = json.loads(analyzed_json)
-            themes = analyzed_data.get("themes", [])
-            emerging_trends = analyzed_data.get("emerging_trends", [])
-            common_limitations = analyzed_data.get("common_limitations", [])
-        except (json.JSONDecodeError, AttributeError):
-            themes, emerging_trends, common_limitations = [], [], []
-            st.error("Failed to parse data. The output may not be valid JSON.")
-
-        with st.expander("Corpus Analyzer Output", expanded=False):
-
-            if themes:
-                st.subheader("Identified Themes")
-                for i, theme in enumerate(themes, 1):
-                    with st.container():
-                        st.markdown(f"**{i}. {theme.get('name', 'Unnamed Theme')}**")
-                        st.markdown(
-                            f"""
-                            - **Summary:** {theme.get('summary', 'No summary available.')}
-                            - **Representative Papers:** {', '.join(theme.get('representative_papers', []) or ['N/A'])}
-                            """
-                        )
-                st.divider()
-
-            if emerging_trends:
-                st.subheader("Emerging Trends")
-                for i, trend in enumerate(emerging_trends, 1):
-                    st.markdown(f"- {trend}")
-
-            if common_limitations:
-                st.subheader("Common Limitations")
-                for i, limitation in enumerate(common_limitations, 1):
-                    st.markdown(f"- {limitation}")
-            
-
-            if not (themes or emerging_trends or common_limitations):
-                st.warning("No structured analysis found in the output.")
-             
-
-        # research gap identifier
-        with st.spinner("Identifying research gaps..."):
-            gaps_json = gap_identifier(
-                analysis_summary=analyzed_json,
-                provider=provider.lower(),
-                model=model,
-                temperature=temperature
-            )
+        if corpus_data:
+            for i, paper in enumerate(corpus_data, 1):
+                st.markdown(f"**{i}. {paper.get('title', 'Untitled')}**")
+                st.markdown(
+                    f"""
+                    - **Authors:** {paper.get('authors', 'N/A')}
+                    - **Year:** {paper.get('year', 'N/A')}
+                    - **Source:** {paper.get('source', 'N/A')}
+                    - **Abstract:** {paper.get('abstract', 'No abstract available.')}
+                    - **URL:** [View Paper]({paper.get('url', '#')})
+                    """
+                )
+            st.divider()
+        else:
+            st.info("No papers or articles found in the corpus.")
 
-        # Parse gaps data (extract outside expander for history)
-        try:
-            gaps_data = json.loads(gaps_json)
-            research_gaps = gaps_data.get("research_gaps", [])
-        except (json.JSONDecodeError, AttributeError):
-            research_gaps = []
-            st.error("Failed to parse data. The output may not be valid JSON.")
-
-        with st.expander("Research Gap Identifier Output", expanded=False):
-            if research_gaps:
-                st.subheader("Identified Research Gaps")
-                for i, gap in enumerate(research_gaps, 1):
-                    with st.container():
-                        st.markdown(f"**{i}. {gap.get('gap_title', 'Untitled Gap')}**")
-                        st.markdown(
-                            f"""
-                            - **Description:** {gap.get('description', 'No description available.')}
-                            - **Evidence from Analysis:** {gap.get('evidence_from_analysis', 'N/A')}
-                            - **Potential Impact:** {gap.get('potential_impact', 'N/A')}
-                            """
-                        )
-                st.divider()
-            else:
-                st.warning("No research gaps identified in the output.")
-
-
-        # Research Topic Generator
-        with st.spinner("Generating potential research topics..."):
-            topics_json = topic_generator(
-                research_gaps=gaps_json,
-                research_level=research_level,
-                provider=provider.lower(),
-                model=model,
-                temperature=temperature
-            )
-        
-        # Parse topics data (extract outside display for history)
-        try:
-            topics_data = json.loads(topics_json).get("research_topics", [])
-        except (json.JSONDecodeError, AttributeError):
-            topics_data = []
-            st.error("Failed to parse research topics. The output may not be valid JSON.")
+    return corpus_data
 
-        st.markdown("### Suggested Research Topics")
 
-        if topics_data:
-            for i, topic in enumerate(topics_data, 1):
-                with st.container():
-                    st.markdown(f"#### {i}. {topic.get('topic_title', 'Untitled Topic')}")
-                    st.markdown(
-                    f"""
-                    - **Research Question:** {topic.get('research_question', 'N/A')}
-                    - **Motivation:** {topic.get('motivation', 'N/A')}
-                    - **Suggested Methodology:** {topic.get('suggested_methodology', 'N/A')}
-                    - **Expected Contribution:** {topic.get('expected_contribution', 'N/A')}
-                    """,
-                    unsafe_allow_html=True,
+def render_analysis(analyzed_json: str, corpus_json: str, params: dict) -> tuple:
+    # Parse analyzed data (extract outside expander for history)
+    analyzed_data = parse_json(analyzed_json, "themes")
+    if not isinstance(analyzed_data, dict):
+        # Output cut off part-way: keep the themes that did close
+        salvaged = parse_items(analyzed_json, "themes")
+        analyzed_data = {"themes": salvaged} if salvaged else None
+
+    if analyzed_data is not None:
+        themes = analyzed_data.get("themes", [])
+        emerging_trends = analyzed_data.get("emerging_trends", [])
+        common_limitations = analyzed_data.get("common_limitations", [])
+    else:
+        themes, emerging_trends, common_limitations = [], [], []
+        increment("json_parse_errors", stage="analysis")
+        st.error("Failed to parse data. The output may not be valid JSON.")
+
+    with st.expander("Corpus Analyzer Output", expanded=False):
+        # What the analyzer saw (cached by the analysis stage, see agents/pipeline.py)
+        _, _, report = prepare_corpus(corpus_json, params)
+        st.caption(f"{report['papers']} papers kept for analysis after de-duplication and ranking.")
+        if report["shards"] > 1:
+            st.caption(f"Corpus analyzed in {report['shards']} parallel shards.")
+        elif report.get("compaction"):
+            compaction_report = report["compaction"]
+            if compaction_report["parsed"]:
+                st.caption(
+                    f"Corpus compacted from ~{compaction_report['tokens_before']} to "
+                    f"~{compaction_report['tokens_after']} tokens "
+                    f"({compaction_report['abstracts_truncated']} abstracts shortened, "
+                    f"{compaction_report['dropped']} entries dropped)."
                 )
-                    
-        else:
-            st.info("No research topics found in the output.")
-        st.markdown("---")
 
-        # Build comprehensive response for chat history
-        response_parts = ["**Research Analysis Pipeline Completed**\n\n"]
-        
-        # Add corpus summary
-        if corpus_data:
-            response_parts.append(f"### Corpus Collected\n{len(corpus_data)} papers/articles found.\n\n")
-        
-        # Add themes summary
         if themes:
-            response_parts.append("### Identified Themes\n")
+            st.subheader("Identified Themes")
             for i, theme in enumerate(themes, 1):
-                response_parts.append(f"**{i}. {theme.get('name', 'Unnamed Theme')}**\n")
-                response_parts.append(f"- Summary: {theme.get('summary', 'No summary available.')}\n")
-            response_parts.append("\n")
-        
-        # Add emerging trends
+                with st.container():
+                    st.markdown(f"**{i}. {theme.get('name', 'Unnamed Theme')}**")
+                    st.markdown(
+                        f"""
+                        - **Summary:** {theme.get('summary', 'No summary available.')}
+                        - **Representative Papers:** {', '.join(theme.get('representative_papers', []) or ['N/A'])}
+                        """
+                    )
+            st.divider()
+
         if emerging_trends:
-            response_parts.append("### Emerging Trends\n")
-            for trend in emerging_trends:
-                response_parts.append(f"- {trend}\n")
-            response_parts.append("\n")
-        
-        # Add common limitations
+            st.subheader("Emerging Trends")
+            for i, trend in enumerate(emerging_trends, 1):
+                st.markdown(f"- {trend}")
+
         if common_limitations:
-            response_parts.append("### Common Limitations\n")
-            for limitation in common_limitations:
-                response_parts.append(f"- {limitation}\n")
-            response_parts.append("\n")
-        
-        # Add research gaps
+            st.subheader("Common Limitations")
+            for i, limitation in enumerate(common_limitations, 1):
+                st.markdown(f"- {limitation}")
+
+        if not (themes or emerging_trends or common_limitations):
+            st.warning("No structured analysis found in the output.")
+
+    return themes, emerging_trends, common_limitations
+
+
+def render_gaps(gaps_json: str) -> list:
+    # Parse gaps data (extract outside expander for history)
+    research_gaps = parse_items(gaps_json, "research_gaps")
+    if research_gaps is None:
+        research_gaps = []
+        increment("json_parse_errors", stage="gaps")
+        st.error("Failed to parse data. The output may not be valid JSON.")
+
+    with st.expander("Research Gap Identifier Output", expanded=False):
         if research_gaps:
-            response_parts.append("### Identified Research Gaps\n")
+            st.subheader("Identified Research Gaps")
             for i, gap in enumerate(research_gaps, 1):
-                response_parts.append(f"**{i}. {gap.get('gap_title', 'Untitled Gap')}**\n")
-                response_parts.append(f"- Description: {gap.get('description', 'No description available.')}\n")
-                response_parts.append(f"- Potential Impact: {gap.get('potential_impact', 'N/A')}\n\n")
-        
-        # Add research topics
-        if topics_data:
-            response_parts.append("### Suggested Research Topics\n")
-            for i, topic in enumerate(topics_data, 1):
-                response_parts.append(f"**{i}. {topic.get('topic_title', 'Untitled Topic')}**\n")
-                response_parts.append(f"- Research Question: {topic.get('research_question', 'N/A')}\n")
-                response_parts.append(f"- Motivation: {topic.get('motivation', 'N/A')}\n")
-                response_parts.append(f"- Suggested Methodology: {topic.get('suggested_methodology', 'N/A')}\n")
-                response_parts.append(f"- Expected Contribution: {topic.get('expected_contribution', 'N/A')}\n\n")
+                with st.container():
+                    st.markdown(f"**{i}. {gap.get('gap_title', 'Untitled Gap')}**")
+                    st.markdown(
+                        f"""
+                        - **Description:** {gap.get('description', 'No description available.')}
+                        - **Evidence from Analysis:** {gap.get('evidence_from_analysis', 'N/A')}
+                        - **Potential Impact:** {gap.get('potential_impact', 'N/A')}
+                        """
+                    )
+            st.divider()
         else:
-            response_parts.append("No research topics were generated.\n")
+            st.warning("No research gaps identified in the output.")
+
+    return research_gaps
+
+
+def render_topics(topics_json: str) -> list:
+    # Parse topics data (extract outside display for history)
+    topics_data = parse_items(topics_json, "research_topics")
+    if topics_data is None:
+        topics_data = []
+        increment("json_parse_errors", stage="topics")
+        st.error("Failed to parse research topics. The output may not be valid JSON.")
+
+    st.markdown("### Suggested Research Topics")
+
+    if topics_data:
+        for i, topic in enumerate(topics_data, 1):
+            with st.container():
+                st.markdown(f"#### {i}. {topic.get('topic_title', 'Untitled Topic')}")
+                st.markdown(
+                f"""
+                - **Research Question:** {topic.get('research_question', 'N/A')}
+                - **Motivation:** {topic.get('motivation', 'N/A')}
+                - **Suggested Methodology:** {topic.get('suggested_methodology', 'N/A')}
+                - **Expected Contribution:** {topic.get('expected_contribution', 'N/A')}
+                """,
+                unsafe_allow_html=True,
+            )
+
+    else:
+        st.info("No research topics found in the output.")
+    st.markdown("---")
 
-        # Build final response message
-        full_response = "".join(response_parts)
-        
-        # Add assistant response to chat history
-        st.session_state.messages.append({"role": "assistant", "content": full_response})
\ No newline at end of file
+    return topics_data
+
+
+# ------------ Pipeline Execution ----------------
+# The array each stage streams, and the field used to list its items live
+STREAMED_ITEMS = {
+    "corpus": ("corpus", "title"),
+    "analysis": ("themes", "name"),
+    "gaps": ("research_gaps", "gap_title"),
+    "topics": ("research_topics", "topic_title"),
+}
+
+
+def run_pipeline_in_chat(params: dict, fixed: dict = None):
+    """
+    Runs the stage pipeline on the shared job executor, rendering each stage
+    as it finishes. An identical run already in flight (from any session) is
+    joined instead of started again, stages whose inputs did not change since
+    an earlier run are served from the executor's memo, and the run is
+    cancelled if this session goes away and no other session follows it.
+
+    The pipeline itself runs on the executor's workers, but this session's
+    script thread still blocks in job.follow() for the whole run, so every
+    session watching a run holds one Streamlit thread until it finishes.
+    """
+    executor = get_job_executor()
+    try:
+        job = executor.submit(params, fixed=fixed, stream=stream_output)
+    except QueueFull as e:
+        st.error(f"The server is busy: {e}")
+        return
+
+    with st.chat_message("assistant"), executor.following(job):
+        st.markdown("**Running agents...**")
+
+        # Live view of the stage currently streaming (redrawn at most every 0.1s):
+        # items are listed as soon as they close, raw text is shown until the first one does
+        live = {"placeholder": None, "stream": None, "drawn": 0.0}
+
+        def show_tokens(stage_name: str, chunk: str):
+            key, field = STREAMED_ITEMS[stage_name]
+            if live["stream"] is None:
+                live["stream"] = JsonItemStream(key)
+            live["stream"].feed(chunk)
+            if time.monotonic() - live["drawn"] > 0.1:
+                items = live["stream"].items
+                if items:
+                    live["placeholder"].markdown("\n".join(
+                        f"- {item.get(field, 'Untitled') if isinstance(item, dict) else item}"
+                        for item in items
+                    ))
+                else:
+                    live["placeholder"].code(live["stream"].text, language="json")
+                live["drawn"] = time.monotonic()
+
+        def next_stage() -> str:
+            live["placeholder"], live["stream"] = st.empty(), None
+            for event in events:
+                if event[0] == "token":
+                    show_tokens(event[1], event[2])
+                else:
+                    live["placeholder"].empty()
+                    return event[2]
+            raise RuntimeError("The pipeline ended before every stage finished.")
+
+        events = job.follow()
+        try:
+            # corpus collector
+            with st.spinner("Collecting recent papers and articles..."):
+                corpus_json = next_stage()
+            corpus_data = render_corpus(corpus_json)
+
+            # corpus analyzer (large corpora are analyzed in parallel shards)
+            with st.spinner("Analyzing collected corpus..."):
+                analyzed_json = next_stage()
+            themes, emerging_trends, common_limitations = render_analysis(
+                analyzed_json, corpus_json, params
+            )
+
+            # research gap identifier
+            with st.spinner("Identifying research gaps..."):
+                gaps_json = next_stage()
+            research_gaps = render_gaps(gaps_json)
+
+            # Research Topic Generator
+            with st.spinner("Generating potential research topics..."):
+                topics_json = next_stage()
+            topics_data = render_topics(topics_json)
+
+            # Add the run to chat history (stored structured, rendered when shown)
+            st.session_state.history.add_run(run_record(
+                params["domain"], corpus_data, themes, emerging_trends, common_limitations, research_gaps, topics_data
+            ))
+        except JobCancelled:
+            st.error("The run was cancelled before it finished.")
+            return
+        except Exception as e:
+            # The pipeline raised (e.g. every model failed or a stage missed its deadline)
+            st.error(f"The run failed: {e}")
+            return
+
+    st.session_state.last_run = {
+        "params": params,
+        "outputs": {"corpus": corpus_json, "analysis": analyzed_json, "gaps": gaps_json},
+    }
+
+
+# React to user input
+if prompt := st.chat_input("Describe your research area of interest"):
+    st.chat_message("user").markdown(prompt)
+    st.session_state.history.add_user(prompt)
+    run_pipeline_in_chat(dict(settings, domain=prompt))
+
+elif regenerate_topics and "last_run" in st.session_state:
+    # Reuse the last corpus, analysis and gaps; only topic generation runs again
+    last_run = st.session_state.last_run
+    run_pipeline_in_chat(
+        dict(settings, domain=last_run["params"]["domain"]),
+        fixed=last_run["outputs"]
+    )
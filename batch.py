@@ -0,0 +1,302 @@
+"""
+Headless batch runner for the Quest0 pipeline.
+
+Reads one request per line from a JSONL file, for example
+
+    {"id": "xai-health", "domain": "explainable AI in healthcare", "research_level": "PhD",
+     "provider": "groq", "model": "llama-3.3-70b-versatile"}
+
+runs the four agents for each domain on a worker pool (with a concurrency cap
+per provider) and appends one JSON line per finished domain to the output file.
+The output doubles as the checkpoint: rerunning the same command skips every id
+that already finished successfully, so an interrupted batch picks up where it
+stopped.
+
+    python batch.py domains.jsonl topics.jsonl --workers 8 --provider-limit groq=2 openai=6
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from hashlib import sha256
+from agents.parsing import is_model_error
+from agents.pipeline import run_pipeline
+from tools.metrics import increment, log_event, write_prometheus
+
+# Settings applied to every request unless the request line overrides them.
+DEFAULTS = {
+    "provider": "openai",
+    "model": "gpt-4o-mini",
+    "temperature": 0.7,
+    "research_level": "PhD",
+    "collection_mode": "prefetch",
+    "analyzer_budget": 4000,
+    "analysis_shard_size": 20,
+    "rank_top_k": 30,
+    # One model per request, so --provider-limit counts every call against the request's provider
+    "routing": "single",
+    "pipelined": False,
+    "fulltext": False,
+}
+
+
+def item_id(item: dict) -> str:
+    """
+    The request's "id", or a stable hash of its settings when it has none.
+    """
+    if item.get("id"):
+        return str(item["id"])
+    payload = json.dumps({k: v for k, v in item.items() if k != "id"}, sort_keys=True)
+    return sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def load_items(path: str, defaults: dict = None) -> list[dict]:
+    """
+    Reads batch requests from a JSONL file. Blank lines are ignored and every
+    request must name a domain.
+
+    Args:
+        - path (str): The input JSONL file
+        - defaults (dict): Settings filled in where a request omits them (default DEFAULTS)
+
+    Returns:
+        - list[dict]: One settings dict per request, each with an "id"
+    """
+    defaults = DEFAULTS if defaults is None else defaults
+    items, seen = [], set()
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_no}: invalid JSON ({e})") from None
+            if not isinstance(item, dict) or not item.get("domain"):
+                raise ValueError(f"{path}:{line_no}: each line needs a \"domain\"")
+
+            # Ids come from the line itself, so changing CLI defaults keeps checkpoints valid.
+            item = {**defaults, **item, "id": item_id(item)}
+            item["provider"] = str(item["provider"]).lower()
+            if item["id"] in seen:
+                raise ValueError(f"{path}:{line_no}: duplicate id {item['id']!r}")
+            seen.add(item["id"])
+            items.append(item)
+    return items
+
+
+def completed_ids(output_path: str) -> set:
+    """
+    Ids that already finished successfully in an earlier run of the batch.
+    A torn last line (from an interrupted write) is ignored.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("status") == "ok":
+                done.add(record.get("id"))
+    return done
+
+
+def run_item(item: dict) -> dict:
+    """
+    Runs the pipeline for one request and returns its output record.
+    """
+    start = time.perf_counter()
+    record = {"id": item["id"], "params": item}
+    try:
+        outputs = run_pipeline(item)
+        failed = [name for name, output in outputs.items() if is_model_error(output)]
+        record["outputs"] = outputs
+        record["status"] = "error" if failed else "ok"
+        if failed:
+            record["error"] = f"Model error in stage(s): {', '.join(failed)}"
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["duration_s"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def run_batch(
+        input_path: str,
+        output_path: str,
+        max_workers: int = 4,
+        provider_limits: dict = None,
+        defaults: dict = None,
+        resume: bool = True,
+        on_result=None
+) -> dict:
+    """
+    Runs the pipeline for every request in `input_path`, appending one JSON
+    line per finished request to `output_path` as soon as it completes.
+
+    Args:
+        - input_path (str): JSONL file of requests (see load_items)
+        - output_path (str): JSONL file that results are appended to
+        - max_workers (int): Pipelines running at once across all providers (default 4)
+        - provider_limits (dict): Max concurrent pipelines per provider, e.g. {"groq": 2};
+          providers not listed may use every worker
+        - defaults (dict): Settings for fields a request omits (default DEFAULTS)
+        - resume (bool): Skip ids already recorded as "ok" in `output_path` (default True)
+        - on_result (Callable): Called with each output record as it is written
+
+    Returns:
+        - dict: Counts of "total", "skipped", "ok" and "error" requests, plus "elapsed_s"
+    """
+    items = load_items(input_path, defaults)
+    done = completed_ids(output_path) if resume else set()
+    pending = [item for item in items if item["id"] not in done]
+    summary = {"total": len(items), "skipped": len(items) - len(pending), "ok": 0, "error": 0}
+
+    limits = provider_limits or {}
+    # Items wait here, per provider and in input order, until their provider has a
+    # free slot, so a saturated provider never holds workers other providers could use.
+    queues = {}
+    for index, item in enumerate(pending):
+        queues.setdefault(item["provider"], deque()).append((index, item))
+    active = dict.fromkeys(queues, 0)
+    running = {}
+    start = time.perf_counter()
+
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        def fill() -> None:
+            while len(running) < max_workers:
+                ready = [
+                    name for name, queue in queues.items()
+                    if queue and active[name] < limits.get(name, max_workers)
+                ]
+                if not ready:
+                    return
+                name = min(ready, key=lambda n: queues[n][0][0])
+                _, item = queues[name].popleft()
+                active[name] += 1
+                running[executor.submit(run_item, item)] = name
+
+        def finish(future) -> None:
+            record = future.result()
+            # Flushed per record so a crash loses at most the line being written.
+            out.write(json.dumps(record, default=str) + "\n")
+            out.flush()
+            os.fsync(out.fileno())
+            active[running.pop(future)] -= 1
+            summary[record["status"]] += 1
+            increment("batch_items", status=record["status"])
+            if on_result:
+                on_result(record)
+
+        try:
+            fill()
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finish(future)
+                fill()
+        except KeyboardInterrupt:
+            # Nothing new starts; items already running finish and are recorded,
+            # so the next invocation resumes after them.
+            for future in as_completed(list(running)):
+                finish(future)
+            raise
+
+    summary["elapsed_s"] = round(time.perf_counter() - start, 3)
+    log_event({"type": "batch", "input": input_path, "output": output_path, **summary})
+    write_prometheus()
+    return summary
+
+
+def _parse_limits(values: list[str]) -> dict:
+    limits = {}
+    for value in values or []:
+        name, _, limit = value.partition("=")
+        if not limit.isdigit() or int(limit) < 1:
+            raise argparse.ArgumentTypeError(f"expected PROVIDER=N, got {value!r}")
+        limits[name.lower()] = int(limit)
+    return limits
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the Quest0 pipeline for a batch of domains")
+    parser.add_argument("input", help="JSONL file with one request per line")
+    parser.add_argument("output", help="JSONL file that results are appended to (and resumed from)")
+    parser.add_argument("--workers", type=int, default=4, help="Pipelines running at once")
+    parser.add_argument(
+        "--provider-limit", nargs="+", metavar="PROVIDER=N", default=[],
+        help="Max concurrent pipelines for a provider, e.g. groq=2 openai=6"
+    )
+    parser.add_argument("--provider", default=DEFAULTS["provider"], help="Default provider")
+    parser.add_argument("--model", default=DEFAULTS["model"], help="Default model")
+    parser.add_argument("--research-level", default=DEFAULTS["research_level"], help="Default research level")
+    parser.add_argument("--temperature", type=float, default=DEFAULTS["temperature"])
+    parser.add_argument(
+        "--collection-mode", choices=["agent", "prefetch"], default=DEFAULTS["collection_mode"]
+    )
+    parser.add_argument(
+        "--routing", choices=["fast", "single"], default=DEFAULTS["routing"],
+        help="Per-stage model routing profile; \"fast\" sends some stages to other providers than "
+             "the one --provider-limit counts (default single)"
+    )
+    parser.add_argument(
+        "--pipelined", action="store_true", help="Overlap analysis, gap and topic generation in each pipeline"
+    )
+    parser.add_argument(
+        "--fulltext", action="store_true", help="Give the analyzer full-text sections of arXiv papers"
+    )
+    parser.add_argument("--no-resume", action="store_true", help="Rerun requests already in the output")
+    args = parser.parse_args(argv)
+
+    try:
+        limits = _parse_limits(args.provider_limit)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    defaults = dict(
+        DEFAULTS,
+        provider=args.provider,
+        model=args.model,
+        research_level=args.research_level,
+        temperature=args.temperature,
+        collection_mode=args.collection_mode,
+        routing=args.routing,
+        pipelined=args.pipelined,
+        fulltext=args.fulltext,
+    )
+
+    def report(record: dict) -> None:
+        message = record.get("error", "")
+        print(f"[{record['status']}] {record['id']} ({record['duration_s']}s) {message}", file=sys.stderr)
+
+    try:
+        summary = run_batch(
+            args.input, args.output,
+            max_workers=args.workers,
+            provider_limits=limits,
+            defaults=defaults,
+            resume=not args.no_resume,
+            on_result=report,
+        )
+    except KeyboardInterrupt:
+        print("Interrupted; rerun the same command to resume.", file=sys.stderr)
+        return 130
+    except ValueError as e:
+        parser.error(str(e))
+
+    print(json.dumps(summary))
+    return 1 if summary["error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+import json
+import re
+import time
+import uuid
+from hashlib import sha1
+from types import SimpleNamespace
+from aisuite.framework import ChatCompletionResponse
+from aisuite.framework.message import ChatCompletionMessageToolCall, CompletionUsage, Function
+
+# Substrings of each agent prompt, used to decide what the mock should answer.
+STAGE_MARKERS = [
+    ("queries", "short search queries"),
+    ("corpus", "academic data collection"),
+    ("analysis", "AI research analyst"),
+    ("gaps", "AI research strategist"),
+    ("topics", "research topic formulation"),
+]
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class MockProvider:
+    """
+    An aisuite-compatible provider that answers the Quest0 agent prompts with
+    canned JSON after a configurable delay, without any network access.
+
+    Args:
+        - latency (float): Fixed delay per completion, in seconds (default 0.05)
+        - seconds_per_token (float): Extra delay per generated token (default 0)
+        - corpus_size (int): Papers returned by the collector prompt (default 10)
+        - n_themes / n_gaps / n_topics (int): Sizes of the other stage outputs
+        - text_tokens (int): Approximate length of each generated text field
+        - use_tools (bool): Make one round of tool calls before answering the
+          collector prompt, so aisuite's tool loop and the search tools are exercised
+    """
+
+    def __init__(
+            self,
+            latency: float = 0.05,
+            seconds_per_token: float = 0.0,
+            corpus_size: int = 10,
+            n_themes: int = 4,
+            n_gaps: int = 5,
+            n_topics: int = 5,
+            text_tokens: int = 40,
+            use_tools: bool = True
+    ):
+        self.latency = latency
+        self.seconds_per_token = seconds_per_token
+        self.corpus_size = corpus_size
+        self.n_themes = n_themes
+        self.n_gaps = n_gaps
+        self.n_topics = n_topics
+        self.text_tokens = text_tokens
+        self.use_tools = use_tools
+        self.calls = 0
+
+    def _text(self, label: str) -> str:
+        return " ".join([label] + ["lorem"] * max(0, self.text_tokens - 1))
+
+    @staticmethod
+    def _limit(prompt: str, pattern: str, default: int) -> int:
+        # The agents state their item limits in the prompt (smaller for overlapped batches)
+        match = re.search(pattern, prompt)
+        return min(default, int(match.group(1))) if match else default
+
+    def _answer(self, stage: str, prompt: str) -> str:
+        # Gaps and topics derived from different inputs get different titles
+        digest = sha1(prompt.encode()).hexdigest()[:6]
+        if stage == "queries":
+            return json.dumps(["mock query one", "mock query two", "mock query three"])
+        if stage == "corpus":
+            return json.dumps({"corpus": [
+                {
+                    # Distinct titles, so local near-duplicate detection keeps them all
+                    "title": f"Mock paper {sha1(str(i).encode()).hexdigest()[:12]}",
+                    "authors": "A. Author, B. Author",
+                    "year": str(2020 + i % 6),
+                    "abstract": self._text(f"Abstract {i}."),
+                    "source": "arxiv" if i % 2 else "web",
+                    "url": f"http://arxiv.org/abs/mock.{i:05d}",
+                }
+                for i in range(self.corpus_size)
+            ]})
+        if stage == "analysis":
+            return json.dumps({
+                "themes": [
+                    {
+                        "name": f"Theme {i}",
+                        "summary": self._text(f"Theme {i} summary."),
+                        "representative_papers": [f"Mock paper {sha1(str(i).encode()).hexdigest()[:12]}"],
+                    }
+                    for i in range(self.n_themes)
+                ],
+                "emerging_trends": [f"Trend {i}" for i in range(3)],
+                "common_limitations": [f"Limitation {i}" for i in range(3)],
+            })
+        if stage == "gaps":
+            return json.dumps({"research_gaps": [
+                {
+                    "gap_title": f"Gap {i} {digest}",
+                    "description": self._text(f"Gap {i} description."),
+                    "evidence_from_analysis": f"Limitation {i % 3}",
+                    "potential_impact": "High",
+                }
+                for i in range(self._limit(prompt, r"at most (\d+) gaps", self.n_gaps))
+            ]})
+        if stage == "topics":
+            # Each topic names one of the input gaps (the prompt's example gap comes after
+            # them). `prompt` is the JSON-encoded message list, so its quotes are escaped.
+            listed = prompt.split("Research gaps:", 1)[-1].split("Research level:", 1)[0]
+            gaps = re.findall(r'gap_title\\?": \\?"([^"\\]+)', listed) or [""]
+            return json.dumps({"research_topics": [
+                {
+                    "gap_title": gaps[i % len(gaps)],
+                    "topic_title": f"Topic {i} {digest}",
+                    "research_question": self._text(f"Question {i}?"),
+                    "motivation": self._text("Motivation."),
+                    "suggested_methodology": self._text("Method."),
+                    "expected_contribution": self._text("Contribution."),
+                }
+                for i in range(self._limit(prompt, r"between \d+ and (\d+) topics", self.n_topics))
+            ]})
+        return json.dumps({"echo": prompt[:200]})
+
+    @staticmethod
+    def _stage(messages: list) -> str:
+        prompt = next(
+            (m.get("content") or "" for m in messages if isinstance(m, dict) and m.get("role") == "user"),
+            "",
+        )
+        for stage, marker in STAGE_MARKERS:
+            if marker in prompt:
+                return stage
+        return "unknown"
+
+    def _tool_calls(self, tools) -> list:
+        calls = []
+        for spec in tools or []:
+            name = spec["function"]["name"] if isinstance(spec, dict) else getattr(spec, "__name__", "")
+            if name in ("arxiv_search_tool", "tavily_search_tool"):
+                calls.append(ChatCompletionMessageToolCall(
+                    id=f"call_{uuid.uuid4().hex[:8]}",
+                    type="function",
+                    function=Function(
+                        name=name, arguments=json.dumps({"query": "mock query", "max_results": 5})
+                    ),
+                ))
+        return calls
+
+    def chat_completions_create(self, model: str, messages: list, _stream: bool = False, **kwargs):
+        self.calls += 1
+        stage = self._stage(messages)
+        prompt = json.dumps(messages, default=str)
+
+        already_called_tools = any(
+            (m.get("role") if isinstance(m, dict) else getattr(m, "role", None)) == "tool"
+            for m in messages
+        )
+        tool_calls = None
+        if stage == "corpus" and self.use_tools and kwargs.get("tools") and not already_called_tools:
+            tool_calls = self._tool_calls(kwargs["tools"]) or None
+
+        content = None if tool_calls else self._answer(stage, prompt)
+        completion_tokens = _estimate_tokens(content or "")
+        # Streamed responses pay the per-token delay chunk by chunk instead
+        time.sleep(self.latency + (0 if _stream else self.seconds_per_token * completion_tokens))
+
+        response = ChatCompletionResponse()
+        response.choices[0].message.content = content
+        response.choices[0].message.tool_calls = tool_calls
+        response.choices[0].finish_reason = "tool_calls" if tool_calls else "stop"
+        response.usage = CompletionUsage(
+            prompt_tokens=_estimate_tokens(prompt),
+            completion_tokens=completion_tokens,
+            total_tokens=_estimate_tokens(prompt) + completion_tokens,
+        )
+        return response
+
+    def chat_completions_create_stream(self, model: str, messages: list, chunk_chars: int = 16, **kwargs):
+        response = self.chat_completions_create(model, messages, _stream=True, **kwargs)
+        content = response.choices[0].message.content or ""
+        for i in range(0, len(content), chunk_chars):
+            delta = SimpleNamespace(content=content[i:i + chunk_chars])
+            time.sleep(self.seconds_per_token * _estimate_tokens(delta.content))
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+def install_mock_provider(client, provider_keys=("openai", "groq"), **options) -> MockProvider:
+    """
+    Registers one MockProvider on an aisuite Client under the given provider keys,
+    so calls such as "openai:any-model" are answered locally.
+    """
+    provider = MockProvider(**options)
+    for key in provider_keys:
+        client.providers[key] = provider
+    return provider
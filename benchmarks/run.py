@@ -0,0 +1,219 @@
+"""
+Offline benchmarks for the Quest0 pipeline.
+
+Every LLM call is answered by benchmarks.mock_provider and both search tools
+are served from recorded fixtures (benchmarks/stand_ins.py), so no API keys or
+network access are needed. Results are printed (or written) as JSON.
+
+    python -m benchmarks.run --scenario all --sizes 10 50 200 --output bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep benchmark caches away from the user's caches (must happen before the imports below).
+_BENCH_DIR = tempfile.mkdtemp(prefix="quest0-bench-")
+os.environ.setdefault("QUEST0_CACHE_PATH", os.path.join(_BENCH_DIR, "search.sqlite3"))
+os.environ.setdefault("QUEST0_LLM_CACHE_PATH", os.path.join(_BENCH_DIR, "llm.sqlite3"))
+os.environ.setdefault("QUEST0_LLM_CACHE", "off")
+os.environ.setdefault("QUEST0_PAPER_INDEX_DIR", os.path.join(_BENCH_DIR, "paper_index"))
+os.environ.setdefault("QUEST0_FULLTEXT_DIR", os.path.join(_BENCH_DIR, "fulltext"))
+
+from agents import llm  # noqa: E402
+from agents.pipeline import StageMemo, iter_pipeline  # noqa: E402
+from tools.cache import search_cache  # noqa: E402
+from tools.paper_index import get_paper_index  # noqa: E402
+from benchmarks.mock_provider import install_mock_provider  # noqa: E402
+from benchmarks.stand_ins import FixtureServer, install_search_stand_ins, paper_pdfs  # noqa: E402
+
+
+def summarize(samples: list[float]) -> dict:
+    """
+    Summary statistics (seconds) for a list of latency samples.
+    """
+    ordered = sorted(samples)
+    return {
+        "n": len(ordered),
+        "mean": statistics.fmean(ordered),
+        "median": statistics.median(ordered),
+        "p95": ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))],
+        "min": ordered[0],
+        "max": ordered[-1],
+    }
+
+
+def run_once(params: dict) -> dict:
+    """
+    Runs the full pipeline cold (empty search cache and paper index) and
+    returns per-stage and end-to-end latency.
+    """
+    search_cache.clear()
+    if get_paper_index() is not None:
+        get_paper_index().clear()
+    stages = {}
+    start = last = time.perf_counter()
+    for name, _, _ in iter_pipeline(params, memo=StageMemo()):
+        now = time.perf_counter()
+        stages[name] = now - last
+        last = now
+    return {"total": last - start, "stages": stages}
+
+
+def scenario_latency(base_params: dict, mock, sizes: list[int], repeat: int) -> list[dict]:
+    results = []
+    for mode in ("agent", "prefetch"):
+        for size in sizes:
+            mock.corpus_size = size
+            runs = [run_once(dict(base_params, collection_mode=mode)) for _ in range(repeat)]
+            results.append({
+                "scenario": "latency",
+                "collection_mode": mode,
+                "corpus_size": size,
+                "end_to_end": summarize([r["total"] for r in runs]),
+                "stages": {
+                    stage: summarize([r["stages"][stage] for r in runs])
+                    for stage in runs[0]["stages"]
+                },
+            })
+    return results
+
+
+def scenario_throughput(base_params: dict, mock, concurrency: list[int], runs_per_level: int) -> list[dict]:
+    results = []
+    for workers in concurrency:
+        params = [dict(base_params, domain=f"{base_params['domain']} #{i}") for i in range(runs_per_level)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            runs = list(executor.map(run_once, params))
+        elapsed = time.perf_counter() - start
+        results.append({
+            "scenario": "throughput",
+            "concurrency": workers,
+            "runs": runs_per_level,
+            "elapsed_s": elapsed,
+            "runs_per_s": runs_per_level / elapsed,
+            "end_to_end": summarize([r["total"] for r in runs]),
+        })
+    return results
+
+
+def scenario_memory(base_params: dict, mock, sizes: list[int]) -> list[dict]:
+    results = []
+    for size in sizes:
+        mock.corpus_size = size
+        tracemalloc.start()
+        run_once(base_params)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results.append({"scenario": "memory", "corpus_size": size, "peak_bytes": peak})
+    return results
+
+
+def scenario_fulltext(papers: list[dict], concurrency: list[int]) -> list[dict]:
+    """
+    Full-text retrieval of `papers`: a cold fetch (empty store) and a warm one
+    (everything stored) per download concurrency.
+    """
+    from tools.fulltext import FullTextStore, fetch_sections
+
+    results = []
+    for downloads in concurrency:
+        store = FullTextStore(tempfile.mkdtemp(dir=_BENCH_DIR, prefix="fulltext-"))
+        for run in ("cold", "warm"):
+            start = time.perf_counter()
+            excerpts = fetch_sections(papers, max_downloads=downloads, store=store)
+            results.append({
+                "scenario": "fulltext",
+                "papers": len(papers),
+                "downloads": downloads,
+                "run": run,
+                "elapsed_s": time.perf_counter() - start,
+                "papers_with_sections": len(excerpts),
+            })
+    return results
+
+
+def main(argv: list[str] = None) -> dict:
+    parser = argparse.ArgumentParser(description="Offline Quest0 pipeline benchmarks")
+    parser.add_argument("--scenario", choices=["latency", "throughput", "memory", "fulltext", "all"], default="all")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200], help="Corpus sizes")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per latency measurement")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--runs", type=int, default=8, help="Pipelines per throughput level")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Mock seconds per completion")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Mock seconds per output token")
+    parser.add_argument("--search-latency", type=float, default=0.02, help="Stand-in seconds per search")
+    parser.add_argument(
+        "--rank-top-k", type=int, default=30, help="Papers kept for analysis after ranking (0 = keep all)"
+    )
+    parser.add_argument(
+        "--pipelined", action="store_true", help="Overlap analysis, gaps and topics (see agents/overlap.py)"
+    )
+    parser.add_argument("--output", help="Write JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    mock = install_mock_provider(
+        llm.get_client(), latency=args.llm_latency, seconds_per_token=args.token_latency
+    )
+    base_params = {
+        "domain": "explainable AI in healthcare",
+        "provider": "openai",
+        "model": "mock",
+        "temperature": 0.0,
+        "research_level": "PhD",
+        "collection_mode": "agent",
+        "analyzer_budget": 4000,
+        "analysis_shard_size": 20,
+        "rank_top_k": args.rank_top_k,
+        "pipelined": args.pipelined,
+    }
+
+    results = []
+    pdfs = paper_pdfs(max(args.sizes)) if args.scenario in ("fulltext", "all") else {}
+    with FixtureServer(total_results=max(args.sizes), latency=args.search_latency, files=pdfs) as server:
+        install_search_stand_ins(server, tavily_latency=args.search_latency)
+        if args.scenario in ("latency", "all"):
+            results += scenario_latency(base_params, mock, args.sizes, args.repeat)
+        if args.scenario in ("throughput", "all"):
+            mock.corpus_size = args.sizes[0]
+            results += scenario_throughput(base_params, mock, args.concurrency, args.runs)
+        if args.scenario in ("memory", "all"):
+            results += scenario_memory(base_params, mock, args.sizes)
+        if args.scenario in ("fulltext", "all"):
+            papers = [
+                {"title": path, "url": f"http://arxiv.org/abs/{path.removeprefix('/pdf/')}"}
+                for path in list(pdfs)[:args.sizes[0]]
+            ]
+            results += scenario_fulltext(papers, args.concurrency)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "options": vars(args),
+            "llm_calls": mock.calls,
+        },
+        "results": results,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+import copy
+import json
+import os
+import re
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from xml.etree import ElementTree as ET
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+ATOM = "{http://www.w3.org/2005/Atom}"
+
+ET.register_namespace("", "http://www.w3.org/2005/Atom")
+ET.register_namespace("opensearch", "http://a9.com/-/spec/opensearch/1.1/")
+ET.register_namespace("arxiv", "http://arxiv.org/schemas/atom")
+
+
+def load_fixture(name: str):
+    """
+    Reads a recorded fixture (JSON files are decoded, anything else is bytes).
+    """
+    path = os.path.join(FIXTURES_DIR, name)
+    if name.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class ArxivFeed:
+    """
+    Serves pages of a recorded arXiv Atom feed. The recorded entries are cycled
+    (with unique ids and titles) so any corpus size can be requested.
+    """
+
+    def __init__(self, total_results: int = 50, fixture: str = "arxiv_feed.xml"):
+        self.total_results = total_results
+        self.template = ET.fromstring(load_fixture(fixture))
+        self.entries = self.template.findall(f"{ATOM}entry")
+        for entry in self.entries:
+            self.template.remove(entry)
+
+    def page(self, start: int, max_results: int) -> bytes:
+        feed = copy.deepcopy(self.template)
+        for index in range(start, min(start + max_results, self.total_results)):
+            entry = copy.deepcopy(self.entries[index % len(self.entries)])
+            if index >= len(self.entries):
+                id_elem = entry.find(f"{ATOM}id")
+                id_elem.text = re.sub(r"\.\d{5}", f".{index:05d}", id_elem.text, count=1)
+                entry.find(f"{ATOM}title").text += f" (variant {index})"
+            feed.append(entry)
+        return ET.tostring(feed, encoding="utf-8", xml_declaration=True)
+
+
+def make_pdf(lines: list[str]) -> bytes:
+    """
+    Builds a small valid one-page PDF showing `lines` of text (Flate-compressed),
+    for serving as a stand-in paper.
+    """
+    escaped = [line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") for line in lines]
+    content = "BT /F1 10 Tf 14 TL 72 760 Td " + " ".join(f"({line}) Tj T*" for line in escaped) + " ET"
+    stream = zlib.compress(content.encode("latin-1", "replace"))
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream) + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf, offsets = b"%PDF-1.4\n", []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return pdf
+
+
+def paper_pdfs(total_results: int = 50) -> dict:
+    """
+    One stand-in PDF per paper of ArxivFeed(total_results), keyed by the path
+    FixtureServer serves it under ("/pdf/<arxiv id>"). Every paper has
+    Limitations and Future Work sections.
+    """
+    feed = ET.fromstring(ArxivFeed(total_results).page(0, total_results))
+    files = {}
+    for entry in feed.findall(f"{ATOM}entry"):
+        arxiv_id = re.sub(r"v\d+$", "", entry.find(f"{ATOM}id").text.rsplit("/abs/", 1)[-1])
+        title = " ".join(entry.find(f"{ATOM}title").text.split())
+        files[f"/pdf/{arxiv_id}"] = make_pdf([
+            title,
+            "1 Introduction",
+            f"This paper studies {title.lower()}.",
+            "5 Limitations",
+            f"Our evaluation of {arxiv_id} uses a single dataset and small cohorts.",
+            "6 Future Work",
+            "Extending the method to multimodal data remains open.",
+            "References",
+            "[1] A. Author. A paper. 2020.",
+        ])
+    return files
+
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    feed: ArxivFeed = None
+    files: dict = {}
+    failures: dict = {}
+    latency: float = 0.0
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if self.latency:
+            threading.Event().wait(self.latency)
+
+        if self.failures.get(url.path):
+            status = self.failures[url.path].pop(0)
+            self.send_response(status)
+            if status == 429:
+                self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        if url.path in self.files:
+            body, content_type = self.files[url.path], "application/octet-stream"
+        elif url.path == "/api/query":
+            query = parse_qs(url.query)
+            body = self.feed.page(
+                int(query.get("start", ["0"])[0]), int(query.get("max_results", ["10"])[0])
+            )
+            content_type = "application/atom+xml; charset=utf-8"
+        else:
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer:
+    """
+    A local HTTP stand-in for export.arxiv.org that can also serve fixed files
+    (e.g. {"/pdf/1234": b"%PDF..."}) and fail requests first with the statuses
+    in `failures` (e.g. {"/api/query": [503, 429]}: two failures, then the feed).
+
+    Usage:
+        with FixtureServer(total_results=200) as server:
+            install_search_stand_ins(server)
+    """
+
+    def __init__(self, total_results: int = 50, latency: float = 0.0, files: dict = None, failures: dict = None):
+        handler = type(
+            "FixtureHandler", (_FixtureHandler,),
+            {
+                "feed": ArxivFeed(total_results), "latency": latency, "files": files or {},
+                "failures": {path: list(statuses) for path, statuses in (failures or {}).items()},
+            },
+        )
+        self.failures = handler.failures
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def arxiv_url(self) -> str:
+        return f"{self.base_url}/api/query"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeTavilyClient:
+    """
+    Stand-in for TavilyClient that answers every search from a recorded fixture.
+    """
+
+    def __init__(self, latency: float = 0.0, fixture: str = "tavily_results.json"):
+        self.latency = latency
+        self.recorded = load_fixture(fixture)
+
+    def search(self, query: str, max_results: int = 5, include_images: bool = False, **kwargs) -> dict:
+        if self.latency:
+            threading.Event().wait(self.latency)
+        recorded = self.recorded["results"]
+        results = []
+        for i in range(max_results):
+            result = dict(recorded[i % len(recorded)])
+            if i >= len(recorded):
+                result["title"] = f"{result['title']} ({i})"
+                result["url"] = f"{result['url']}-{i}"
+            results.append(result)
+        return {"query": query, "results": results, "images": self.recorded.get("images", [])}
+
+
+def install_search_stand_ins(server: FixtureServer, tavily_latency: float = 0.0) -> None:
+    """
+    Points both search tools (and arXiv PDF downloads) at local stand-ins and
+    lifts the rate limit for them.
+    """
+    from tools import arxiv_search, fulltext, transport
+
+    arxiv_search.ARXIV_API_URL = server.arxiv_url
+    fulltext.ARXIV_PDF_URL = server.base_url + "/pdf"
+    transport.HOST_RATE_LIMITS[urlparse(server.base_url).netloc] = (1e6, 10 ** 6)
+    transport.HOST_RATE_LIMITS["api.tavily.com"] = (1e6, 10 ** 6)
+    transport.set_tavily_client(FakeTavilyClient(latency=tavily_latency))
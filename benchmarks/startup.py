@@ -0,0 +1,94 @@
+"""
+Cold-start benchmark: how long a fresh interpreter takes to import each entry
+point, and which imports dominate. Every sample runs in a new subprocess so
+nothing is already in sys.modules.
+
+    python -m benchmarks.startup --repeat 5 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = ["agents.pipeline", "agents.llm", "tools.arxiv_search", "tools.web_search", "batch"]
+
+
+def cold_import_seconds(module: str) -> float:
+    """
+    Wall time of `python -c "import <module>"` in a fresh interpreter.
+    """
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", f"import {module}"], cwd=ROOT, check=True)
+    return time.perf_counter() - start
+
+
+PROJECT_PACKAGES = {"agents", "tools", "benchmarks", "batch", "app"}
+
+
+def _import_times(code: str) -> list[tuple[str, int]]:
+    # -X importtime lines: "import time: self [us] | cumulative | imported package"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, check=True, capture_output=True, text=True,
+    )
+    times = []
+    for line in result.stderr.splitlines():
+        parts = line.removeprefix("import time:").split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            times.append((parts[2].strip(), int(parts[1])))
+    return times
+
+
+def import_costs(module: str, top: int = 10) -> list[dict]:
+    """
+    The most expensive third-party and standard-library packages pulled in by
+    importing `module` (interpreter start-up imports excluded).
+
+    Returns:
+        - list[dict]: {"package", "cumulative_ms"} entries, most expensive first.
+    """
+    startup = {name for name, _ in _import_times("pass")}
+    costs = {}
+    for name, cumulative in _import_times(f"import {module}"):
+        package = name.split(".")[0]
+        if name in startup or package in PROJECT_PACKAGES:
+            continue
+        # A package's first (outermost) import carries its whole cumulative cost
+        costs[package] = max(costs.get(package, 0), cumulative)
+    ranked = sorted(costs.items(), key=lambda item: item[1], reverse=True)[:top]
+    return [{"package": package, "cumulative_ms": round(us / 1000, 1)} for package, us in ranked]
+
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Measure cold-start import time of Quest0 entry points.")
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES)
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per module")
+    parser.add_argument("--top", type=int, default=8, help="Most expensive imports to report")
+    parser.add_argument("--output", help="Write JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    baseline = statistics.median(cold_import_seconds("sys") for _ in range(args.repeat))
+    results = {"python": sys.version.split()[0], "interpreter_s": round(baseline, 4), "modules": {}}
+    for module in args.modules:
+        samples = [cold_import_seconds(module) - baseline for _ in range(args.repeat)]
+        results["modules"][module] = {
+            "median_s": round(statistics.median(samples), 4),
+            "max_s": round(max(samples), 4),
+            "top_imports": import_costs(module, args.top),
+        }
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import os
+import sys
+import tempfile
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep test caches and stores away from the user's (must happen before the project imports).
+_TEST_DIR = tempfile.mkdtemp(prefix="quest0-test-")
+os.environ.setdefault("QUEST0_CACHE_PATH", os.path.join(_TEST_DIR, "search.sqlite3"))
+os.environ.setdefault("QUEST0_LLM_CACHE_PATH", os.path.join(_TEST_DIR, "llm.sqlite3"))
+os.environ.setdefault("QUEST0_LLM_CACHE", "off")
+os.environ.setdefault("QUEST0_PAPER_INDEX", "off")
+os.environ.setdefault("QUEST0_FULLTEXT_DIR", os.path.join(_TEST_DIR, "fulltext"))
+
+
+@pytest.fixture
+def search_stand_ins(monkeypatch):
+    """
+    Points both search tools (and arXiv PDF downloads) at the benchmark's
+    local stand-ins for the duration of a test, with an empty search cache.
+    """
+    from urllib.parse import urlparse
+    from benchmarks.stand_ins import FakeTavilyClient, FixtureServer
+    from tools import arxiv_search, fulltext, transport
+    from tools.cache import search_cache
+
+    search_cache.clear()
+    with FixtureServer(total_results=40) as server:
+        monkeypatch.setattr(arxiv_search, "ARXIV_API_URL", server.arxiv_url)
+        monkeypatch.setattr(fulltext, "ARXIV_PDF_URL", server.base_url + "/pdf")
+        for host in (urlparse(server.base_url).netloc, "api.tavily.com"):
+            monkeypatch.setitem(transport._buckets, host, transport.TokenBucket(1e6, 10 ** 6))
+        transport.set_tavily_client(FakeTavilyClient())
+        try:
+            yield server
+        finally:
+            transport.set_tavily_client(None)
+            search_cache.clear()
+
+
+@pytest.fixture
+def mock_llm(monkeypatch):
+    """
+    Answers every LLM call with the benchmark's MockProvider (no latency)
+    behind a fresh aisuite client, with an empty LLM cache.
+    """
+    from aisuite import Client
+    from agents import llm
+    from benchmarks.mock_provider import install_mock_provider
+
+    client = Client()
+    provider = install_mock_provider(client, latency=0)
+    monkeypatch.setattr(llm, "_client", client)
+    llm.llm_cache.clear()
+    yield provider
+    llm.llm_cache.clear()
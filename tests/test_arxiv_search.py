@@ -0,0 +1,36 @@
+import io
+from tools import arxiv_search
+
+FEED = b"""<feed xmlns="http://www.w3.org/2005/Atom">
+<entry><id>http://arxiv.org/abs/2401.00001v1</id><title>Good paper</title>
+<published>2024-01-02T00:00:00Z</published><summary>An abstract.</summary></entry>
+<entry><id>http://arxiv.org/abs/2401.00002v1</id><published>2024-01-02T00:00:00Z</published></entry>
+<entry><id>http://arxiv.org/abs/2401.00003v1</id><title>Another paper</title>
+<published>2023-05-06T00:00:00Z</published><summary>Another abstract.</summary></entry>
+</feed>"""
+
+
+class FakeResponse:
+    def __init__(self, body: bytes):
+        self.raw = io.BytesIO(body)
+        self.content = body
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_stream_skips_malformed_entries(monkeypatch):
+    monkeypatch.setattr(arxiv_search, "http_get", lambda *args, **kwargs: FakeResponse(FEED))
+    results = list(arxiv_search.arxiv_search_stream("query", max_results=10, page_size=10))
+    assert [r["title"] for r in results] == ["Good paper", "Another paper"]
+
+
+def test_tool_skips_malformed_entries(monkeypatch):
+    monkeypatch.setattr(arxiv_search, "http_get", lambda *args, **kwargs: FakeResponse(FEED))
+    monkeypatch.setattr(arxiv_search, "ingest", lambda results, source: None)
+    arxiv_search.search_cache.clear()
+    results = arxiv_search.arxiv_search_tool("malformed feed query", max_results=10)
+    assert [r["title"] for r in results] == ["Good paper", "Another paper"]
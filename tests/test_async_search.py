@@ -0,0 +1,53 @@
+import asyncio
+import threading
+import time
+from tools import async_search
+
+
+class SlowSource:
+    """
+    A search source that takes `seconds` and records how many calls overlap.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, query: str, max_results: int = 5) -> list[dict]:
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(self.seconds)
+        with self._lock:
+            self.running -= 1
+        return [{"title": query}]
+
+
+def collect(searches, **kwargs) -> list[dict]:
+    async def run():
+        return [batch async for batch in async_search.fan_out_search(searches, **kwargs)]
+
+    return asyncio.run(run())
+
+
+def test_timed_out_searches_keep_their_slot(monkeypatch):
+    source = SlowSource(0.3)
+    monkeypatch.setitem(async_search.SOURCES, "arxiv", source)
+
+    batches = collect([("arxiv", f"q{i}") for i in range(6)], max_concurrency=2, timeout=0.05)
+
+    assert len(batches) == 6
+    assert all("timed out" in batch["results"][0]["error"] for batch in batches)
+    assert source.peak == 2
+
+
+def test_results_arrive_as_searches_finish(monkeypatch):
+    monkeypatch.setitem(async_search.SOURCES, "arxiv", SlowSource(0.2))
+    monkeypatch.setitem(async_search.SOURCES, "tavily", SlowSource(0.01))
+
+    batches = collect([("arxiv", "slow"), ("tavily", "fast")], max_concurrency=2, timeout=5)
+
+    assert [batch["query"] for batch in batches] == ["fast", "slow"]
+    assert batches[1]["results"] == [{"title": "slow"}]
@@ -0,0 +1,77 @@
+import json
+import threading
+import time
+import pytest
+import batch
+
+
+def write_items(path, items):
+    path.write_text("".join(json.dumps(item) + "\n" for item in items))
+
+
+def fake_run_item(durations: dict, log: list):
+    lock = threading.Lock()
+
+    def run_item(item: dict) -> dict:
+        with lock:
+            log.append(("start", item["id"]))
+        time.sleep(durations.get(item["provider"], 0.05))
+        with lock:
+            log.append(("end", item["id"]))
+        return {"id": item["id"], "status": "ok"}
+
+    return run_item
+
+
+def test_saturated_provider_does_not_block_others(tmp_path, monkeypatch):
+    log = []
+    monkeypatch.setattr(batch, "run_item", fake_run_item({"groq": 0.2, "openai": 0.01}, log))
+    items = [{"id": f"g{i}", "domain": "d", "provider": "groq"} for i in range(3)]
+    items += [{"id": f"o{i}", "domain": "d", "provider": "openai"} for i in range(3)]
+    write_items(tmp_path / "in.jsonl", items)
+
+    summary = batch.run_batch(
+        str(tmp_path / "in.jsonl"), str(tmp_path / "out.jsonl"), max_workers=2, provider_limits={"groq": 1}
+    )
+    assert summary["ok"] == 6
+    # Every openai item ran while the first groq item was still in flight
+    assert log.index(("end", "o2")) < log.index(("end", "g0"))
+    # groq never ran two items at once
+    running, peak = 0, 0
+    for event, item_id in log:
+        if item_id.startswith("g"):
+            running += 1 if event == "start" else -1
+            peak = max(peak, running)
+    assert peak == 1
+
+
+def test_interrupt_records_items_already_running(tmp_path, monkeypatch):
+    log = []
+    monkeypatch.setattr(batch, "run_item", fake_run_item({"groq": 0.2, "openai": 0.01}, log))
+    write_items(tmp_path / "in.jsonl", [
+        {"id": "fast", "domain": "d", "provider": "openai"},
+        {"id": "slow", "domain": "d", "provider": "groq"},
+        {"id": "later", "domain": "d", "provider": "groq"},
+    ])
+
+    def interrupt(record):
+        if record["id"] == "fast":
+            raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        batch.run_batch(
+            str(tmp_path / "in.jsonl"), str(tmp_path / "out.jsonl"),
+            max_workers=2, provider_limits={"groq": 1}, on_result=interrupt
+        )
+    assert batch.completed_ids(str(tmp_path / "out.jsonl")) == {"fast", "slow"}
+
+
+def test_default_items_run_every_stage_on_their_provider(tmp_path, monkeypatch):
+    from agents import pipeline
+
+    monkeypatch.setattr(pipeline, "provider_available", lambda provider: True)
+    write_items(tmp_path / "in.jsonl", [{"domain": "d", "provider": "openai", "model": "gpt-4o-mini"}])
+    item = batch.load_items(str(tmp_path / "in.jsonl"))[0]
+
+    for stage in ("corpus", "analysis", "gaps", "topics"):
+        assert pipeline.stage_model(item, stage) == ("openai", "gpt-4o-mini")
@@ -0,0 +1,59 @@
+import json
+
+from agents.pipeline import run_pipeline
+from benchmarks import run as bench
+from benchmarks.mock_provider import MockProvider
+from tools import transport
+
+PARAMS = {
+    "domain": "explainable AI", "provider": "openai", "model": "mock", "temperature": 0.0,
+    "research_level": "PhD", "routing": "single", "rank_top_k": 0, "collection_mode": "agent",
+}
+
+
+def user(content: str) -> list:
+    return [{"role": "user", "content": content}]
+
+
+def test_mock_provider_answers_each_stage_prompt():
+    mock = MockProvider(latency=0, corpus_size=7)
+
+    def answer(prompt: str) -> dict:
+        return json.loads(mock.chat_completions_create("mock", user(prompt)).choices[0].message.content)
+
+    assert len(answer("You are an academic data collection agent.")["corpus"]) == 7
+    assert len(answer("Write short search queries for ...")) == 3
+    assert len(answer("You are an AI research strategist. Return at most 2 gaps.")["research_gaps"]) == 2
+    assert "echo" in answer("Something else entirely")
+
+    stream = mock.chat_completions_create_stream("mock", user("You are an AI research analyst."), chunk_chars=8)
+    assert "themes" in json.loads("".join(chunk.choices[0].delta.content for chunk in stream))
+    assert mock.calls == 5
+
+
+def test_pipeline_runs_offline_on_the_mock_provider(mock_llm, search_stand_ins):
+    mock_llm.corpus_size = 6
+    outputs = run_pipeline(PARAMS)
+
+    assert len(json.loads(outputs["corpus"])["corpus"]) == 6
+    gaps = {gap["gap_title"] for gap in json.loads(outputs["gaps"])["research_gaps"]}
+    topics = json.loads(outputs["topics"])["research_topics"]
+    assert topics and {topic["gap_title"] for topic in topics} <= gaps
+
+
+def test_latency_scenario_writes_its_report(mock_llm, search_stand_ins, tmp_path, monkeypatch):
+    # main() installs the stand-ins itself; keep its global changes within this test
+    monkeypatch.setattr(transport, "HOST_RATE_LIMITS", dict(transport.HOST_RATE_LIMITS))
+    output = tmp_path / "bench.json"
+    report = bench.main([
+        "--scenario", "latency", "--sizes", "8", "--repeat", "2", "--llm-latency", "0",
+        "--search-latency", "0", "--rank-top-k", "0", "--output", str(output),
+    ])
+
+    assert json.loads(output.read_text()) == json.loads(json.dumps(report))
+    assert [r["collection_mode"] for r in report["results"]] == ["agent", "prefetch"]
+    for result in report["results"]:
+        assert result["corpus_size"] == 8
+        assert result["end_to_end"]["n"] == 2
+        assert set(result["stages"]) == {"corpus", "analysis", "gaps", "topics"}
+    assert report["meta"]["llm_calls"] > 0
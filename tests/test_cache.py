@@ -0,0 +1,68 @@
+import pytest
+from benchmarks.stand_ins import FakeTavilyClient
+from tools import cache, transport, web_search
+from tools.cache import ResultCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    return now
+
+
+def test_entries_expire_after_their_namespace_ttl(tmp_path, clock):
+    results = ResultCache(str(tmp_path / "cache.sqlite3"), ttls={"arxiv": 60, "tavily": 10})
+    results.set("arxiv", "Explainable  AI", [{"title": "A"}], max_results=5)
+    results.set("tavily", "explainable ai", [{"title": "B"}], max_results=5)
+
+    clock[0] += 30
+    # Queries are normalized; other parameters make another entry
+    assert results.get("arxiv", "explainable ai", max_results=5) == [{"title": "A"}]
+    assert results.get("arxiv", "explainable ai", max_results=10) is None
+    assert results.get("tavily", "explainable ai", max_results=5) is None
+
+    clock[0] += 31
+    assert results.get("arxiv", "explainable ai", max_results=5) is None
+    assert results.stats == {"hits": 1, "misses": 3, "evictions": 0}
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    results = ResultCache(str(tmp_path / "cache.sqlite3"), max_entries=2)
+    for query in ("a", "b"):
+        clock[0] += 1
+        results.set("arxiv", query, query)
+    clock[0] += 1
+    assert results.get("arxiv", "a") == "a"  # "b" is now the least recently used
+
+    clock[0] += 1
+    results.set("arxiv", "c", "c")
+
+    assert results.stats["evictions"] == 1
+    assert [results.get("arxiv", q) for q in "abc"] == ["a", None, "c"]
+
+
+def test_entries_persist_across_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    ResultCache(path).set("tavily", "query", {"results": [1, 2]})
+    assert ResultCache(path).get("tavily", "query") == {"results": [1, 2]}
+
+
+def test_search_tool_answers_repeated_queries_from_the_cache(monkeypatch):
+    class CountingClient(FakeTavilyClient):
+        calls = 0
+
+        def search(self, query: str, **kwargs) -> dict:
+            CountingClient.calls += 1
+            return super().search(query, **kwargs)
+
+    monkeypatch.setattr(web_search, "ingest", lambda results, source: None)
+    transport.set_tavily_client(CountingClient())
+    try:
+        first = web_search.tavily_search_tool("cache test query", max_results=2)
+        again = web_search.tavily_search_tool("  Cache TEST query ", max_results=2)
+    finally:
+        transport.set_tavily_client(None)
+
+    assert first == again and len(first) == 2
+    assert CountingClient.calls == 1
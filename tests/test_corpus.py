@@ -0,0 +1,55 @@
+import json
+from agents.corpus import compact_corpus, estimate_tokens, merge_analyses, normalize_entry
+from tools.arxiv_search import arxiv_search_tool
+
+
+def test_merge_analyses_combines_themes_and_dedupes_items():
+    merged = merge_analyses([
+        {"themes": [{"name": "XAI", "summary": "short", "representative_papers": ["A"]}],
+         "emerging_trends": ["Trust"], "common_limitations": ["Small data"]},
+        {"themes": [{"name": "xai", "summary": "a longer summary", "representative_papers": ["B", "A"]}],
+         "emerging_trends": ["trust", "LLMs"], "common_limitations": []},
+    ])
+    assert merged["themes"] == [{"name": "XAI", "summary": "a longer summary", "representative_papers": ["A", "B"]}]
+    assert merged["emerging_trends"] == ["Trust", "LLMs"]
+    assert merged["common_limitations"] == ["Small data"]
+
+
+def test_merge_analyses_tolerates_null_fields():
+    merged = merge_analyses([
+        {"themes": None, "emerging_trends": None, "common_limitations": None},
+        {"themes": [{"name": None, "summary": None, "representative_papers": None}]},
+        {},
+    ])
+    assert merged["emerging_trends"] == [] and merged["common_limitations"] == []
+    assert merged["themes"] == [{"name": "", "summary": "", "representative_papers": []}]
+
+
+def stand_in_corpus(max_results: int = 20) -> list[dict]:
+    return [normalize_entry(item, "arxiv") for item in arxiv_search_tool("explainable ai", max_results)]
+
+
+def test_compaction_fits_the_budget_and_reports_what_it_trimmed(search_stand_ins):
+    corpus = stand_in_corpus()
+    corpus[0]["abstract"] = "Short."
+    text, report = compact_corpus(json.dumps({"corpus": corpus}), token_budget=1500)
+    compact = json.loads(text)["corpus"]
+
+    assert report["tokens_after"] == estimate_tokens(text) <= 1500 < report["tokens_before"]
+    assert report["entries_in"] == report["entries_out"] == len(compact) == 20
+    assert report["abstracts_truncated"] > 0
+    assert all("url" not in entry for entry in compact)
+    assert compact[0]["abstract"] == "Short."  # short abstracts are kept whole
+
+
+def test_compaction_drops_trailing_entries_when_even_bare_entries_do_not_fit(search_stand_ins):
+    text, report = compact_corpus({"corpus": stand_in_corpus()}, token_budget=100)
+    assert 0 < report["entries_out"] < 20 and report["dropped"] == 20 - report["entries_out"]
+    assert [entry["title"] for entry in json.loads(text)["corpus"]] == [
+        entry["title"] for entry in stand_in_corpus()[:report["entries_out"]]
+    ]
+
+
+def test_compaction_passes_unparsable_input_through():
+    text, report = compact_corpus("no corpus here", token_budget=10)
+    assert text == "no corpus here" and report["parsed"] is False
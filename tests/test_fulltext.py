@@ -0,0 +1,78 @@
+import os
+import sys
+import pytest
+from benchmarks.stand_ins import FixtureServer, make_pdf
+from tools.fulltext import FullTextStore, _basic_text, extract_text, select_sections
+
+PAPER = make_pdf([
+    "A Study of Things",
+    "1 Introduction",
+    "We study things.",
+    "5 Limitations and Future Work",
+    "Our evaluation uses a single dataset (and small cohorts).",
+    "References",
+    "[1] A. Author. A paper. 2020.",
+])
+
+
+@pytest.fixture
+def server():
+    files = {"/pdf/a": PAPER, "/pdf/b": PAPER, "/page": b"<html>Not found</html>"}
+    with FixtureServer(files=files) as server:
+        yield server, files
+
+
+def test_download_is_content_addressed_and_deduped_by_url(tmp_path, server):
+    server, files = server
+    store = FullTextStore(str(tmp_path))
+
+    digest = store.download(f"{server.base_url}/pdf/a")
+    assert store.download(f"{server.base_url}/pdf/b") == digest
+    assert os.listdir(tmp_path / "pdf") == [f"{digest}.pdf"]
+
+    # A URL seen before is answered from the store, not downloaded again
+    del files["/pdf/a"]
+    assert store.download(f"{server.base_url}/pdf/a") == digest
+
+
+def test_download_rejects_non_pdfs_and_oversized_files(tmp_path, server):
+    server, _ = server
+    store = FullTextStore(str(tmp_path))
+
+    with pytest.raises(ValueError, match="Not a PDF"):
+        store.download(f"{server.base_url}/page")
+    with pytest.raises(ValueError, match="larger than"):
+        store.download(f"{server.base_url}/pdf/a", max_bytes=len(PAPER) // 2)
+
+    assert os.listdir(tmp_path / "pdf") == []
+    assert store.digest_for(f"{server.base_url}/pdf/a") is None
+
+
+def test_extracted_text_keeps_lines_and_escapes(tmp_path, monkeypatch):
+    # The basic parser, even where pypdf is installed
+    monkeypatch.setitem(sys.modules, "pypdf", None)
+    pdf_path, text_path = tmp_path / "paper.pdf", tmp_path / "paper.txt"
+    pdf_path.write_bytes(PAPER)
+
+    assert extract_text(str(pdf_path), str(text_path)) == str(text_path)
+    text = text_path.read_text(encoding="utf-8")
+    assert text == _basic_text(PAPER)
+    assert text.splitlines()[3:5] == [
+        "5 Limitations and Future Work", "Our evaluation uses a single dataset (and small cohorts).",
+    ]
+
+
+def test_select_sections_by_heading_keyword():
+    text = "\n".join([
+        "1 Introduction", "We study things.",
+        "5 Limitations and Future Work", "A single dataset.", "Small cohorts.",
+        "6 Conclusion", "Things matter.",
+        "References", "[1] A paper.",
+    ])
+
+    found = select_sections(text, max_chars=12)
+
+    assert list(found) == ["limitations", "conclusion"]
+    assert found["limitations"] == "A single dat"
+    assert found["conclusion"] == "Things matte"
+    assert select_sections(text, ("discussion",)) == {}
@@ -0,0 +1,34 @@
+import gc
+import os
+import time
+from agents.history import ChatHistory, expire_spill_dirs, run_record
+
+
+def record(domain: str) -> dict:
+    return run_record(domain, [], [], [], [], [], [])
+
+
+def test_spilled_records_are_read_back_and_deleted_with_the_history(tmp_path):
+    history = ChatHistory(str(tmp_path), max_in_memory=1)
+    history.add_run(record("first"))
+    history.add_run(record("second"))
+    spill_dir = history.spill_dir
+
+    assert history.messages[0]["run"] is None
+    assert history.run(history.messages[0])["domain"] == "first"
+
+    del history
+    gc.collect()
+    assert not os.path.exists(spill_dir)
+
+
+def test_stale_spill_dirs_expire(tmp_path):
+    stale, fresh = tmp_path / "stale", tmp_path / "fresh"
+    stale.mkdir()
+    fresh.mkdir()
+    (stale / "run.json").write_text("{}")
+    old = time.time() - 3600
+    os.utime(stale, (old, old))
+
+    assert expire_spill_dirs(str(tmp_path), ttl=60) == 1
+    assert not stale.exists() and fresh.exists()
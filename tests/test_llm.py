@@ -0,0 +1,178 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from agents import llm
+from tools import metrics
+
+
+def chunk(text: str):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+def completion(text: str):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))], usage=None)
+
+
+class FakeClient:
+    """
+    aisuite client stand-in; `models` maps "provider:model" to a function of
+    (stream, kwargs) returning a completion or an iterable of chunks.
+    """
+
+    def __init__(self, models: dict):
+        self.models = models
+        self.calls = []
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, model: str, messages: list, temperature: float, stream: bool = False, **kwargs):
+        self.calls.append(model)
+        return self.models[model](stream, kwargs)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    def install(models: dict) -> FakeClient:
+        fake = FakeClient(models)
+        monkeypatch.setattr(llm, "_client", fake)
+        return fake
+
+    monkeypatch.setattr(llm, "_latencies", {})
+    return install
+
+
+def test_stream_fails_over_before_its_first_chunk(client):
+    def broken(stream, kwargs):
+        raise ConnectionError("reset")
+
+    fake = client({"a:m": broken, "b:m": lambda stream, kwargs: iter([chunk("he"), chunk("llo")])})
+
+    with llm.call_policy(fallbacks=["b:m"], deadline=5):
+        assert "".join(llm.chat_stream("a", "m", [])) == "hello"
+    assert fake.calls == ["a:m", "b:m"]
+    assert llm.latency_percentile("b:m", 0.5, "stream") is None  # one sample is not enough
+
+
+def test_stream_deadline_applies_to_first_chunk_and_idle_gaps(client, monkeypatch):
+    release = threading.Event()
+
+    def slow_start(stream, kwargs):
+        release.wait(5)
+        return iter([chunk("late")])
+
+    def stalls(stream, kwargs):
+        yield chunk("first")
+        release.wait(5)
+        yield chunk("never seen")
+
+    client({"slow:m": slow_start, "stall:m": stalls})
+    monkeypatch.setattr(llm, "STREAM_IDLE_TIMEOUT", 0.1)
+    try:
+        with llm.call_policy(fallbacks=[], deadline=0.1):
+            with pytest.raises(TimeoutError):
+                list(llm.chat_stream("slow", "m", []))
+
+        parts = []
+        with llm.call_policy(fallbacks=[], deadline=5):
+            with pytest.raises(TimeoutError):
+                for text in llm.chat_stream("stall", "m", []):
+                    parts.append(text)
+        assert parts == ["first"]
+    finally:
+        release.set()
+
+
+def test_tool_loops_are_not_hedged(client):
+    def slow(stream, kwargs):
+        time.sleep(0.2)
+        return completion("done")
+
+    fake = client({"a:m": slow, "b:m": slow})
+    for _ in range(llm.HEDGE_MIN_SAMPLES):
+        llm._record_latency("a:m", "tools", 0.01)
+        llm._record_latency("a:m", "chat", 0.01)
+
+    with llm.call_policy(fallbacks=["b:m"], hedge_percentile=0.5):
+        assert llm.chat("a", "m", [], tools=[len], cache=False) == "done"
+    assert fake.calls == ["a:m"]
+
+    with llm.call_policy(fallbacks=["b:m"], hedge_percentile=0.5):
+        assert llm.chat("a", "m", [], cache=False) == "done"
+    assert fake.calls == ["a:m", "a:m", "b:m"]
+
+
+def test_no_hedges_while_the_abandoned_budget_is_spent(client, monkeypatch):
+    def slow(stream, kwargs):
+        time.sleep(0.1)
+        return completion("done")
+
+    fake = client({"a:m": slow, "b:m": slow})
+    for _ in range(llm.HEDGE_MIN_SAMPLES):
+        llm._record_latency("a:m", "chat", 0.01)
+    monkeypatch.setattr(llm, "MAX_ABANDONED_ATTEMPTS", 0)
+
+    with llm.call_policy(fallbacks=["b:m"], hedge_percentile=0.5):
+        assert llm.chat("a", "m", [], cache=False) == "done"
+    assert fake.calls == ["a:m"]
+
+
+def counter(name: str, model: str) -> float:
+    return sum(
+        c["value"] for c in metrics.snapshot()["counters"]
+        if c["name"] == name and c["labels"].get("model") == model
+    )
+
+
+def test_stream_usage_comes_from_the_last_chunk_or_is_estimated(client):
+    last = SimpleNamespace(choices=[], usage={"prompt_tokens": 7, "completion_tokens": 3, "total_tokens": 10})
+    client({
+        "usage:m": lambda stream, kwargs: iter([chunk("hi"), last]),
+        "plain:m": lambda stream, kwargs: iter([chunk("x" * 40)]),
+    })
+    before = counter("prompt_tokens", "usage:m"), counter("completion_tokens", "plain:m")
+
+    assert "".join(llm.chat_stream("usage", "m", [{"role": "user", "content": "q"}])) == "hi"
+    assert "".join(llm.chat_stream("plain", "m", [{"role": "user", "content": "q"}])) == "x" * 40
+
+    assert counter("prompt_tokens", "usage:m") - before[0] == 7
+    assert counter("completion_tokens", "plain:m") - before[1] == 10
+
+
+def test_stream_reads_do_not_wait_for_the_attempt_pool(client, monkeypatch):
+    release = threading.Event()
+    client({"a:m": lambda stream, kwargs: iter([chunk("one "), chunk("two")])})
+    monkeypatch.setattr(llm, "_attempts", llm.ThreadPoolExecutor(max_workers=1))
+    monkeypatch.setattr(llm, "STREAM_IDLE_TIMEOUT", 0.5)
+    try:
+        with llm.call_policy(fallbacks=[], deadline=5):
+            chunks = llm.chat_stream("a", "m", [])
+            assert next(chunks) == "one "
+            # Every attempt thread is busy (e.g. with abandoned attempts)
+            llm._attempts.submit(release.wait, 5)
+            assert list(chunks) == ["two"]
+    finally:
+        release.set()
+
+
+def test_exhausted_stream_failover_is_not_run_again_unstreamed(client):
+    def broken(stream, kwargs):
+        raise ConnectionError("reset")
+
+    def cannot_stream(stream, kwargs):
+        if stream:
+            raise NotImplementedError("no streaming")
+        return completion("whole answer")
+
+    fake = client({"a:m": broken, "b:m": broken, "c:m": cannot_stream})
+
+    with llm.call_policy(fallbacks=["b:m"], deadline=5):
+        with pytest.raises(RuntimeError, match="All models failed"):
+            list(llm.chat_stream("a", "m", []))
+    assert fake.calls == ["a:m", "b:m"]
+
+    # A provider that cannot stream answers with one completion in its place in the chain
+    with llm.call_policy(fallbacks=["c:m"], deadline=5):
+        assert list(llm.chat_stream("a", "m", [])) == ["whole answer"]
+    assert fake.calls[2:] == ["a:m", "c:m", "c:m"]
@@ -0,0 +1,76 @@
+import pytest
+
+from agents import llm
+from tools import metrics
+
+MESSAGES = [
+    {"role": "system", "content": "You are an AI research analyst."},
+    {"role": "user", "content": "Summarize the corpus."},
+]
+
+
+@pytest.fixture
+def mock(mock_llm, monkeypatch):
+    monkeypatch.setattr(llm, "CACHE_POLICY", "deterministic")
+    return mock_llm
+
+
+def cache_count(result: str) -> float:
+    return sum(
+        c["value"] for c in metrics.snapshot()["counters"]
+        if c["name"] == "llm_cache" and c["labels"].get("result") == result
+    )
+
+
+def test_deterministic_calls_are_answered_from_the_cache(mock):
+    hits, misses = cache_count("hit"), cache_count("miss")
+
+    first = llm.chat("openai", "mock", MESSAGES, temperature=0)
+    assert llm.chat("openai", "mock", MESSAGES, temperature=0) == first
+    assert mock.calls == 1
+    assert cache_count("miss") - misses == 1
+    assert cache_count("hit") - hits == 1
+
+    # Sampled calls are not cached unless asked to be
+    llm.chat("openai", "mock", MESSAGES, temperature=0.7)
+    llm.chat("openai", "mock", MESSAGES, temperature=0.7)
+    assert mock.calls == 3
+    llm.chat("openai", "mock", MESSAGES, temperature=0.7, cache=True)
+    llm.chat("openai", "mock", MESSAGES, temperature=0.7, cache=True)
+    assert mock.calls == 4
+
+
+def test_policy_off_and_per_call_override(mock, monkeypatch):
+    monkeypatch.setattr(llm, "CACHE_POLICY", "off")
+    llm.chat("openai", "mock", MESSAGES, temperature=0)
+    llm.chat("openai", "mock", MESSAGES, temperature=0)
+    assert mock.calls == 2
+
+    monkeypatch.setattr(llm, "CACHE_POLICY", "all")
+    llm.chat("openai", "mock", MESSAGES, temperature=0, cache=False)
+    llm.chat("openai", "mock", MESSAGES, temperature=0, cache=False)
+    assert mock.calls == 4
+
+
+def test_completion_key_covers_every_request_input():
+    def arxiv_search_tool(query: str, max_results: int = 5):
+        """Searches arXiv."""
+
+    def other_tool(query: str):
+        """Searches elsewhere."""
+
+    key = llm.completion_key("openai", "mock", MESSAGES, [arxiv_search_tool], temperature=0)
+    assert key == llm.completion_key("openai", "mock", [dict(m) for m in MESSAGES], [arxiv_search_tool], temperature=0)
+    assert key != llm.completion_key("groq", "mock", MESSAGES, [arxiv_search_tool], temperature=0)
+    assert key != llm.completion_key("openai", "mock", MESSAGES[1:], [arxiv_search_tool], temperature=0)
+    assert key != llm.completion_key("openai", "mock", MESSAGES, [other_tool], temperature=0)
+    assert key != llm.completion_key("openai", "mock", MESSAGES, None, temperature=0)
+    assert key != llm.completion_key("openai", "mock", MESSAGES, [arxiv_search_tool], temperature=0, max_tokens=10)
+
+
+def test_streamed_and_plain_calls_share_entries(mock):
+    streamed = "".join(llm.chat_stream("openai", "mock", MESSAGES, temperature=0))
+    assert streamed
+    assert list(llm.chat_stream("openai", "mock", MESSAGES, temperature=0)) == [streamed]
+    assert llm.chat("openai", "mock", MESSAGES, temperature=0) == streamed
+    assert mock.calls == 1
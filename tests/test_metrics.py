@@ -0,0 +1,83 @@
+import json
+import urllib.request
+
+import pytest
+
+from agents.pipeline import StageMemo, iter_pipeline
+from tools import metrics
+
+
+def counter(name: str, **labels) -> float:
+    return sum(
+        c["value"] for c in metrics.snapshot()["counters"]
+        if c["name"] == name and all(c["labels"].get(k) == str(v) for k, v in labels.items())
+    )
+
+
+def test_spans_attribute_counts_to_their_parents():
+    errors = counter("errors", span="test_inner")
+    with metrics.span("test_outer") as outer:
+        metrics.increment("test_widgets", 2)
+        with pytest.raises(ValueError):
+            with metrics.span("test_inner", part="a") as inner:
+                metrics.increment("test_widgets")
+                raise ValueError("boom")
+
+    assert inner["counts"] == {"test_widgets": 1, "errors": 1}
+    assert inner["error"] == "ValueError"
+    assert outer["counts"] == {"test_widgets": 3, "test_inner": 1, "errors": 1}
+    assert outer["error"] is None
+    assert outer["duration_s"] >= inner["duration_s"]
+    assert counter("errors", span="test_inner") - errors == 1
+    durations = [d for d in metrics.snapshot()["durations"] if d["name"] == "test_inner"]
+    assert durations[0]["labels"] == {"part": "a"} and durations[0]["count"] >= 1
+
+
+def test_usage_is_priced_from_the_table(monkeypatch):
+    monkeypatch.setattr(metrics, "_prices", {"test:priced": {"input": 2.0, "output": 10.0}})
+    metrics.record_usage({"prompt_tokens": 1000, "completion_tokens": 500}, model="test:priced")
+    metrics.record_usage({"prompt_tokens": 1000}, model="test:unpriced")
+
+    assert counter("cost_usd", model="test:priced") == pytest.approx(0.007)
+    assert counter("cost_usd", model="test:unpriced") == 0
+    assert counter("prompt_tokens", model="test:unpriced") >= 1000
+
+
+def test_prometheus_export_escapes_labels_and_is_served():
+    metrics.increment("test_exported", query='say "hi"\n')
+    metrics.set_gauge("test_size", 42)
+    with metrics.span("test_timed"):
+        pass
+
+    text = metrics.export_prometheus()
+    assert 'quest0_test_exported_total{query="say \\"hi\\"\\n"}' in text
+    assert "quest0_test_size 42" in text
+    assert "quest0_test_timed_duration_seconds_count" in text
+
+    server = metrics.serve_prometheus(0)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}/metrics", timeout=5) as response:
+            assert "quest0_test_size 42" in response.read().decode("utf-8")
+    finally:
+        server.shutdown()
+
+
+def test_run_summary_breaks_down_each_stage(mock_llm, search_stand_ins, tmp_path, monkeypatch):
+    log = tmp_path / "metrics.jsonl"
+    monkeypatch.setattr(metrics, "METRICS_LOG", str(log))
+    params = {
+        "domain": "explainable AI", "provider": "openai", "model": "mock", "temperature": 0.0,
+        "research_level": "PhD", "routing": "single", "rank_top_k": 0, "collection_mode": "agent",
+    }
+    list(iter_pipeline(params, StageMemo()))
+
+    events = [json.loads(line) for line in log.read_text().splitlines()]
+    run = [e for e in events if e["type"] == "run"][-1]
+    assert set(run["stages"]) == {"corpus", "analysis", "gaps", "topics"}
+    corpus = run["stages"]["corpus"]
+    assert corpus["model"] == "openai:mock"
+    assert corpus["counts"]["tool_call"] >= 1
+    assert corpus["counts"]["llm_call"] >= 1
+    assert all(stage["counts"].get("prompt_tokens") for stage in run["stages"].values())
+    assert run["corpus_json_bytes"] > 0
+    assert any(e["type"] == "span" and e["name"] == "tool_call" for e in events)
@@ -0,0 +1,37 @@
+import json
+from contextlib import nullcontext
+from agents import overlap
+from agents.overlap import OverlappedRun
+
+THEMES = [{"name": name} for name in "ABCD"]
+
+
+def analyze(on_token):
+    return json.dumps({"themes": THEMES})
+
+
+def identify_gaps(summary, min_gaps, max_gaps):
+    # One gap per theme, titled after it
+    themes = json.loads(summary)["themes"]
+    return json.dumps({"research_gaps": [{"gap_title": f"Gap {theme['name']}"} for theme in themes]})
+
+
+def generate_topics(gaps_json, min_topics, max_topics):
+    gaps = json.loads(gaps_json)["research_gaps"]
+    return json.dumps({"research_topics": [
+        {"gap_title": gap["gap_title"], "topic_title": f"Topic for {gap['gap_title']}"} for gap in gaps
+    ]})
+
+
+def test_topics_of_dropped_gaps_are_dropped(monkeypatch):
+    monkeypatch.setattr(overlap, "MAX_GAPS", 3)
+    run = OverlappedRun(
+        analyze, identify_gaps, generate_topics, lambda stage_name: nullcontext(), theme_batch_size=2
+    )
+
+    gaps = [gap["gap_title"] for gap in json.loads(run.result("gaps", timeout=5))["research_gaps"]]
+    topics = json.loads(run.result("topics", timeout=5))["research_topics"]
+
+    # Round robin over the batches [A, B] and [C, D] keeps A, C and B
+    assert gaps == ["Gap A", "Gap C", "Gap B"]
+    assert sorted(topic["gap_title"] for topic in topics) == sorted(gaps)
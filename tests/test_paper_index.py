@@ -0,0 +1,29 @@
+from tools.paper_index import PaperIndex
+
+
+def paper(i: int) -> dict:
+    return {
+        "title": f"Paper {i} about topic{i} and subject{i}",
+        "summary": f"Study number {i} of topic{i}.",
+        "url": f"http://arxiv.org/abs/2401.{i:05d}v1",
+    }
+
+
+def test_indexes_sharing_a_directory_never_reuse_rows(tmp_path):
+    # Two handles on one directory behave like two processes (own connection and memmap)
+    first, second = PaperIndex(str(tmp_path), dim=256), PaperIndex(str(tmp_path), dim=256)
+    for i in range(0, 40, 2):
+        assert first.add([paper(i)], "arxiv") == 1
+        assert second.add([paper(i + 1), paper(i)], "arxiv") == 1
+
+    for index in (first, second):
+        for i in (0, 1, 17, 38, 39):
+            top = index.search(f"topic{i} subject{i}", k=1)
+            assert top[0]["title"] == paper(i)["title"]
+    assert len(first) == len(second) == 40
+
+
+def test_matrix_grown_by_another_handle_is_remapped(tmp_path):
+    first, second = PaperIndex(str(tmp_path), dim=64), PaperIndex(str(tmp_path), dim=64)
+    second.add([paper(i) for i in range(1500)], "arxiv")
+    assert first.search("topic1400 subject1400", k=1)[0]["title"] == paper(1400)["title"]
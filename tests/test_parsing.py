@@ -0,0 +1,48 @@
+import json
+from agents.corpus import load_corpus
+from agents.parsing import JsonItemStream, iter_items, parse_items, parse_json
+
+CORPUS = {"corpus": [{"title": "A"}, {"title": "B"}]}
+
+
+def test_prose_brackets_before_the_json_are_skipped():
+    text = f'Here is the result (see [1]): ```json {json.dumps(CORPUS)}```'
+    assert parse_items(text, "corpus") == CORPUS["corpus"]
+    assert parse_json(text) == CORPUS
+
+
+def test_object_with_key_wins_over_earlier_json():
+    text = f'Notes: {{"draft": true}} and [1, 2]. Final: {json.dumps(CORPUS)}'
+    assert parse_json(text, "corpus") == CORPUS
+    assert parse_items(text, "corpus") == CORPUS["corpus"]
+
+
+def test_bare_array_only_when_it_holds_records():
+    assert parse_items('[{"title": "A"}]', "corpus") == [{"title": "A"}]
+    assert parse_items("Pick from [1, 2, 3]", "corpus") is None
+    assert parse_items('Queries: ["a b", "c d"]', "queries", item_type=str) == ["a b", "c d"]
+
+
+def test_model_errors_and_empty_results_are_failures():
+    assert parse_items("[Model Error: boom]", "corpus") is None
+    assert parse_json("[Model Error: boom]") is None
+    assert parse_items('{"corpus": []}', "corpus") is None
+    assert parse_items('{"corpus": [1, "x"]}', "corpus") is None
+    assert load_corpus("[Model Error: boom]") is None
+    assert load_corpus('{"corpus": []}') is None
+
+
+def test_truncated_output_salvages_closed_items():
+    text = 'see [1] ```json {"corpus": [{"title": "A"}, {"title": "B"}, {"tit'
+    assert parse_items(text, "corpus") == [{"title": "A"}, {"title": "B"}]
+
+
+def test_stream_skips_bracketed_prose():
+    chunks = ["Result (see ", "[1]): {\"cor", "pus\": [{\"title\": \"A\"}", ", {\"title\": \"B\"}]}"]
+    assert list(iter_items(chunks, "corpus")) == [{"title": "A"}, {"title": "B"}]
+
+
+def test_stream_ignores_model_error_text():
+    stream = JsonItemStream("corpus")
+    stream.feed("[Model Error: boom]")
+    assert stream.items == [] and not stream.done
@@ -0,0 +1,79 @@
+import json
+from agents import agents, pipeline
+from agents.pipeline import StageMemo, iter_pipeline
+
+PARAMS = {
+    "domain": "explainable AI", "provider": "openai", "model": "mock", "temperature": 0.0,
+    "research_level": "PhD", "routing": "single", "rank_top_k": 0,
+}
+CORPUS = json.dumps({"corpus": [{"title": "A paper", "abstract": "About XAI.", "year": "2024"}]})
+
+
+def dropped_stream(**kwargs):
+    yield "partial "
+    raise ConnectionError("connection reset")
+
+
+def test_stream_failing_midway_reports_only_the_error(monkeypatch):
+    monkeypatch.setattr(agents, "chat_stream", dropped_stream)
+    tokens = []
+    output = pipeline._analyze(PARAMS, {"corpus": CORPUS}, tokens.append)
+    assert output == "[Model Error: connection reset]"
+    assert tokens == ["partial ", "[Model Error: connection reset]"]
+
+
+def test_streamed_model_errors_are_not_memoized(monkeypatch):
+    monkeypatch.setattr(agents, "chat_stream", dropped_stream)
+    memo = StageMemo()
+    outputs = {
+        name: output
+        for name, output, _ in iter_pipeline(PARAMS, memo, fixed={"corpus": CORPUS}, on_token=lambda *args: None)
+    }
+    assert outputs["analysis"].startswith("[Model Error")
+    assert all("[Model Error" not in str(value) for value in memo.values())
+
+
+def test_stage_memo_expires_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(pipeline.time, "monotonic", lambda: now[0])
+    memo = StageMemo(2, ttl=60)
+    memo.store("a", "corpus")
+    now[0] += 30
+    assert memo.lookup("a") == "corpus"
+    now[0] += 31
+    assert memo.lookup("a") is None
+
+    for key in "abc":
+        memo.store(key, key)
+    assert list(memo) == ["b", "c"]
+
+
+def run_stages(params: dict, memo: StageMemo) -> dict:
+    return {name: (output, cached) for name, output, cached in iter_pipeline(params, memo)}
+
+
+def test_only_stages_whose_inputs_changed_are_recomputed(mock_llm, search_stand_ins):
+    params = dict(PARAMS, collection_mode="agent", analyzer_budget=4000, analysis_shard_size=20)
+    memo = StageMemo()
+
+    first = run_stages(params, memo)
+    assert not any(cached for _, cached in first.values())
+    assert not any(output.startswith("[Model Error") for output, _ in first.values())
+    calls = mock_llm.calls
+
+    again = run_stages(params, memo)
+    assert again == {name: (output, True) for name, (output, _) in first.items()}
+    assert mock_llm.calls == calls
+
+    # research_level is a setting of the topics stage only
+    changed = run_stages(dict(params, research_level="Masters"), memo)
+    assert {name: cached for name, (_, cached) in changed.items()} == {
+        "corpus": True, "analysis": True, "gaps": True, "topics": False
+    }
+    assert mock_llm.calls == calls + 1
+
+    # A changed upstream output invalidates everything after it
+    rerun = {
+        name: cached for name, _, cached in iter_pipeline(params, memo, fixed={"corpus": CORPUS})
+    }
+    assert rerun == {"corpus": True, "analysis": False, "gaps": False, "topics": False}
@@ -0,0 +1,27 @@
+import json
+from agents import agents
+
+
+def no_llm(*args, **kwargs):
+    raise AssertionError("prefetch collection with heuristic queries must not call a model")
+
+
+def test_prefetch_collects_a_ranked_deduped_corpus_without_the_model(search_stand_ins, monkeypatch):
+    monkeypatch.setattr(agents, "chat", no_llm)
+
+    corpus = json.loads(agents.prefetch_collector(
+        "explainable AI", "openai", "mock", max_results=8, max_items=10, local_first=False
+    ))["corpus"]
+
+    assert 0 < len(corpus) <= 10
+    assert all(set(entry) >= {"title", "authors", "year", "abstract", "source", "url"} for entry in corpus)
+    assert len({entry["title"].lower() for entry in corpus}) == len(corpus)
+    assert {entry["source"] for entry in corpus} == {"arxiv", "web"}
+
+
+def test_planned_queries_fall_back_to_the_heuristic(monkeypatch):
+    monkeypatch.setattr(agents, "chat", lambda **kwargs: "Sorry, I cannot help with that.")
+    assert agents.plan_queries("explainable AI", "openai", "mock") == agents.heuristic_queries("explainable AI")
+
+    monkeypatch.setattr(agents, "chat", lambda **kwargs: '```json\n["xai survey", "saliency maps"]\n```')
+    assert agents.plan_queries("explainable AI", "openai", "mock") == ["xai survey", "saliency maps"]
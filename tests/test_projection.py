@@ -0,0 +1,66 @@
+import json
+import threading
+from types import SimpleNamespace
+from agents import llm
+from agents.projection import ToolProjection
+
+RESULTS = [
+    {"title": f"Paper {i}", "summary": "About it.", "published": "2024-01-02", "url": f"http://arxiv.org/abs/2401.0000{i}"}
+    for i in range(3)
+]
+
+
+def search_tool(query: str) -> list:
+    """
+    Searches for papers.
+    """
+    return RESULTS
+
+
+def test_failover_attempt_is_shown_every_paper_again(monkeypatch):
+    projection = ToolProjection(fields=("title",))
+    search = projection.wrap(search_tool)
+    shown = {}
+
+    def create(model, messages, temperature, tools=None, **kwargs):
+        # Like aisuite's tool loop: call the tool twice, then answer (or fail)
+        shown[model] = [search("q"), search("q")]
+        if model == "a:m":
+            raise ConnectionError("reset")
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="done"))], usage=None)
+
+    monkeypatch.setattr(llm, "_client", SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create))))
+    with llm.call_policy(fallbacks=["b:m"]):
+        assert llm.chat("a", "m", [], tools=[search], cache=False) == "done"
+
+    for model in ("a:m", "b:m"):
+        first, second = shown[model]
+        assert [row[0] for row in first["rows"]] == ["p1", "p2", "p3"]
+        assert second["rows"] == [] and second["already_seen"] == ["p1", "p2", "p3"]
+
+
+def test_concurrent_calls_get_distinct_refs():
+    projection = ToolProjection()
+    batches = [
+        [dict(result, title=f"Paper {n}-{i}", url=f"http://example.org/{n}/{i}") for i, result in enumerate(RESULTS)]
+        for n in range(8)
+    ]
+    threads = [threading.Thread(target=projection.project, args=(batch,)) for batch in batches]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(projection.records) == 24
+    assert len({record["title"] for record in projection.records.values()}) == 24
+
+
+def test_rehydrate_restores_records_and_passes_other_text_through():
+    projection = ToolProjection()
+    projection.project(RESULTS, "arxiv")
+    corpus = json.loads(projection.rehydrate(json.dumps({"corpus": [{"ref": "p2", "title": "Paper 1"}]})))
+
+    assert corpus["corpus"][0]["abstract"] == "About it."
+    assert "ref" not in corpus["corpus"][0]
+    for text in ('["a topic"]', "No papers found.", "[Model Error: timeout]"):
+        assert projection.rehydrate(text) == text
@@ -0,0 +1,37 @@
+import json
+import numpy as np
+from agents import ranking
+from agents.pipeline import prepare_corpus
+
+
+def test_near_duplicates_of_later_bucket_members_are_grouped(monkeypatch):
+    # 1 and 2 agree on 52 of 64 columns but only share the first 4 bands, where
+    # 0 (similar to neither) is also bucketed, first
+    signatures = np.ones((3, ranking.NUM_PERM), dtype=np.uint64)
+    signatures[0, 16:] = 0
+    signatures[2, 16::4] = 2
+    monkeypatch.setattr(ranking, "minhash_signatures", lambda texts: signatures)
+    assert ranking.near_duplicate_groups(["a", "b", "c"], threshold=0.8) == [0, 1, 1]
+
+
+def test_dedupe_near_collapses_title_variants():
+    entries = [
+        {"title": "A survey of graph neural networks", "source": "web"},
+        {"title": "Deep learning for protein folding"},
+        {"title": "A Survey of Graph Neural Networks.", "source": "arxiv", "abstract": "Longer."},
+    ]
+    kept = ranking.dedupe_near(entries)
+    assert [e["title"] for e in kept] == ["A Survey of Graph Neural Networks.", "Deep learning for protein folding"]
+
+
+def test_prepare_corpus_reports_and_reuses_the_analysis_input():
+    titles = ["Saliency maps", "Concept bottlenecks", "Counterfactual explanations", "Rule extraction", "Shapley values"]
+    corpus = json.dumps({"corpus": [
+        {"title": f"{title} for explainable models", "abstract": "Words. " * 200, "year": "2024"} for title in titles
+    ]})
+    params = {"domain": "explainable models", "rank_top_k": 3, "analyzer_budget": 500, "analysis_shard_size": 20}
+    first = prepare_corpus(corpus, params)
+    ranked, analyzer_json, report = first
+    assert report["papers"] == 3 and report["shards"] == 1
+    assert report["compaction"]["tokens_after"] <= 500 < report["compaction"]["tokens_before"]
+    assert prepare_corpus(corpus, dict(params)) is first
@@ -0,0 +1,45 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+from agents import agents
+from benchmarks import startup
+from tools import config
+
+HEAVY = ["aisuite", "tavily", "requests", "numpy", "asyncio", "http.server", "cProfile"]
+
+
+@pytest.mark.parametrize("module", ["agents.pipeline", "agents.agents", "agents.llm", "tools.metrics", "batch"])
+def test_entry_points_defer_heavy_imports(module):
+    code = f"import json, sys, {module}; print(json.dumps([name for name in {HEAVY!r} if name in sys.modules]))"
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=startup.ROOT, check=True, capture_output=True, text=True
+    )
+    assert json.loads(result.stdout) == []
+
+
+def test_collector_prompt_uses_the_date_of_each_call(mock_llm, search_stand_ins, monkeypatch):
+    prompts = []
+    real_chat = agents.chat
+
+    def recording_chat(**kwargs):
+        prompts.append(kwargs["messages"][0]["content"])
+        return real_chat(**kwargs)
+
+    monkeypatch.setattr(agents, "chat", recording_chat)
+    for today in ("2031-03-01", "2032-01-02"):
+        monkeypatch.setattr(agents, "current_date", lambda today=today: today)
+        agents.corpus_collector("explainable AI", "openai", "mock", temperature=0.0)
+
+    assert "(from 2026 to 2031)" in prompts[0]
+    assert "(from 2027 to 2032)" in prompts[1]
+    assert config.current_date() != "2031-03-01"
+
+
+def test_import_costs_exclude_project_packages():
+    costs = startup.import_costs("agents.llm", top=5)
+    assert costs and len(costs) <= 5
+    assert not {c["package"] for c in costs} & startup.PROJECT_PACKAGES
+    assert [c["cumulative_ms"] for c in costs] == sorted((c["cumulative_ms"] for c in costs), reverse=True)
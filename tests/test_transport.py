@@ -0,0 +1,49 @@
+import time
+import pytest
+from benchmarks.stand_ins import FixtureServer
+from tools import transport
+from tools.transport import TokenBucket, http_get
+
+
+def test_token_bucket_allows_a_burst_then_its_rate():
+    bucket = TokenBucket(rate=20, capacity=2)
+    start = time.monotonic()
+    for _ in range(2):
+        bucket.acquire()
+    assert time.monotonic() - start < 0.05
+
+    for _ in range(4):
+        bucket.acquire()
+    # Four more tokens at 20 per second
+    assert 0.18 <= time.monotonic() - start < 0.5
+
+
+def test_backoff_is_jittered_bounded_and_honours_retry_after():
+    assert all(0 <= transport._backoff(attempt) <= transport.BACKOFF_MAX for attempt in range(10))
+    assert transport._backoff(0, retry_after="2") == 2.0
+    assert transport._backoff(0, retry_after="600") == transport.BACKOFF_MAX
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(transport, "_backoff", lambda attempt, retry_after=None: 0)
+
+
+def test_http_get_retries_429_and_5xx(no_backoff):
+    with FixtureServer(failures={"/api/query": [503, 429, 502]}) as server:
+        response = http_get(server.arxiv_url, params={"start": 0, "max_results": 1})
+        assert response.status_code == 200
+        assert server.failures["/api/query"] == []
+
+
+def test_http_get_returns_the_last_failure_once_retries_run_out(no_backoff):
+    failures = [500] * (transport.MAX_RETRIES + 2)
+    with FixtureServer(failures={"/api/query": failures}) as server:
+        assert http_get(server.arxiv_url).status_code == 500
+        assert len(server.failures["/api/query"]) == 1
+
+
+def test_http_get_does_not_retry_client_errors(no_backoff):
+    with FixtureServer(failures={"/api/query": [404, 404]}) as server:
+        assert http_get(server.arxiv_url).status_code == 404
+        assert server.failures["/api/query"] == [404]
@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+import pytest
+import requests
+from benchmarks.stand_ins import FakeTavilyClient
+from tools import transport, web_search
+
+
+class FlakyTavilyClient(FakeTavilyClient):
+    """
+    Fails the first `failures` searches with the given error, then answers.
+    """
+
+    def __init__(self, failures: int, error: Exception):
+        super().__init__()
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+
+    def search(self, query: str, **kwargs) -> dict:
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error
+        return super().search(query, **kwargs)
+
+
+def http_error(status: int) -> requests.HTTPError:
+    return requests.HTTPError(f"{status} error", response=SimpleNamespace(status_code=status))
+
+
+@pytest.fixture
+def tavily(monkeypatch):
+    monkeypatch.setattr(transport, "_backoff", lambda attempt, retry_after=None: 0)
+    monkeypatch.setitem(transport._buckets, "api.tavily.com", transport.TokenBucket(1e6, 10 ** 6))
+    monkeypatch.setattr(web_search.search_cache, "get", lambda *args, **kwargs: None)
+    monkeypatch.setattr(web_search, "ingest", lambda results, source: None)
+
+    def install(client):
+        transport.set_tavily_client(client)
+        return client
+
+    yield install
+    transport.set_tavily_client(None)
+
+
+@pytest.mark.parametrize("error", [http_error(503), http_error(429), requests.ConnectionError("reset")])
+def test_tavily_search_retries_transient_failures(tavily, error):
+    client = tavily(FlakyTavilyClient(2, error))
+    results = web_search.tavily_search_tool("explainable ai", max_results=3)
+
+    assert client.calls == 3
+    assert len(results) == 3 and "error" not in results[0]
+
+
+def test_tavily_search_gives_up_after_bounded_retries(tavily):
+    client = tavily(FlakyTavilyClient(100, http_error(502)))
+    assert "error" in web_search.tavily_search_tool("explainable ai")[0]
+    assert client.calls == transport.MAX_RETRIES + 1
+
+
+def test_tavily_search_does_not_retry_client_errors(tavily):
+    client = tavily(FlakyTavilyClient(1, http_error(401)))
+    assert "error" in web_search.tavily_search_tool("explainable ai")[0]
+    assert client.calls == 1
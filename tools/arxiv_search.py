@@ -1,9 +1,57 @@
-import requests
-from dotenv import load_dotenv
+from typing import Iterator
 from xml.etree import ElementTree as ET
-load_dotenv(".env")
+from tools.cache import search_cache
+from tools.config import getenv
+from tools.transport import http_get
+from tools.metrics import increment, timed
+from tools.paper_index import ingest
 
+ARXIV_API_URL = getenv("QUEST0_ARXIV_API_URL", "https://export.arxiv.org/api/query")
+ATOM = "{http://www.w3.org/2005/Atom}"
 
+
+def _parse_entry(entry: ET.Element) -> dict:
+    """
+    Converts one Atom <entry> element into a result dict.
+    """
+    title = entry.find(f"{ATOM}title").text.strip()
+    authors = [
+        author.find(f"{ATOM}name").text
+        for author in entry.findall(f"{ATOM}author")
+    ]
+    published = entry.find(f"{ATOM}published").text[:10]
+    url_abstract = entry.find(f"{ATOM}id").text
+    summary = entry.find(f"{ATOM}summary").text.strip()
+
+    link_pdf = None
+    for link in entry.findall(f"{ATOM}link"):
+        if link.attrib.get("title") == "pdf":
+            link_pdf = link.attrib.get("href")
+            break
+
+    return {
+        "title": title,
+        "authors": authors,
+        "published": published,
+        "url": url_abstract,
+        "summary": summary,
+        "link_pdf": link_pdf,
+    }
+
+
+def _try_parse_entry(entry: ET.Element) -> dict | None:
+    """
+    _parse_entry, or None (counted) for an entry missing its id, title,
+    date or summary, so one malformed entry does not fail the whole search.
+    """
+    try:
+        return _parse_entry(entry)
+    except (AttributeError, TypeError):
+        increment("arxiv_bad_entries")
+        return None
+
+
+@timed("tool_call", tool="arxiv_search_tool")
 def arxiv_search_tool(query: str, max_results: int = 10) -> list[dict]:
     """
     A function that searches for research papers matching a given query (on arXiv).
@@ -15,46 +63,94 @@ def arxiv_search_tool(query: str, max_results: int = 10) -> list[dict]:
     Returns:
         - list[dict]: A list of response.
     """
-    url = f"https://export.arxiv.org/api/query?search_query=all:{query}&start=0&max_results={max_results}"
+    cached = search_cache.get("arxiv", query, max_results=max_results)
+    increment("search_cache", source="arxiv", result="miss" if cached is None else "hit")
+    if cached is not None:
+        return cached
+
+    import requests
+
+    params = {"search_query": f"all:{query}", "start": 0, "max_results": max_results}
 
     try:
-        response = requests.get(url, timeout=30)
+        response = http_get(ARXIV_API_URL, params=params, timeout=30)
         response.raise_for_status()
     except requests.exceptions.RequestException as e:
+        increment("tool_errors", tool="arxiv_search_tool")
         return [{"error": str(e)}]
 
     try:
         root = ET.fromstring(response.content)
-        ns = {"atom": "http://www.w3.org/2005/Atom"}
-
-        results = []
-        for entry in root.findall("atom:entry", ns):
-            title = entry.find("atom:title", ns).text.strip()
-            authors = [
-                author.find("atom:name", ns).text
-                for author in entry.findall("atom:author", ns)
-            ]
-            published = entry.find("atom:published", ns).text[:10]
-            url_abstract = entry.find("atom:id", ns).text
-            summary = entry.find("atom:summary", ns).text.strip()
-
-            link_pdf = None
-            for link in entry.findall("atom:link", ns):
-                if link.attrib.get("title") == "pdf":
-                    link_pdf = link.attrib.get("href")
-                    break
-
-            results.append(
-                {
-                    "title": title,
-                    "authors": authors,
-                    "published": published,
-                    "url": url_abstract,
-                    "summary": summary,
-                    "link_pdf": link_pdf,
-                }
-            )
+        results = [
+            result for result in map(_try_parse_entry, root.findall(f"{ATOM}entry"))
+            if result is not None
+        ]
 
+        search_cache.set("arxiv", query, results, max_results=max_results)
+        ingest(results, "arxiv")
         return results
     except Exception as e:
-        return [{"error": f"Parsing failed: {str(e)}"}]
\ No newline at end of file
+        increment("tool_errors", tool="arxiv_search_tool")
+        return [{"error": f"Parsing failed: {str(e)}"}]
+
+
+def arxiv_search_stream(
+        query: str, max_results: int = 1000, page_size: int = 100
+        ) -> Iterator[dict]:
+    """
+    Lazily pages through arXiv search results with flat memory use.
+
+    Each page is requested with the `start` parameter and parsed incrementally
+    with iterparse; entries are yielded as soon as they close and are then freed.
+
+    Args:
+        - query (str): The search query
+        - max_results (int): The maximum results to yield in total (default 1000)
+        - page_size (int): The number of results requested per page (default 100)
+
+    Yields:
+        - dict: One result per paper (same keys as arxiv_search_tool). Malformed
+          entries are skipped; a failed request or parse yields a single
+          {"error": "..."} dict and stops.
+    """
+    import requests
+
+    start = 0
+    while start < max_results:
+        params = {
+            "search_query": f"all:{query}",
+            "start": start,
+            "max_results": min(page_size, max_results - start),
+        }
+
+        try:
+            response = http_get(ARXIV_API_URL, params=params, timeout=30, stream=True)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            yield {"error": str(e)}
+            return
+
+        count = 0
+        try:
+            response.raw.decode_content = True
+            root = None
+            for event, elem in ET.iterparse(response.raw, events=("start", "end")):
+                if root is None:
+                    root = elem
+                elif event == "end" and elem.tag == f"{ATOM}entry":
+                    result = _try_parse_entry(elem)
+                    # Drop the parsed entry so the tree never grows past one element.
+                    root.clear()
+                    count += 1
+                    if result is not None:
+                        yield result
+        except ET.ParseError as e:
+            yield {"error": f"Parsing failed: {str(e)}"}
+            return
+        finally:
+            response.close()
+
+        # A short page means arXiv has no more results for this query.
+        if count < params["max_results"]:
+            return
+        start += count
@@ -0,0 +1,128 @@
+import asyncio
+from typing import AsyncIterator
+from tools.arxiv_search import arxiv_search_tool
+from tools.web_search import tavily_search_tool
+
+# The sync tools already share the cache, connection pool and rate limiters,
+# so the async variants run them on worker threads instead of duplicating them.
+SOURCES = {
+    "arxiv": arxiv_search_tool,
+    "tavily": tavily_search_tool,
+}
+
+
+async def async_arxiv_search_tool(query: str, max_results: int = 10) -> list[dict]:
+    """
+    Async variant of arxiv_search_tool.
+    """
+    return await asyncio.to_thread(arxiv_search_tool, query, max_results)
+
+
+async def async_tavily_search_tool(
+        query: str, max_results: int = 5, include_images: bool = False
+        ) -> list[dict]:
+    """
+    Async variant of tavily_search_tool.
+    """
+    return await asyncio.to_thread(tavily_search_tool, query, max_results, include_images)
+
+
+def _normalize_request(request) -> dict:
+    if isinstance(request, dict):
+        request = dict(request)
+    else:
+        values = tuple(request)
+        request = {"source": values[0], "query": values[1]}
+        if len(values) > 2:
+            request["max_results"] = values[2]
+
+    if request.get("source") not in SOURCES:
+        raise ValueError(f"Unknown search source: {request.get('source')!r}")
+    return request
+
+
+async def fan_out_search(
+        searches: list,
+        max_concurrency: int = 4,
+        timeout: float = 45
+        ) -> AsyncIterator[dict]:
+    """
+    Runs many searches concurrently and yields each result as it arrives.
+
+    Args:
+        - searches (list): Items like {"source": "arxiv", "query": "...", "max_results": 5}
+          or ("arxiv", "query") tuples.
+        - max_concurrency (int): Maximum number of searches in flight (default 4);
+          a search past its deadline keeps its slot until its thread finishes
+        - timeout (float): Per-request deadline in seconds (default 45)
+
+    Yields:
+        - dict: {"source", "query", "results"} for each finished request. A request
+          that times out or fails yields results of [{"error": "..."}].
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    def release(work: asyncio.Future) -> None:
+        semaphore.release()
+        if not work.cancelled():
+            work.exception()  # retrieved, so a late failure is not logged as unhandled
+
+    async def run(request: dict) -> dict:
+        kwargs = {k: v for k, v in request.items() if k not in ("source", "query")}
+        await semaphore.acquire()
+        # A thread cannot be stopped, so the slot is released when the search
+        # really finishes, not when its deadline passes
+        work = asyncio.ensure_future(asyncio.to_thread(SOURCES[request["source"]], request["query"], **kwargs))
+        work.add_done_callback(release)
+        try:
+            results = await asyncio.wait_for(asyncio.shield(work), timeout=timeout)
+        except asyncio.TimeoutError:
+            results = [{"error": f"Search timed out after {timeout}s"}]
+        except Exception as e:
+            results = [{"error": str(e)}]
+        return {"source": request["source"], "query": request["query"], "results": results}
+
+    tasks = [asyncio.create_task(run(_normalize_request(r))) for r in searches]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def multi_search(searches: list, max_concurrency: int = 4, timeout: float = 45) -> list[dict]:
+    """
+    Blocking wrapper around fan_out_search that returns the merged results.
+
+    Returns:
+        - list[dict]: Every result tagged with its "source", in arrival order.
+    """
+
+    async def collect() -> list[dict]:
+        merged = []
+        async for batch in fan_out_search(searches, max_concurrency, timeout):
+            for item in batch["results"]:
+                merged.append(dict(item, source=batch["source"]))
+        return merged
+
+    return asyncio.run(collect())
+
+
+def multi_search_tool(queries: list[str], max_results: int = 5) -> list[dict]:
+    """
+    Searches arXiv and the web for several queries at once (concurrently).
+
+    Args:
+        - queries (list[str]): The search queries to run on both arXiv and the web
+        - max_results (int): The maximum results per query and source (default 5)
+
+    Returns:
+        - list[dict]: The merged results, each tagged with "source" ("arxiv" or "tavily").
+    """
+    searches = [
+        {"source": source, "query": query, "max_results": max_results}
+        for query in queries
+        for source in SOURCES
+    ]
+    return multi_search(searches)
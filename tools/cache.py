@@ -0,0 +1,164 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from hashlib import sha256
+from tools.config import getenv
+
+# Default time-to-live (seconds) for each cached source.
+DEFAULT_TTLS = {
+    "arxiv": 24 * 60 * 60,
+    "tavily": 6 * 60 * 60,
+    "llm": 7 * 24 * 60 * 60,
+}
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalizes a search query so equivalent queries share a cache entry.
+
+    Args:
+        - query (str): The raw search query
+
+    Returns:
+        - str: The query lower-cased with whitespace collapsed.
+    """
+    return " ".join(str(query).lower().split())
+
+
+class ResultCache:
+    """
+    A small SQLite-backed key/value store with per-namespace TTLs,
+    size-bounded LRU eviction and hit/miss counters.
+    """
+
+    def __init__(self, path: str, max_entries: int = 5000, ttls: dict = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                namespace TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed_at)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(namespace: str, query: str, **params) -> str:
+        """
+        Builds a cache key from the normalized query and the call parameters.
+        """
+        payload = json.dumps(
+            {"ns": namespace, "q": normalize_query(query), "params": params},
+            sort_keys=True,
+        )
+        return sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, namespace: str, query: str, **params):
+        """
+        Returns the cached value, or None on a miss or an expired entry.
+        """
+        return self.lookup(namespace, self.make_key(namespace, query, **params))
+
+    def set(self, namespace: str, query: str, value, **params) -> None:
+        """
+        Stores a JSON-serializable value under the normalized query and parameters.
+        """
+        self.store(namespace, self.make_key(namespace, query, **params), value)
+
+    def lookup(self, namespace: str, key: str):
+        """
+        Returns the value stored under a precomputed key, or None on a miss.
+        """
+        ttl = self.ttls.get(namespace)
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None or (ttl is not None and now - row[1] > ttl):
+                if row is not None:
+                    self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.stats["misses"] += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.stats["hits"] += 1
+            return json.loads(row[0])
+
+    def store(self, namespace: str, key: str, value) -> None:
+        """
+        Stores a JSON-serializable value under a precomputed key and evicts the
+        least recently used entries once the cache grows past max_entries.
+        """
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                (key, namespace, json.dumps(value), now, now),
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            overflow = count - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    """
+                    DELETE FROM entries WHERE key IN (
+                        SELECT key FROM entries ORDER BY accessed_at ASC LIMIT ?
+                    )
+                    """,
+                    (overflow,),
+                )
+                self.stats["evictions"] += overflow
+            self._conn.commit()
+
+    def clear(self, namespace: str = None) -> None:
+        """
+        Removes every entry, or only the entries of one namespace.
+        """
+        with self._lock:
+            if namespace is None:
+                self._conn.execute("DELETE FROM entries")
+            else:
+                self._conn.execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+            self._conn.commit()
+
+
+def _ttls_from_env() -> dict:
+    ttls = {}
+    for namespace in DEFAULT_TTLS:
+        value = getenv(f"QUEST0_CACHE_TTL_{namespace.upper()}")
+        if value:
+            ttls[namespace] = float(value)
+    return ttls
+
+
+# Shared cache used by the search tools.
+search_cache = ResultCache(
+    path=getenv("QUEST0_CACHE_PATH", os.path.join(".cache", "quest0_search.sqlite3")),
+    max_entries=int(getenv("QUEST0_CACHE_MAX_ENTRIES", "5000")),
+    ttls=_ttls_from_env(),
+)
@@ -0,0 +1,37 @@
+import os
+import threading
+from datetime import datetime
+
+_loaded = False
+_lock = threading.Lock()
+
+
+def load_config(path: str = ".env") -> None:
+    """
+    Loads the .env file into the environment, once per process. Variables that
+    are already set in the environment take precedence.
+    """
+    global _loaded
+    if _loaded:
+        return
+    with _lock:
+        if not _loaded:
+            from dotenv import load_dotenv
+
+            load_dotenv(path)
+            _loaded = True
+
+
+def getenv(name: str, default: str = None) -> str | None:
+    """
+    os.getenv, after making sure the .env file has been loaded.
+    """
+    load_config()
+    return os.getenv(name, default)
+
+
+def current_date() -> str:
+    """
+    Today's date as "YYYY-MM-DD", computed per call so long-running processes stay current.
+    """
+    return datetime.now().strftime("%Y-%m-%d")
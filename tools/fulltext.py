@@ -0,0 +1,329 @@
+import mmap
+import os
+import re
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from hashlib import sha256
+from tools.config import getenv
+from tools.metrics import increment, span
+from tools.paper_index import paper_key
+from tools.transport import http_get
+
+# Full-text store: PDFs and their extracted text, addressed by the PDF's sha256.
+FULLTEXT_DIR = getenv("QUEST0_FULLTEXT_DIR", ".cache/fulltext")
+ARXIV_PDF_URL = getenv("QUEST0_ARXIV_PDF_URL", "https://arxiv.org/pdf")
+# Downloads in flight, and processes extracting text, at once.
+FULLTEXT_DOWNLOADS = int(getenv("QUEST0_FULLTEXT_DOWNLOADS", "4"))
+FULLTEXT_WORKERS = int(getenv("QUEST0_FULLTEXT_WORKERS", "2"))
+FULLTEXT_MAX_BYTES = int(getenv("QUEST0_FULLTEXT_MAX_BYTES", str(25 * 1024 * 1024)))
+
+# Sections passed on to the analyzer, by heading keyword.
+DEFAULT_SECTIONS = ("limitations", "future work", "discussion", "conclusion")
+
+_HEADING = re.compile(
+    r"^\s*(?:\d+(?:\.\d+)*\.?|[IVX]+\.)?\s*([A-Z][A-Za-z][A-Za-z ,&\-]{1,60})\s*$"
+)
+_STREAM = re.compile(rb"stream\r?\n(.*?)\r?\nendstream", re.S)
+_TEXT_BLOCK = re.compile(rb"\bBT\b(.*?)\bET\b", re.S)
+_LINE_MOVE = re.compile(rb"T\*|\bT[dDm]\b")
+_STRING = re.compile(rb"\((.*?)(?<!\\)\)", re.S)
+_ESCAPES = {b"n": b"\n", b"r": b"\r", b"t": b"\t"}
+
+
+def pdf_url(entry: dict) -> str | None:
+    """
+    The PDF URL of a corpus entry or search result: its "link_pdf", or the arXiv
+    PDF URL derived from its arXiv id. None for papers that are not on arXiv.
+    """
+    if entry.get("link_pdf"):
+        return entry["link_pdf"]
+    key = paper_key(entry) or ""
+    return f"{ARXIV_PDF_URL}/{key.removeprefix('arxiv:')}" if key.startswith("arxiv:") else None
+
+
+def _unescape(raw: bytes) -> str:
+    return re.sub(rb"\\([nrt()\\])", lambda m: _ESCAPES.get(m.group(1), m.group(1)), raw).decode("latin-1")
+
+
+def _basic_text(data) -> str:
+    # Text-showing operators of every (optionally Flate-compressed) content stream.
+    # Good enough for simple PDFs when pypdf is not installed.
+    lines = []
+    for match in _STREAM.finditer(data):
+        stream = match.group(1)
+        try:
+            stream = zlib.decompress(stream)
+        except zlib.error:
+            pass
+        for block in _TEXT_BLOCK.finditer(stream):
+            # Strings shown between two line moves make up one line
+            for segment in _LINE_MOVE.split(block.group(1)):
+                line = "".join(_unescape(s) for s in _STRING.findall(segment))
+                if line.strip():
+                    lines.append(line)
+    return "\n".join(lines)
+
+
+def extract_text(pdf_path: str, text_path: str) -> str:
+    """
+    Extracts the text of a stored PDF into `text_path` (runs in the extraction
+    process pool). The PDF is memory-mapped rather than read into memory.
+    pypdf is used when installed; otherwise a basic content-stream parser.
+
+    Returns:
+        - str: text_path
+    """
+    with open(pdf_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        try:
+            from pypdf import PdfReader
+        except ImportError:
+            text = _basic_text(data)
+        else:
+            text = "\n".join(page.extract_text() or "" for page in PdfReader(data).pages)
+
+    tmp_path = f"{text_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, text_path)
+    return text_path
+
+
+def select_sections(text: str, sections: tuple = DEFAULT_SECTIONS, max_chars: int = 1500) -> dict:
+    """
+    Finds the sections of a paper whose heading contains one of `sections`
+    (e.g. "5 Limitations and Future Work") and returns their text.
+
+    Returns:
+        - dict: {heading keyword: section text (at most max_chars)}, in `sections` order.
+    """
+    found, current, body = {}, None, []
+
+    def close():
+        if current and current not in found and body:
+            found[current] = " ".join(" ".join(body).split())[:max_chars]
+
+    for line in text.splitlines():
+        heading = _HEADING.match(line) if len(line) < 70 else None
+        if heading:
+            title = heading.group(1).lower()
+            keyword = next((s for s in sections if s in title), None)
+            # Short capitalized lines are headings only if they name a section we
+            # want, or look like a numbered heading that ends the current one
+            if keyword or re.match(r"^\s*(?:\d+(?:\.\d+)*\.?|[IVX]+\.)\s", line) or title in (
+                    "references", "acknowledgments", "acknowledgements", "appendix"
+            ):
+                close()
+                current, body = keyword, []
+                continue
+        if current:
+            body.append(line)
+    close()
+    return {s: found[s] for s in sections if s in found}
+
+
+class FullTextStore:
+    """
+    A content-addressed store of downloaded PDFs and their extracted text:
+
+        pdf/<sha256>.pdf     the PDF, named by the hash of its bytes
+        text/<sha256>.txt    its extracted text
+        urls/<sha256(url)>   the PDF hash a URL resolved to
+
+    A URL is downloaded at most once, and the same PDF reached through two
+    URLs is stored (and extracted) once.
+    """
+
+    def __init__(self, directory: str = FULLTEXT_DIR):
+        self.directory = directory
+        for sub in ("pdf", "text", "urls"):
+            os.makedirs(os.path.join(directory, sub), exist_ok=True)
+
+    def pdf_path(self, digest: str) -> str:
+        return os.path.join(self.directory, "pdf", f"{digest}.pdf")
+
+    def text_path(self, digest: str) -> str:
+        return os.path.join(self.directory, "text", f"{digest}.txt")
+
+    def _url_path(self, url: str) -> str:
+        return os.path.join(self.directory, "urls", sha256(url.encode("utf-8")).hexdigest())
+
+    def digest_for(self, url: str) -> str | None:
+        """
+        The hash of the PDF already stored for `url`, if any.
+        """
+        try:
+            with open(self._url_path(url), encoding="utf-8") as f:
+                digest = f.read().strip()
+        except OSError:
+            return None
+        return digest if os.path.exists(self.pdf_path(digest)) else None
+
+    def download(self, url: str, max_bytes: int = FULLTEXT_MAX_BYTES, timeout: float = 60) -> str:
+        """
+        Streams a PDF to disk (hashing it on the way) unless it is already stored.
+
+        Returns:
+            - str: The PDF's sha256.
+
+        Raises:
+            - ValueError: If the response is not a PDF or is larger than max_bytes.
+            - requests.exceptions.RequestException: If the download fails.
+        """
+        digest = self.digest_for(url)
+        if digest:
+            increment("fulltext_downloads", result="hit")
+            return digest
+
+        response = http_get(url, timeout=timeout, stream=True)
+        response.raise_for_status()
+        hasher, size = sha256(), 0
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.join(self.directory, "pdf"), suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in response.iter_content(64 * 1024):
+                    if size == 0 and not chunk.lstrip().startswith(b"%PDF"):
+                        raise ValueError(f"Not a PDF: {url}")
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise ValueError(f"PDF larger than {max_bytes} bytes: {url}")
+                    hasher.update(chunk)
+                    f.write(chunk)
+            digest = hasher.hexdigest()
+            os.replace(tmp_path, self.pdf_path(digest))
+        finally:
+            response.close()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        with open(self._url_path(url), "w", encoding="utf-8") as f:
+            f.write(digest)
+        increment("fulltext_downloads", result="miss")
+        increment("fulltext_bytes", size)
+        return digest
+
+    def read_text(self, digest: str) -> str | None:
+        """
+        The extracted text of a stored PDF, or None if it has not been extracted yet.
+        """
+        try:
+            with open(self.text_path(digest), encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+
+_store = None
+_extractor = None
+_shared_lock = threading.Lock()
+
+
+def get_fulltext_store() -> FullTextStore:
+    """
+    Returns the shared full-text store (created on first use).
+    """
+    global _store
+    with _shared_lock:
+        if _store is None:
+            _store = FullTextStore()
+        return _store
+
+
+def get_extractor():
+    """
+    Returns the shared process pool that extracts PDF text, off the threads
+    serving requests (started on first use).
+    """
+    global _extractor
+    with _shared_lock:
+        if _extractor is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            # spawn: forking a process that runs many threads is not safe
+            _extractor = ProcessPoolExecutor(FULLTEXT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _extractor
+
+
+def fetch_sections(
+        entries: list[dict],
+        sections: tuple = DEFAULT_SECTIONS,
+        max_chars: int = 1500,
+        max_downloads: int = FULLTEXT_DOWNLOADS,
+        timeout: float = 120,
+        store: FullTextStore = None
+) -> dict:
+    """
+    Selected full-text sections of the arXiv papers among `entries`.
+
+    PDFs are downloaded by a bounded thread pool into the content-addressed
+    store, each finished download is handed to the extraction process pool
+    right away, and text extracted on an earlier run is read from the store.
+    Papers that fail, or are not done within `timeout` seconds, are skipped.
+
+    Args:
+        - entries (list[dict]): Corpus entries or search results
+        - sections (tuple): Heading keywords to keep (default DEFAULT_SECTIONS)
+        - max_chars (int): Characters kept per section (default 1500)
+        - max_downloads (int): Downloads in flight at once (default QUEST0_FULLTEXT_DOWNLOADS)
+        - timeout (float): Seconds the whole fetch may take (default 120)
+
+    Returns:
+        - dict: {paper title: {section keyword: text}} for papers where a section was found.
+    """
+    store = store or get_fulltext_store()
+    urls = {}
+    for entry in entries:
+        url = pdf_url(entry)
+        if url and entry.get("title") and url not in urls:
+            urls[url] = entry["title"]
+    if not urls:
+        return {}
+
+    texts, extracting = {}, {}
+    deadline = time.monotonic() + timeout
+    downloads = ThreadPoolExecutor(max_downloads, thread_name_prefix="fulltext")
+    with span("fulltext", papers=len(urls)):
+        pending = {downloads.submit(store.download, url): url for url in urls}
+        while pending:
+            done, _ = wait(pending, timeout=max(0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                url = pending.pop(future)
+                try:
+                    digest = future.result()
+                except Exception:
+                    increment("fulltext_errors", stage="download")
+                    continue
+                text = store.read_text(digest)
+                if text is not None:
+                    increment("fulltext_text_cache", result="hit")
+                    texts[url] = text
+                else:
+                    increment("fulltext_text_cache", result="miss")
+                    extracting[get_extractor().submit(
+                        extract_text, store.pdf_path(digest), store.text_path(digest)
+                    )] = url
+        downloads.shutdown(wait=False, cancel_futures=True)
+
+        done, not_done = wait(extracting, timeout=max(0, deadline - time.monotonic()))
+        for future in done:
+            try:
+                with open(future.result(), encoding="utf-8") as f:
+                    texts[extracting[future]] = f.read()
+            except Exception:
+                increment("fulltext_errors", stage="extract")
+        for future in not_done:
+            future.cancel()
+            increment("fulltext_errors", stage="timeout")
+
+    results = {}
+    for url, text in texts.items():
+        found = select_sections(text, sections, max_chars)
+        if found:
+            results[urls[url]] = found
+    increment("fulltext_papers", len(results))
+    return results
@@ -0,0 +1,267 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from tools.config import getenv
+
+# JSON-lines event log and Prometheus text file; both are off unless configured.
+METRICS_LOG = getenv("QUEST0_METRICS_LOG")
+METRICS_PROM = getenv("QUEST0_METRICS_PROM")
+
+# Optional price table: JSON {"provider:model": {"input": USD per 1M tokens, "output": USD per 1M tokens}}
+PRICES_PATH = getenv("QUEST0_PRICES")
+
+_lock = threading.Lock()
+_prices = None
+_counters = {}
+_gauges = {}
+_durations = {}
+_current_span = ContextVar("quest0_current_span", default=None)
+
+
+def _label_key(name: str, labels: dict) -> tuple:
+    return (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+
+
+def log_event(event: dict) -> None:
+    """
+    Appends one event (with a timestamp) to the JSON-lines metrics log, if enabled.
+    """
+    if not METRICS_LOG:
+        return
+    event = dict(event, ts=time.time())
+    with _lock:
+        directory = os.path.dirname(METRICS_LOG)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(METRICS_LOG, "a", encoding="utf-8") as f:
+            f.write(json.dumps(event, default=str) + "\n")
+
+
+def increment(name: str, value: float = 1, **labels) -> None:
+    """
+    Adds to a counter. The count is also attributed to the enclosing span(s).
+    """
+    with _lock:
+        key = _label_key(name, labels)
+        _counters[key] = _counters.get(key, 0) + value
+
+    record = _current_span.get()
+    if record is not None:
+        record["counts"][name] = record["counts"].get(name, 0) + value
+
+
+def set_gauge(name: str, value: float, **labels) -> None:
+    """
+    Sets a gauge to its latest value (e.g. the size of the last corpus).
+    """
+    with _lock:
+        _gauges[_label_key(name, labels)] = value
+
+
+def load_prices() -> dict:
+    """
+    The price table from QUEST0_PRICES, loaded once ({} if unset or unreadable).
+    """
+    global _prices
+    if _prices is None:
+        try:
+            with open(PRICES_PATH, encoding="utf-8") as f:
+                _prices = json.load(f)
+        except (TypeError, OSError, ValueError):
+            _prices = {}
+    return _prices
+
+
+def record_usage(usage, **labels) -> None:
+    """
+    Records token usage from a completion response's `usage` object or dict,
+    and its cost ("cost_usd") when the model is in the price table.
+    """
+    if usage is None:
+        return
+    tokens = {}
+    for field in ("prompt_tokens", "completion_tokens", "total_tokens"):
+        value = usage.get(field) if isinstance(usage, dict) else getattr(usage, field, None)
+        if value:
+            tokens[field] = value
+            increment(field, value, **labels)
+
+    price = load_prices().get(labels.get("model"))
+    if price:
+        cost = (
+            tokens.get("prompt_tokens", 0) * price.get("input", 0)
+            + tokens.get("completion_tokens", 0) * price.get("output", 0)
+        ) / 1_000_000
+        increment("cost_usd", cost, **labels)
+
+
+@contextmanager
+def span(name: str, **labels):
+    """
+    Times a block of work and counts it under the counter `name`. Durations
+    feed the exported summaries, counters incremented inside the block are
+    attached to the span (and its parents), and a "span" event is written to
+    the metrics log. Exceptions are counted under "errors" and re-raised.
+
+    Yields:
+        - dict: The span record; callers may add entries to record["attrs"].
+    """
+    increment(name, **labels)
+    record = {"name": name, "labels": labels, "counts": {}, "attrs": {}}
+    parent = _current_span.get()
+    token = _current_span.set(record)
+    start = time.perf_counter()
+    record["error"] = None
+    try:
+        yield record
+    except Exception as e:
+        record["error"] = type(e).__name__
+        increment("errors", span=name, error=record["error"])
+        raise
+    finally:
+        _current_span.reset(token)
+        duration = time.perf_counter() - start
+        record["duration_s"] = duration
+
+        with _lock:
+            stats = _durations.setdefault(_label_key(name, labels), [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += duration
+            stats[2] = max(stats[2], duration)
+
+        if parent is not None:
+            for counter, value in record["counts"].items():
+                parent["counts"][counter] = parent["counts"].get(counter, 0) + value
+
+        log_event({"type": "span", **record})
+
+
+def timed(name: str, **labels):
+    """
+    Decorator form of span. The wrapped function keeps its name, signature and
+    docstring, so it can still be passed to the model as a tool.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, **labels):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def snapshot() -> dict:
+    """
+    Returns the current counters, gauges and duration summaries.
+    """
+    def flatten(store):
+        return [{"name": n, "labels": dict(l), "value": v} for (n, l), v in store.items()]
+
+    with _lock:
+        return {
+            "counters": flatten(_counters),
+            "gauges": flatten(_gauges),
+            "durations": [
+                {"name": n, "labels": dict(l), "count": c, "sum": s, "max": m}
+                for (n, l), (c, s, m) in _durations.items()
+            ],
+        }
+
+
+def _prom_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for k, v in labels.items():
+        value = str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{k}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def export_prometheus() -> str:
+    """
+    Renders every metric in the Prometheus text exposition format.
+    """
+    data = snapshot()
+    lines = []
+    for item in data["counters"]:
+        lines.append(f"quest0_{item['name']}_total{_prom_labels(item['labels'])} {item['value']}")
+    for item in data["gauges"]:
+        lines.append(f"quest0_{item['name']}{_prom_labels(item['labels'])} {item['value']}")
+    for item in data["durations"]:
+        base, labels = f"quest0_{item['name']}_duration_seconds", _prom_labels(item["labels"])
+        lines.append(f"{base}_count{labels} {item['count']}")
+        lines.append(f"{base}_sum{labels} {item['sum']:.6f}")
+        lines.append(f"{base}_max{labels} {item['max']:.6f}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path: str = None) -> None:
+    """
+    Writes the Prometheus text export to a file (default QUEST0_METRICS_PROM).
+    """
+    path = path or METRICS_PROM
+    if not path:
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(export_prometheus())
+    os.replace(tmp_path, path)
+
+
+def serve_prometheus(port: int, host: str = "127.0.0.1"):
+    """
+    Serves the Prometheus text export over HTTP from a daemon thread.
+
+    Returns:
+        - http.server.ThreadingHTTPServer: The running server.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = export_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@contextmanager
+def profile(path: str = None):
+    """
+    Runs the block under cProfile and dumps the stats to `path` (if given).
+
+    Yields:
+        - cProfile.Profile: The profiler, for callers that want the stats directly.
+    """
+    import cProfile
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            profiler.dump_stats(path)
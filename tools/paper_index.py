@@ -0,0 +1,312 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from tools.config import getenv
+from tools.metrics import increment, timed
+
+# Local paper index; set QUEST0_PAPER_INDEX=off to stop ingesting and searching it.
+PAPER_INDEX_ENABLED = getenv("QUEST0_PAPER_INDEX", "on").lower() not in ("off", "0", "false")
+PAPER_INDEX_DIR = getenv("QUEST0_PAPER_INDEX_DIR", ".cache/paper_index")
+PAPER_INDEX_DIM = int(getenv("QUEST0_PAPER_INDEX_DIM", "1024"))
+PAPER_INDEX_MIN_SCORE = float(getenv("QUEST0_PAPER_INDEX_MIN_SCORE", "0.1"))
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has in into is it its of on or that the this "
+    "to was were with we our via using based towards toward".split()
+)
+
+_ARXIV_ID = re.compile(r"arxiv\.org/(?:abs|pdf)/([a-z\-]+/\d{7}|\d{4}\.\d{4,5})(?:v\d+)?", re.I)
+
+
+def paper_key(record: dict) -> str | None:
+    """
+    Identity of a paper across sources: its arXiv id when the URL has one,
+    otherwise the normalized URL (falling back to the normalized title).
+    """
+    url = str(record.get("url") or record.get("link_pdf") or "")
+    match = _ARXIV_ID.search(url)
+    if match:
+        return f"arxiv:{match.group(1).lower()}"
+    if url:
+        url = re.sub(r"^https?://(www\.)?", "", url.strip().lower()).split("#")[0].rstrip("/")
+        return f"url:{url}"
+    title = " ".join(re.findall(r"[a-z0-9]+", str(record.get("title", "")).lower()))
+    return f"title:{title}" if title else None
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Lower-cased word unigrams and bigrams (stopwords removed).
+    """
+    words = [w for w in re.findall(r"[a-z0-9]+", str(text).lower()) if w not in STOPWORDS]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def embed(texts: list[str], dim: int = PAPER_INDEX_DIM):
+    """
+    Hashed bag-of-words embeddings: every token is hashed into one of `dim`
+    signed buckets, counts are damped with log(1 + tf) and rows are L2-normalized,
+    so a dot product between two rows is their cosine similarity.
+
+    Returns:
+        - np.ndarray: float32 array of shape (len(texts), dim)
+    """
+    import numpy as np
+
+    rows, cols, signs = [], [], []
+    for row, text in enumerate(texts):
+        for token in tokenize(text):
+            h = zlib.crc32(token.encode("utf-8"))
+            rows.append(row)
+            cols.append(h % dim)
+            signs.append(1.0 if h & 0x80000000 else -1.0)
+
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    if rows:
+        np.add.at(vectors, (np.array(rows), np.array(cols)), np.array(signs, dtype=np.float32))
+    vectors = np.sign(vectors) * np.log1p(np.abs(vectors))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _document_text(record: dict) -> str:
+    # The title is repeated so it weighs more than the abstract
+    title = str(record.get("title", ""))
+    body = record.get("summary") or record.get("content") or record.get("abstract") or ""
+    return f"{title} {title} {body}"
+
+
+class PaperIndex:
+    """
+    A persistent, deduplicated store of every paper the search tools returned.
+
+    Records live in SQLite; their embeddings live in a memory-mapped float32
+    matrix on disk (row i of the matrix belongs to record i), so searching
+    is a single matrix-vector product that does not load the index into memory.
+    NumPy is only imported once the index is used.
+
+    Several processes may share a directory: rows are allocated inside a
+    SQLite write transaction, and the row count is re-read from the database
+    before every add and search.
+    """
+
+    def __init__(self, directory: str, dim: int = PAPER_INDEX_DIM):
+        self.directory = directory
+        self.dim = dim
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(
+            os.path.join(directory, "papers.sqlite3"), timeout=30, check_same_thread=False
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS papers (
+                row INTEGER PRIMARY KEY,
+                key TEXT UNIQUE NOT NULL,
+                source TEXT NOT NULL,
+                record TEXT NOT NULL,
+                added_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self._conn.execute("INSERT OR IGNORE INTO meta VALUES ('dim', ?)", (str(dim),))
+        self._conn.commit()
+
+        stored_dim = int(self._conn.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()[0])
+        if stored_dim != dim:
+            raise ValueError(
+                f"Paper index at {directory} uses dim={stored_dim}, not {dim}; "
+                "clear it or set QUEST0_PAPER_INDEX_DIM to match."
+            )
+
+        self._matrix_path = os.path.join(directory, "vectors.f32")
+        self._vectors = None
+        self._refresh_size()
+        self._open_matrix(max(self.size, 1024))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _refresh_size(self) -> None:
+        # Rows used so far, including those other processes added
+        self.size = self._conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM papers").fetchone()[0]
+
+    def _open_matrix(self, min_rows: int) -> None:
+        import numpy as np
+
+        row_bytes = self.dim * 4
+        current = os.path.getsize(self._matrix_path) // row_bytes if os.path.exists(self._matrix_path) else 0
+        capacity = max(current, min_rows)
+        if capacity > current:
+            if self._vectors is not None:
+                self._vectors.flush()
+                self._vectors = None
+            with open(self._matrix_path, "ab") as f:
+                f.truncate(capacity * row_bytes)
+        if self._vectors is None or capacity > self._vectors.shape[0]:
+            self._vectors = np.memmap(self._matrix_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def add(self, records: list[dict], source: str) -> int:
+        """
+        Adds search results that are not in the index yet (matched by paper_key).
+
+        Args:
+            - records (list[dict]): Raw arxiv_search_tool / tavily_search_tool results
+            - source (str): "arxiv" or "tavily"
+
+        Returns:
+            - int: The number of new papers stored.
+        """
+        candidates, seen = [], set()
+        for record in records:
+            if not isinstance(record, dict) or "error" in record or not record.get("title"):
+                continue
+            key = paper_key(record)
+            if key and key not in seen:
+                seen.add(key)
+                candidates.append((key, record))
+        if not candidates:
+            return 0
+
+        with self._lock:
+            # The write lock is held from reading the next free row until commit,
+            # so processes sharing the directory never allocate the same rows
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                placeholders = ",".join("?" * len(candidates))
+                known = {
+                    row[0] for row in self._conn.execute(
+                        f"SELECT key FROM papers WHERE key IN ({placeholders})", [k for k, _ in candidates]
+                    )
+                }
+                new = [(key, record) for key, record in candidates if key not in known]
+                if not new:
+                    self._conn.rollback()
+                    return 0
+
+                self._refresh_size()
+                start = self.size
+                needed = start + len(new)
+                # Maps rows another process appended, growing the file (doubling) if needed
+                self._open_matrix(needed if needed <= self._vectors.shape[0] else max(2 * self._vectors.shape[0], needed))
+                # Vectors are on disk before their rows become visible to readers
+                self._vectors[start:start + len(new)] = embed([_document_text(r) for _, r in new], self.dim)
+                self._vectors.flush()
+
+                now = time.time()
+                self._conn.executemany(
+                    "INSERT INTO papers VALUES (?, ?, ?, ?, ?)",
+                    [(start + i, key, source, json.dumps(record), now) for i, (key, record) in enumerate(new)],
+                )
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+            self.size = start + len(new)
+        return len(new)
+
+    def search(self, query: str, k: int = 10, min_score: float = 0.0) -> list[dict]:
+        """
+        Top-k cosine search over every indexed paper.
+
+        Returns:
+            - list[dict]: The stored records, best first, each with added
+              "source" and "score" keys.
+        """
+        import numpy as np
+
+        with self._lock:
+            self._refresh_size()
+            if self.size == 0:
+                return []
+            # Another process may have grown the matrix file
+            self._open_matrix(self.size)
+            scores = self._vectors[:self.size] @ embed([query], self.dim)[0]
+            k = min(k, self.size)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            top = [int(row) for row in top if scores[row] >= min_score]
+            if not top:
+                return []
+            rows = {
+                row: (source, record) for row, source, record in self._conn.execute(
+                    f"SELECT row, source, record FROM papers WHERE row IN ({','.join('?' * len(top))})", top
+                )
+            }
+
+        results = []
+        for row in top:
+            source, record = rows[row]
+            results.append(dict(json.loads(record), source=source, score=round(float(scores[row]), 4)))
+        return results
+
+    def clear(self) -> None:
+        """
+        Removes every paper (the matrix file keeps its size and is reused).
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM papers")
+            self._conn.commit()
+            self.size = 0
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_paper_index() -> PaperIndex | None:
+    """
+    Returns the shared paper index (opened on first use), or None if disabled.
+    """
+    global _index
+    if not PAPER_INDEX_ENABLED:
+        return None
+    with _index_lock:
+        if _index is None:
+            _index = PaperIndex(PAPER_INDEX_DIR)
+        return _index
+
+
+def ingest(results: list[dict], source: str) -> int:
+    """
+    Adds search tool results to the shared index. Failures are counted and
+    never propagate, so indexing can't break a search.
+    """
+    try:
+        index = get_paper_index()
+        added = index.add(results, source) if index is not None else 0
+    except Exception:
+        increment("paper_index_errors")
+        return 0
+    if added:
+        increment("paper_index_added", added, source=source)
+    return added
+
+
+@timed("tool_call", tool="local_paper_search_tool")
+def local_paper_search_tool(query: str, max_results: int = 10) -> list[dict]:
+    """
+    Searches the local index of papers collected by earlier searches (fast, offline).
+
+    Args:
+        - query (str): The search query
+        - max_results (int): The maximum results to return (default 10)
+
+    Returns:
+        - list[dict]: Matching papers, best first, with their "source" ("arxiv" or
+          "tavily") and a similarity "score". Empty if nothing relevant is indexed.
+    """
+    try:
+        index = get_paper_index()
+        results = index.search(query, max_results, PAPER_INDEX_MIN_SCORE) if index is not None else []
+    except Exception as e:
+        increment("tool_errors", tool="local_paper_search_tool")
+        return [{"error": str(e)}]
+    increment("paper_index_search", result="hit" if results else "miss")
+    return results
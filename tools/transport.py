@@ -0,0 +1,209 @@
+import random
+import threading
+import time
+from typing import Callable
+from urllib.parse import urlparse
+from tools.config import getenv
+
+# Requests per second (and burst size) allowed for each host.
+# arXiv asks API clients to make no more than one request every three seconds,
+# and full-text (PDF) downloads from arxiv.org to keep the same pace.
+HOST_RATE_LIMITS = {
+    "export.arxiv.org": (1 / 3, 1),
+    "arxiv.org": (1 / 3, 1),
+}
+DEFAULT_RATE_LIMIT = (5.0, 5)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = int(getenv("QUEST0_HTTP_MAX_RETRIES", "3"))
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 10.0
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket limiting how often a host is called.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        Blocks until a token is available, then consumes it.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def _bucket_for(host: str) -> TokenBucket:
+    with _buckets_lock:
+        if host not in _buckets:
+            rate, capacity = HOST_RATE_LIMITS.get(host, DEFAULT_RATE_LIMIT)
+            _buckets[host] = TokenBucket(rate, capacity)
+        return _buckets[host]
+
+
+def acquire(host: str) -> None:
+    """
+    Waits for the rate limiter of the given host (e.g. "api.tavily.com").
+    """
+    _bucket_for(host).acquire()
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Returns the shared keep-alive requests.Session used by every tool
+    (requests is imported on first use).
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update({"User-Agent": "Quest0/1.0 (+https://github.com/mutaverse/Quest0)"})
+                _session = session
+    return _session
+
+
+def _backoff(attempt: int, retry_after: str = None) -> float:
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_MAX)
+        except ValueError:
+            pass
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def _retryable(error: Exception) -> bool:
+    import requests
+
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout, TimeoutError)):
+        return True
+    if getattr(getattr(error, "response", None), "status_code", None) in RETRY_STATUSES:
+        return True
+    # SDKs raise their own types for these, e.g. tavily's UsageLimitExceededError (429) and TimeoutError
+    return any(cls.__name__ in ("UsageLimitExceededError", "TimeoutError") for cls in type(error).__mro__)
+
+
+def call_with_retries(host: str, func: Callable, *args, **kwargs):
+    """
+    Calls an SDK function that makes one request to `host` (e.g. a Tavily
+    search), rate-limited and retried like http_get: 429/5xx failures and
+    connection errors are retried with jittered exponential backoff.
+
+    Returns:
+        - The function's result; the last error is raised once retries run out.
+    """
+    bucket = _bucket_for(host)
+    for attempt in range(MAX_RETRIES + 1):
+        bucket.acquire()
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            if attempt == MAX_RETRIES or not _retryable(e):
+                raise
+            retry_after = getattr(e, "retry_after_seconds", None)
+            time.sleep(_backoff(attempt, str(retry_after) if retry_after else None))
+
+
+def http_get(url: str, params: dict = None, timeout: float = 30, **kwargs):
+    """
+    Performs a rate-limited GET over the shared connection pool, retrying
+    429/5xx responses and connection errors with jittered exponential backoff.
+
+    Args:
+        - url (str): The URL to fetch
+        - params (dict): Optional query parameters
+        - timeout (float): Per-attempt timeout in seconds (default 30)
+
+    Returns:
+        - requests.Response: The final response (raise_for_status is not called).
+    """
+    import requests
+
+    session = get_session()
+    bucket = _bucket_for(urlparse(url).netloc)
+
+    for attempt in range(MAX_RETRIES + 1):
+        bucket.acquire()
+        try:
+            response = session.get(url, params=params, timeout=timeout, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if attempt == MAX_RETRIES:
+                raise
+            time.sleep(_backoff(attempt))
+            continue
+
+        if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+            return response
+
+        retry_after = response.headers.get("Retry-After")
+        response.close()
+        time.sleep(_backoff(attempt, retry_after))
+
+    return response
+
+
+_tavily_client = None
+_tavily_key = None
+_tavily_override = None
+_tavily_lock = threading.Lock()
+
+
+def set_tavily_client(client) -> None:
+    """
+    Installs a Tavily client (or stand-in) to use instead of building one from
+    TAVILY_API_KEY. Pass None to go back to the default client.
+    """
+    global _tavily_override
+    _tavily_override = client
+
+
+def get_tavily_client():
+    """
+    Returns a reusable TavilyClient, rebuilding it only if the API key changes
+    (tavily is imported on first use).
+    """
+    global _tavily_client, _tavily_key
+
+    if _tavily_override is not None:
+        return _tavily_override
+
+    api_key = getenv("TAVILY_API_KEY")
+    if not api_key:
+        raise ValueError("TAVILY_API_KEY not found in environment variables.")
+
+    with _tavily_lock:
+        if _tavily_client is None or api_key != _tavily_key:
+            from tavily import TavilyClient
+
+            _tavily_client = TavilyClient(api_key=api_key)
+            _tavily_key = api_key
+        return _tavily_client
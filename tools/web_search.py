@@ -1,9 +1,10 @@
-from tavily import TavilyClient
-from dotenv import load_dotenv
-import os
-load_dotenv('.env')
+from tools.cache import search_cache
+from tools.transport import call_with_retries, get_tavily_client
+from tools.metrics import increment, timed
+from tools.paper_index import ingest
 
 
+@timed("tool_call", tool="tavily_search_tool")
 def tavily_search_tool(
         query: str, max_results: int = 5, include_images: bool = False
         ) -> list[dict]:
@@ -19,15 +20,19 @@ def tavily_search_tool(
         list[dict]: A list of dictionaries with keys like "title", 'content' and 'url'
     """
 
-    api_key = os.getenv("TAVILY_API_KEY")
-    if not api_key:
-        raise ValueError("TAVILY_API_KEY not found in environment variables.")
+    cached = search_cache.get(
+        "tavily", query, max_results=max_results, include_images=include_images
+    )
+    increment("search_cache", source="tavily", result="miss" if cached is None else "hit")
+    if cached is not None:
+        return cached
 
-    # Define the Tavily client (instantiate it)
-    client = TavilyClient(api_key=api_key)
+    # Shared client (raises ValueError if TAVILY_API_KEY is missing)
+    client = get_tavily_client()
 
     try:
-        response = client.search(
+        response = call_with_retries(
+            "api.tavily.com", client.search,
             query=query, max_results=max_results, include_images=include_images
         )
 
@@ -44,7 +49,12 @@ def tavily_search_tool(
         if include_images:
             for img_url in response.get("images", []):
                 results.append({"image_url": img_url})
-        
+
+        search_cache.set(
+            "tavily", query, results, max_results=max_results, include_images=include_images
+        )
+        ingest(results, "tavily")
         return results
     except Exception as e:
+        increment("tool_errors", tool="tavily_search_tool")
         return [{"error": str(e)}]